@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
@@ -6,3 +7,9 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         import core.signals  # 👈 Import the signals module here
+
+        # servers other than gunicorn (uvicorn, runserver, the bot) opt in here;
+        # gunicorn warms each worker from its post_fork hook (gunicorn.conf.py)
+        if settings.MODEL_WARMUP:
+            from core import warmup
+            warmup.start()
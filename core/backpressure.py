@@ -0,0 +1,144 @@
+# core/backpressure.py
+"""
+Concurrency limits for the async API views.
+
+A ``ConcurrencyLimiter`` admits at most ``limit`` requests at once (and at
+most ``per_key`` per user).  A request that finds the server full waits up
+to ``wait`` seconds for a slot and is then turned away with 503; one that
+exceeds its own per‑user allowance is turned away at once with 429.
+
+Slots are counted under a ``threading.Lock`` rather than an
+``asyncio.Semaphore`` so the limit holds whether the views run on uvicorn's
+single loop or on per‑request loops under WSGI; a freed slot wakes the
+oldest waiter on its own loop via ``call_soon_threadsafe``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import Counter as _Tally, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Hashable, Optional, Tuple
+
+from . import metrics
+
+
+class Saturated(Exception):
+    """No slot available; ``status`` is the HTTP code to answer with."""
+
+    def __init__(self, status: int, detail: str, retry_after: int = 1):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def _wake(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+class ConcurrencyLimiter:
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        per_key: Optional[int] = None,
+        wait: float = 0.0,
+    ):
+        self.name = name
+        self.limit = limit
+        self.per_key = per_key
+        self.wait = wait
+        self._lock = threading.Lock()
+        self._active = 0
+        self._by_key: _Tally = _Tally()
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self.admitted = metrics.counter(f"{name}_admitted_total", "Requests given a slot")
+        self.rejected_busy = metrics.counter(f"{name}_rejected_busy_total", "503: server at its limit")
+        self.rejected_user = metrics.counter(f"{name}_rejected_user_total", "429: caller over its own limit")
+
+    def _try_acquire(self, key: Optional[Hashable], waiter=None) -> Optional[int]:
+        """
+        Take a slot; ``None`` on success, else the status code to refuse
+        with.  When the server is full, ``waiter`` is queued in the same
+        critical section so a concurrent release cannot be missed.
+        """
+        with self._lock:
+            if key is not None and self.per_key and self._by_key[key] >= self.per_key:
+                return 429
+            if self._active >= self.limit:
+                if waiter is not None:
+                    self._waiters.append(waiter)
+                return 503
+            self._active += 1
+            if key is not None:
+                self._by_key[key] += 1
+            return None
+
+    def _release(self, key: Optional[Hashable]) -> None:
+        with self._lock:
+            self._active -= 1
+            if key is not None:
+                self._by_key[key] -= 1
+                if not self._by_key[key]:
+                    del self._by_key[key]
+        self._wake_next()
+
+    def _wake_next(self) -> None:
+        with self._lock:
+            waiter = self._waiters.popleft() if self._waiters else None
+        if waiter is not None:
+            loop, fut = waiter
+            loop.call_soon_threadsafe(_wake, fut)
+
+    def _forget(self, waiter) -> bool:
+        """Drop a waiter that stops waiting; ``False`` if a release already popped it."""
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                return False
+            return True
+
+    @asynccontextmanager
+    async def slot(self, key: Optional[Hashable] = None) -> AsyncIterator[None]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait
+        while True:
+            waiter = (loop, loop.create_future())
+            refused = self._try_acquire(key, waiter if self.wait > 0 else None)
+            if refused is None:
+                break
+            if refused == 429:
+                self.rejected_user.inc()
+                raise Saturated(429, f"Too many concurrent requests (max {self.per_key} per user)")
+            remaining = deadline - loop.time()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                await asyncio.wait_for(waiter[1], remaining)
+            except BaseException as exc:
+                if not self._forget(waiter):
+                    self._wake_next()       # woken on the way out: pass the slot on
+                if isinstance(exc, asyncio.TimeoutError):
+                    self.rejected_busy.inc()
+                    raise Saturated(503, "Server busy, try again shortly") from None
+                raise
+
+        self.admitted.inc()
+        try:
+            yield
+        finally:
+            self._release(key)
+
+    def stats(self) -> Dict:
+        return {
+            "limit": self.limit,
+            "per_key": self.per_key,
+            "active": self._active,
+            "admitted": self.admitted.value,
+            "rejected_busy": self.rejected_busy.value,
+            "rejected_user": self.rejected_user.value,
+        }
@@ -0,0 +1,270 @@
+# core/backtest.py
+"""
+Backtests: how well the model would have done over a ticker's history.
+
+The metrics stored on a ``Prediction`` (mse / rmse / r2 against the last
+scaled close) say nothing about real accuracy.  A backtest replays the
+pipeline on every past day instead: for each origin day ``t`` it builds the
+window of the ``WINDOW`` closes ending at ``t``, scales it the way the
+pipeline would have on that day (min–max over the history up to ``t``),
+forecasts ``max(horizons)`` days ahead and compares every horizon's price
+with the close that actually followed.
+
+It is all array work:
+
+* the windows are a strided view of the close series (core.windows), copied
+  into the model's input one batch at a time;
+* the per‑origin scalers come from running minima / maxima;
+* origins are forecast ``BACKTEST_BATCH_SIZE`` at a time, each rollout
+  step one batched model call (core.rollout);
+* the errors for every horizon are computed in one pass.
+
+Reports are cached until the next market close, keyed like forecasts on
+the last bar and the model version.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from numpy.lib.stride_tricks import sliding_window_view
+
+from . import metrics
+from .market_calendar import seconds_until_next_close
+from .model_registry import registry
+from .rollout import rollout
+from .scaling import MinMaxScale
+from .singleflight import SingleFlight
+from .utils import price_store
+from .validation import parse_horizon
+from .windows import WINDOW, WindowBuilder
+
+HITS = metrics.counter("backtest_cache_hits_total", "Backtests served from cache")
+MISSES = metrics.counter("backtest_cache_misses_total", "Backtests computed")
+BACKTEST_SECONDS = metrics.histogram(
+    "backtest_seconds", "Time to backtest one ticker (cache misses)",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+Predict = Callable[[np.ndarray], np.ndarray]
+
+
+@dataclass
+class HorizonScore:
+    """Out‑of‑sample errors of the ``horizon``‑day‑ahead forecasts, in price units."""
+    horizon: int
+    samples: int
+    mae: float
+    rmse: float
+    mape: float               # percent
+    r2: float
+    direction: float          # share of forecasts that got the sign of the move right
+    naive_rmse: float         # "the price stays where it is" baseline
+    skill: float              # 1 - rmse / naive_rmse; above 0 beats the baseline
+
+
+@dataclass
+class BacktestReport:
+    ticker: str
+    last_bar: Optional[str]
+    model_version: str
+    window: int
+    stride: int
+    origins: int
+    first_origin: Optional[str]
+    last_origin: Optional[str]
+    seconds: float
+    horizons: List[HorizonScore] = field(default_factory=list)
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BacktestReport":
+        return cls(**{**data, "horizons": [HorizonScore(**h) for h in data["horizons"]]})
+
+
+# ─── Maths ──────────────────────────────────────────────────────
+def parse_horizons(value: Optional[Iterable] = None) -> Tuple[int, ...]:
+    """Sorted distinct horizons from ``"1,5,20"`` / a list; ``None`` → ``BACKTEST_HORIZONS``."""
+    if value is None or value == "":
+        value = settings.BACKTEST_HORIZONS
+    if isinstance(value, str):
+        value = [v for v in value.split(",") if v.strip()]
+    horizons = tuple(sorted({parse_horizon(v) for v in value}))
+    if not horizons:
+        raise ValueError("at least one horizon is required")
+    return horizons
+
+
+def origin_ends(length: int, window: int = WINDOW, stride: int = 1) -> np.ndarray:
+    """Index of the last close of every backtest window (each has at least one later close)."""
+    if stride < 1:
+        raise ValueError("stride must be at least 1")
+    if length < window + 1:
+        raise ValueError(f"Need ≥{window + 1} daily points to backtest, got {length}")
+    return np.arange(window - 1, length - 1, stride)
+
+
+def forecast_history(
+    closes: np.ndarray,
+    predict: Predict,
+    horizon: int,
+    window: int = WINDOW,
+    stride: int = 1,
+    batch_size: Optional[int] = None,
+) -> np.ndarray:
+    """
+    ``(origins, horizon)`` forecast prices, one row per ``origin_ends``
+    entry.  ``predict`` is the model's ``predict_on_batch``.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    ends = origin_ends(len(closes), window, stride)
+    builder = WindowBuilder(closes, window, stride, lookahead=1)         # windows are views
+    scalers = MinMaxScale(np.fmin.accumulate(closes)[ends], np.fmax.accumulate(closes)[ends])
+
+    paths = np.empty((len(ends), horizon), dtype=np.float64)
+    # scaled in float64 like prepare_data; the rollout casts to the model's float32
+    batches = builder.batches(batch_size or settings.BACKTEST_BATCH_SIZE, scalers, dtype=np.float64)
+    for rows, batch in batches:
+        paths[rows] = scalers[rows].inverse(rollout(batch, horizon, predict))
+    return paths
+
+
+def score(
+    closes: np.ndarray, ends: np.ndarray, paths: np.ndarray, horizons: Sequence[int]
+) -> List[HorizonScore]:
+    """Compare forecast ``paths`` (rows per ``ends``) with the closes that followed."""
+    closes = np.asarray(closes, dtype=np.float64)
+    width = paths.shape[1]
+    # actual[i, h - 1] = close h days after origin i (NaN past the end of the data)
+    padded = np.concatenate([closes, np.full(width, np.nan)])
+    actual = sliding_window_view(padded, width)[ends + 1]
+    last = closes[ends]
+
+    scores = []
+    for h in horizons:
+        target, pred = actual[:, h - 1], paths[:, h - 1]
+        ok = ~np.isnan(target)
+        target, pred, base = target[ok], pred[ok], last[ok]
+        n = len(target)
+        if n == 0:
+            continue
+        err = pred - target
+        rmse = float(np.sqrt(np.mean(err ** 2)))
+        spread = float(np.sum((target - target.mean()) ** 2))
+        naive_rmse = float(np.sqrt(np.mean((base - target) ** 2)))
+        scores.append(HorizonScore(
+            horizon=h,
+            samples=n,
+            mae=float(np.mean(np.abs(err))),
+            rmse=rmse,
+            mape=float(np.mean(np.abs(err) / np.abs(target)) * 100),
+            r2=float(1 - np.sum(err ** 2) / spread) if spread else 0.0,
+            direction=float(np.mean(np.sign(pred - base) == np.sign(target - base))),
+            naive_rmse=naive_rmse,
+            skill=float(1 - rmse / naive_rmse) if naive_rmse else 0.0,
+        ))
+    return scores
+
+
+def run_backtest(
+    ticker: str,
+    df: "pd.DataFrame",
+    horizons: Sequence[int] = (1,),
+    stride: int = 1,
+    predict: Optional[Predict] = None,
+    model_version: str = "",
+    batch_size: Optional[int] = None,
+) -> BacktestReport:
+    """Backtest one price history (synchronous, CPU‑bound)."""
+    started = time.perf_counter()
+    closes = df["Close"].to_numpy(dtype=np.float64)
+    ends = origin_ends(len(closes), WINDOW, stride)
+    predict = predict or registry.get().predict_on_batch
+    paths = forecast_history(closes, predict, max(horizons), WINDOW, stride, batch_size)
+    scores = score(closes, ends, paths, horizons)
+    elapsed = time.perf_counter() - started
+    BACKTEST_SECONDS.observe(elapsed)
+    return BacktestReport(
+        ticker=ticker,
+        last_bar=df.index[-1].isoformat(),
+        model_version=model_version,
+        window=WINDOW,
+        stride=stride,
+        origins=len(ends),
+        first_origin=df.index[ends[0]].isoformat(),
+        last_origin=df.index[ends[-1]].isoformat(),
+        seconds=round(elapsed, 4),
+        horizons=scores,
+    )
+
+
+# ─── Cached entry point ─────────────────────────────────────────
+_flights = SingleFlight("backtest")
+
+
+def _cache():
+    return caches[settings.PREDICTION_CACHE_ALIAS]
+
+
+def _key(ticker: str, last_bar: str, model_version: str, horizons: Sequence[int], stride: int) -> str:
+    return (f"backtest:v1:{ticker}:{last_bar}:{model_version}:{WINDOW}:{stride}:"
+            + ",".join(map(str, horizons)))
+
+
+async def abacktest(
+    ticker: str,
+    horizons: Optional[Iterable] = None,
+    stride: Optional[int] = None,
+    refresh: bool = False,
+    compute: bool = True,
+) -> Optional[BacktestReport]:
+    """
+    Backtest ``ticker`` on its stored history; cached until the next close.
+    With ``compute=False`` only a cached report is returned (``None`` on a
+    miss) and the model is never loaded.
+    """
+    ticker = ticker.upper()
+    horizons = parse_horizons(horizons)
+    stride = settings.BACKTEST_STRIDE if stride is None else stride
+    if stride < 1:
+        raise ValueError("stride must be at least 1")
+    df = await price_store.aget_history(ticker)
+    if len(df) < WINDOW + 1:
+        raise ValueError(f"Need ≥{WINDOW + 1} daily points to backtest {ticker}, got {len(df)}")
+    entry = registry.entry()
+    key = _key(ticker, df.index[-1].isoformat(), entry.version, horizons, stride)
+    if not refresh:
+        data = await sync_to_async(_cache().get)(key)
+        if data is not None:
+            HITS.inc()
+            return BacktestReport.from_dict(data)
+    if not compute:
+        return None
+
+    async def compute() -> BacktestReport:
+        MISSES.inc()
+        loop = asyncio.get_running_loop()
+        report = await loop.run_in_executor(
+            None, lambda: run_backtest(ticker, df, horizons, stride, model_version=entry.version)
+        )
+        await sync_to_async(_cache().set)(key, report.as_dict(), timeout=seconds_until_next_close())
+        return report
+
+    return await _flights.do(key, compute)
+
+
+def backtest(
+    ticker: str, horizons: Optional[Iterable] = None, stride: Optional[int] = None, refresh: bool = False
+) -> BacktestReport:
+    """Sync wrapper for the management command."""
+    return async_to_sync(abacktest)(ticker, horizons, stride, refresh)
@@ -0,0 +1,179 @@
+# core/batching.py
+"""
+Micro‑batching stage in front of ``model.predict_on_batch``.
+
+Concurrent callers (PredictView threads, the Telegram bot's event loop, the
+management command) submit single ``(window, 1)`` inputs.  A background
+thread collects whatever arrives within ``PREDICT_BATCH_MAX_WAIT_MS`` — up
+to ``PREDICT_BATCH_MAX_SIZE`` windows — runs them as one ``(N, window, 1)``
+call and hands every caller its own row of the output.
+
+Futures are ``concurrent.futures.Future`` so callers on any thread or event
+loop can wait on them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from . import metrics
+from .model_registry import DEFAULT_MODEL, registry
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = metrics.histogram(
+    "inference_batch_size",
+    "Windows per batched predict call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+QUEUE_WAIT = metrics.histogram(
+    "inference_queue_wait_seconds",
+    "Time a window waited in the batching queue",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+PREDICT_SECONDS = metrics.histogram(
+    "inference_predict_seconds",
+    "Duration of one batched model predict call",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+_Item = Tuple[np.ndarray, Future, float]
+
+
+class MicroBatcher:
+    """Collect windows from many callers and predict them in one call."""
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], np.ndarray],
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        name: str = DEFAULT_MODEL,
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size or settings.PREDICT_BATCH_MAX_SIZE
+        self.max_wait = (
+            max_wait_ms if max_wait_ms is not None else settings.PREDICT_BATCH_MAX_WAIT_MS
+        ) / 1000.0
+        self.name = name
+        self._queue: "queue.Queue[_Item]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    # ── public API ──────────────────────────────────────────────
+    def submit(self, window: np.ndarray) -> Future:
+        """Queue one window (``(T, F)`` or ``(1, T, F)``); resolves to its output row."""
+        window = np.asarray(window, dtype=np.float32)
+        if window.ndim == 3:
+            if window.shape[0] != 1:
+                raise ValueError("submit() takes a single window; use submit_many()")
+            window = window[0]
+        self._ensure_worker()
+        fut: Future = Future()
+        self._queue.put((window, fut, time.perf_counter()))
+        return fut
+
+    def submit_many(self, windows: np.ndarray) -> List[Future]:
+        return [self.submit(w) for w in np.asarray(windows, dtype=np.float32)]
+
+    async def predict(self, window: np.ndarray) -> float:
+        """Await the scalar prediction for one window."""
+        out = await asyncio.wrap_future(self.submit(window))
+        return float(out[0])
+
+    async def predict_many(self, windows: np.ndarray) -> np.ndarray:
+        """Await the output rows for several windows (batched with everyone else's)."""
+        futures = self.submit_many(windows)
+        return np.stack(await asyncio.gather(*(asyncio.wrap_future(f) for f in futures)))
+
+    # ── worker ──────────────────────────────────────────────────
+    def _ensure_worker(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=f"batcher-{self.name}", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[_Item]) -> None:
+        started = time.perf_counter()
+        live = [item for item in batch if item[1].set_running_or_notify_cancel()]
+
+        # windows of different shapes cannot share a tensor
+        by_shape: Dict[tuple, List[_Item]] = {}
+        for item in live:
+            QUEUE_WAIT.observe(started - item[2])
+            by_shape.setdefault(item[0].shape, []).append(item)
+
+        for group in by_shape.values():
+            BATCH_SIZE.observe(len(group))
+            try:
+                with PREDICT_SECONDS.time():
+                    out = np.asarray(self.predict_fn(np.stack([w for w, _, _ in group])))
+            except Exception as exc:
+                logger.exception("Batched predict failed (%d windows)", len(group))
+                for _, fut, _ in group:
+                    fut.set_exception(exc)
+                continue
+            for row, (_, fut, _) in zip(out, group):
+                fut.set_result(row)
+
+
+# ─── Per‑model batchers ─────────────────────────────────────────
+_BATCHERS: Dict[Tuple[str, str], MicroBatcher] = {}
+_BATCHERS_LOCK = threading.Lock()
+
+
+def get_batcher(name: str = DEFAULT_MODEL, version: Optional[str] = None) -> MicroBatcher:
+    """One batcher per registered model version, created on first use."""
+    entry = registry.entry(name, version)
+    key = (entry.name, entry.version)
+    with _BATCHERS_LOCK:
+        batcher = _BATCHERS.get(key)
+        if batcher is None:
+            batcher = _BATCHERS[key] = MicroBatcher(
+                lambda x: registry.get(*key).predict_on_batch(x),
+                name=f"{entry.name}@{entry.version}",
+            )
+    return batcher
+
+
+def stats() -> Dict:
+    with _BATCHERS_LOCK:
+        batchers = list(_BATCHERS.values())
+    return {
+        "batchers": [
+            {
+                "name": b.name,
+                "max_batch_size": b.max_batch_size,
+                "max_wait_ms": b.max_wait * 1000.0,
+                "queued": b._queue.qsize(),
+            }
+            for b in batchers
+        ],
+        "histograms": metrics.snapshot("inference_"),
+    }
@@ -0,0 +1,222 @@
+# core/bulk.py
+"""
+Bulk multi‑ticker prediction for the nightly refresh.
+
+Tickers are processed in chunks.  Per chunk: price histories are refreshed
+with at most ``concurrency`` downloads in flight, every window goes through
+one batched model call (one per day ahead for ``horizon`` > 1, see
+core.rollout), and the resulting ``Prediction`` rows are written with a
+single ``bulk_create``.  Finished tickers are appended to a progress
+file after every chunk so an interrupted run can resume where it stopped.
+A chunk that raises (a model or database error) fails only its own
+tickers; the run goes on with the next chunk.
+
+Charts are not rendered here; rows get the same lazily rendered chart paths
+as single predictions (see core.charts).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+from asgiref.sync import sync_to_async
+
+from .charts import chart_paths
+from .model_registry import registry
+from .models import Prediction
+from .rollout import rollout
+from .scaling import MinMaxScale
+from .utils import WINDOW, prepare_data, price_store, score_prediction
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TickerResult:
+    ticker: str
+    ok: bool = False
+    error: str = ""
+    download_seconds: float = 0.0
+    prepare_seconds: float = 0.0
+    next_price: Optional[float] = None
+
+
+@dataclass
+class BulkReport:
+    results: List[TickerResult] = field(default_factory=list)
+    chunks: int = 0
+    infer_seconds: float = 0.0
+    write_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    skipped: int = 0
+
+    @property
+    def succeeded(self) -> List[TickerResult]:
+        return [r for r in self.results if r.ok]
+
+    @property
+    def failed(self) -> List[TickerResult]:
+        return [r for r in self.results if not r.ok]
+
+
+class BulkProgress:
+    """JSON file of finished tickers; ``None`` path keeps it in memory only."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done: set = set()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.done = set(json.load(f).get("done", []))
+
+    def mark(self, tickers: Iterable[str]) -> None:
+        self.done.update(tickers)
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"done": sorted(self.done)}, f)
+        os.replace(tmp, self.path)      # atomic: a crash never leaves half a file
+
+
+async def _load(ticker: str, sem: asyncio.Semaphore) -> tuple:
+    result = TickerResult(ticker)
+    async with sem:
+        started = time.perf_counter()
+        try:
+            df = await price_store.aget_history(ticker)
+        except Exception as exc:
+            result.error = f"download: {exc}"
+            df = None
+        result.download_seconds = time.perf_counter() - started
+    if df is not None and len(df) < WINDOW:
+        result.error = f"need ≥{WINDOW} daily points, got {len(df)}"
+        df = None
+    return result, df
+
+
+async def _run_chunk(
+    user, tickers: List[str], concurrency: int, report: BulkReport, horizon: int = 1
+) -> List[str]:
+    loop = asyncio.get_running_loop()
+    sem = asyncio.Semaphore(concurrency)
+
+    # 1 · refresh histories (bounded concurrency)
+    loaded = await asyncio.gather(*[_load(t, sem) for t in tickers])
+    report.results.extend(r for r, _ in loaded)
+    ready = [(r, df) for r, df in loaded if df is not None]
+    if not ready:
+        return []
+
+    # 2 · scale every series
+    prepared = []
+    for result, df in ready:
+        started = time.perf_counter()
+        scaler, scaled, x = prepare_data(df)
+        result.prepare_seconds = time.perf_counter() - started
+        prepared.append((result, df, scaler, scaled, x))
+
+    # 3 · one batched model call for the whole chunk (per day ahead)
+    entry = registry.entry()
+    batch = np.concatenate([p[4] for p in prepared], dtype=np.float32)
+    started = time.perf_counter()
+    paths_scaled = await loop.run_in_executor(
+        None, lambda: rollout(batch, horizon, registry.get().predict_on_batch)
+    )
+    report.infer_seconds += time.perf_counter() - started
+
+    # 4 · rows (every prediction of the chunk back to a price in one call)
+    prices = MinMaxScale.concat(p[2] for p in prepared).inverse(paths_scaled).tolist()
+    rows = []
+    for (result, df, _, scaled, _), pred_scaled, row in zip(prepared, paths_scaled[:, 0], prices):
+        pred_price, path = row[0], [round(p, 4) for p in row]
+        mse, rmse, r2 = score_prediction(scaled, float(pred_scaled))
+        last_bar = df.index[-1].isoformat()
+        rows.append(Prediction(
+            user=user,
+            ticker=result.ticker,
+            next_price=Decimal(str(round(pred_price, 4))),
+            mse=mse,
+            rmse=rmse,
+            r2=r2,
+            **chart_paths(result.ticker, last_bar, round(pred_price, 4), WINDOW, path),
+            metrics={
+                "window": WINDOW,
+                "data_points": len(df),
+                "last_bar": last_bar,
+                "model_version": entry.version,
+                "horizon": horizon,
+                "path": path,
+                "bulk": True,
+            },
+        ))
+        result.next_price = pred_price
+        result.ok = True
+
+    started = time.perf_counter()
+    await sync_to_async(Prediction.objects.bulk_create)(rows)
+    report.write_seconds += time.perf_counter() - started
+    return [p[0].ticker for p in prepared]
+
+
+def _fail_chunk(report: BulkReport, tickers: List[str], first: int, exc: Exception) -> None:
+    """Record ``exc`` on every ticker of a chunk that raised (``first``: its first result)."""
+    results = {r.ticker: r for r in report.results[first:]}
+    for ticker in tickers:
+        result = results.get(ticker)
+        if result is None:
+            result = TickerResult(ticker)
+            report.results.append(result)
+        if not result.error:                    # keep download / data errors as they were
+            result.ok, result.next_price = False, None
+            result.error = f"chunk failed: {exc}"
+
+
+async def bulk_predict_async(
+    user,
+    tickers: Iterable[str],
+    *,
+    concurrency: int = 8,
+    chunk_size: int = 500,
+    horizon: int = 1,
+    progress: Optional[BulkProgress] = None,
+    on_chunk: Optional[Callable[[int, int], None]] = None,
+) -> BulkReport:
+    """Predict many tickers; see the module docstring for the strategy."""
+    if concurrency < 1 or chunk_size < 1:
+        raise ValueError("concurrency and chunk_size must be at least 1")
+    progress = progress or BulkProgress(None)
+    started = time.perf_counter()
+    report = BulkReport()
+
+    todo = []
+    for t in dict.fromkeys(t.upper() for t in tickers):
+        if t in progress.done:
+            report.skipped += 1
+        else:
+            todo.append(t)
+
+    for i in range(0, len(todo), chunk_size):
+        chunk = todo[i:i + chunk_size]
+        first = len(report.results)
+        try:
+            finished = await _run_chunk(user, chunk, concurrency, report, horizon)
+        except Exception as exc:
+            logger.exception("Bulk chunk %s … %s failed; continuing", chunk[0], chunk[-1])
+            _fail_chunk(report, chunk, first, exc)
+            finished = []
+        progress.mark(finished)
+        report.chunks += 1
+        if on_chunk:
+            on_chunk(min(i + chunk_size, len(todo)), len(todo))
+
+    report.wall_seconds = time.perf_counter() - started
+    return report
@@ -0,0 +1,294 @@
+# core/charts.py
+"""
+On‑demand chart rendering for predictions.
+
+A prediction only records *where* its charts will live.  The PNG is rendered
+the first time someone asks for it (plot endpoint, Telegram bot) and kept on
+disk under a content key — ticker, last bar, predicted price, window and
+chart kind, plus the forecast path for the horizon chart — so any later
+prediction with the same inputs reuses the file.
+
+Multi‑step forecasts (``metrics["path"]``, see core.rollout) also get a
+horizon chart; single‑step ones have none.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import os
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+
+from . import metrics
+from .market_calendar import trading_days_after
+from .models import CHART_FIELDS
+from .price_store import read_history
+from .singleflight import SingleFlight
+
+# Bump when the rendering changes so old files are not reused.
+CHART_STYLE = "3"
+
+PLOT_DIR = os.path.join("static", "plots")
+
+
+class ChartUnavailable(Exception):
+    """The prediction has no chart of this kind, or its data is gone."""
+
+
+# ─── Content keys / paths ───────────────────────────────────────
+def chart_key(
+    kind: str, ticker: str, last_bar: str, next_price: float, window: int, path: Sequence[float] = ()
+) -> str:
+    raw = f"{CHART_STYLE}|{kind}|{ticker}|{last_bar}|{float(next_price):.4f}|{window}"
+    if path:
+        raw += "|" + ",".join(f"{float(p):.4f}" for p in path)
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def chart_paths(
+    ticker: str, last_bar: str, next_price: float, window: int, path: Sequence[float] = ()
+) -> Dict[str, str]:
+    """Relative (to BASE_DIR) paths for every chart kind of one forecast ("" = no such chart)."""
+    paths = {}
+    for kind, field in CHART_FIELDS.items():
+        if kind == "horizon":
+            if len(path) < 2:
+                paths[field] = ""
+                continue
+            key = chart_key(kind, ticker, last_bar, next_price, window, path)
+        else:
+            key = chart_key(kind, ticker, last_bar, next_price, window)
+        paths[field] = os.path.join(PLOT_DIR, f"{ticker}_{key}_{kind}.png")
+    return paths
+
+
+# ─── Rendering ──────────────────────────────────────────────────
+# Figures are built once per thread and reused: a render only swaps the line
+# data and titles, then draws straight into a PNG buffer.  Nothing touches
+# pyplot's global figure manager, so executor threads never share state.
+FIGSIZE = (10, 6)
+DPI = 100
+
+_templates = threading.local()
+
+
+class _Template:
+    def __init__(self, fig: Figure, ax: Axes, lines: Tuple[Line2D, ...]):
+        self.fig = fig
+        self.canvas = FigureCanvasAgg(fig)
+        self.ax = ax
+        self.lines = lines
+
+
+def _base_figure(xlabel: str = "", ylabel: str = "") -> Tuple[Figure, Axes]:
+    fig = Figure(figsize=FIGSIZE, dpi=DPI)
+    fig.subplots_adjust(left=0.08, right=0.97, top=0.93, bottom=0.15)
+    ax = fig.add_subplot(111)
+    ax.xaxis_date()
+    locator = mdates.AutoDateLocator()
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    ax.tick_params(axis="x", labelrotation=30)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(alpha=0.3)
+    return fig, ax
+
+
+def _build_close() -> _Template:
+    fig, ax = _base_figure("Date", "Price ($)")
+    (line,) = ax.plot([], [], linewidth=2, label="Close")
+    return _Template(fig, ax, (line,))
+
+
+def _build_cmp() -> _Template:
+    fig, ax = _base_figure()
+    (actual,) = ax.plot([], [], linewidth=2, label="Actual")
+    (predicted,) = ax.plot([], [], linestyle="", marker="o", markersize=10,
+                           color="C1", label="Predicted", zorder=5)
+    ax.legend(loc="upper left")
+    return _Template(fig, ax, (actual, predicted))
+
+
+def _build_horizon() -> _Template:
+    fig, ax = _base_figure("Date", "Price ($)")
+    (actual,) = ax.plot([], [], linewidth=2, label="Actual")
+    (forecast,) = ax.plot([], [], linestyle="--", marker="o", markersize=4,
+                          color="C1", label="Forecast", zorder=5)
+    ax.legend(loc="upper left")
+    return _Template(fig, ax, (actual, forecast))
+
+
+_BUILDERS = {"close": _build_close, "cmp": _build_cmp, "horizon": _build_horizon}
+
+RENDER_SECONDS = {
+    kind: metrics.histogram(
+        "chart_render_seconds", "Time to draw and encode one chart PNG",
+        buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5), labels={"kind": kind},
+    )
+    for kind in _BUILDERS
+}
+
+
+def _template(kind: str) -> _Template:
+    cache = getattr(_templates, "by_kind", None)
+    if cache is None:
+        cache = _templates.by_kind = {}
+    if kind not in cache:
+        cache[kind] = _BUILDERS[kind]()
+    return cache[kind]
+
+
+def downsample_minmax(x: np.ndarray, y: np.ndarray, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a series to at most ``max_points`` while keeping its visual
+    envelope: ``x`` is split into equal‑width columns (roughly one per output
+    pixel) and only each column's lowest and highest point, plus the two
+    endpoints, are kept — in their original order.  ``x`` must be sorted.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if max_points < 4 or n <= max_points:
+        return x, y
+
+    columns = (max_points - 2) // 2
+    span = x[-1] - x[0]
+    if span > 0:
+        col = ((x - x[0]) * (columns / span)).astype(np.intp)
+        np.minimum(col, columns - 1, out=col)
+    else:
+        col = np.zeros(n, dtype=np.intp)
+
+    # x is sorted, so every column is one contiguous run of points
+    starts = np.flatnonzero(np.r_[True, col[1:] != col[:-1]])
+    run = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, n]))
+    picks = [[0, n - 1]]
+    for extreme in (np.minimum, np.maximum):
+        hits = np.flatnonzero(y == extreme.reduceat(y, starts)[run])
+        picks.append(hits[np.r_[True, run[hits[1:]] != run[hits[:-1]]]])   # first hit per run
+    keep = np.unique(np.concatenate(picks))
+    return x[keep], y[keep]
+
+
+def _dates(index) -> np.ndarray:
+    return mdates.date2num(pd.DatetimeIndex(index).to_numpy())
+
+
+def _draw(tpl: _Template, title: str) -> bytes:
+    tpl.ax.set_title(title)
+    tpl.ax.relim()
+    tpl.ax.autoscale_view()
+    buf = io.BytesIO()
+    tpl.canvas.print_png(buf)
+    return buf.getvalue()
+
+
+def render_png(
+    kind: str,
+    ticker: str,
+    df: "pd.DataFrame",
+    next_price: float,
+    window: int,
+    max_points: Optional[int] = None,
+    path: Optional[Sequence[float]] = None,
+) -> bytes:
+    """
+    PNG bytes for one chart; ``max_points`` defaults to ``CHART_MAX_POINTS``.
+    The horizon chart needs the forecast ``path`` (prices, one per day ahead).
+    """
+    if kind not in _BUILDERS:
+        raise ChartUnavailable(f"Unknown chart kind {kind!r}")
+    if kind == "horizon" and not path:
+        raise ChartUnavailable("A horizon chart needs a multi‑step forecast")
+    with RENDER_SECONDS[kind].time():
+        return _render(_template(kind), kind, ticker, df, next_price, window, max_points, path)
+
+
+def _render(tpl: _Template, kind, ticker, df, next_price, window, max_points, path=None) -> bytes:
+    if kind == "close":
+        (line,) = tpl.lines
+        if max_points is None:
+            max_points = settings.CHART_MAX_POINTS
+        line.set_data(*downsample_minmax(_dates(df.index), df["Close"].to_numpy(dtype=float), max_points))
+        return _draw(tpl, f"{ticker} Close Price History")
+
+    if kind == "horizon":
+        actual, forecast = tpl.lines
+        closes = df["Close"].to_numpy(dtype=float)[-window:]
+        last = pd.Timestamp(df.index[-1])
+        actual.set_data(_dates(df.index[-window:]), closes)
+        ahead = trading_days_after(last.date(), len(path))
+        forecast.set_data(_dates([last.tz_localize(None)] + ahead), [closes[-1], *path])
+        return _draw(tpl, f"{ticker} – {len(path)}‑Day Forecast")
+
+    actual, predicted = tpl.lines
+    last = pd.Timestamp(df.index[-1])
+    actual.set_data(
+        _dates(pd.date_range(end=last, periods=window)),
+        df["Close"].to_numpy(dtype=float)[-window:],
+    )
+    predicted.set_data(_dates([last + pd.Timedelta(days=1)]), [next_price])
+    return _draw(tpl, f"{ticker} – Last {window} Days vs Prediction")
+
+
+def _write_atomic(full_path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    tmp = f"{full_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, full_path)
+
+
+# ─── Lazy access ────────────────────────────────────────────────
+_renders = SingleFlight("charts")
+
+
+async def ensure_chart_async(prediction, kind: str, df: Optional["pd.DataFrame"] = None) -> str:
+    """
+    Return the chart's path (relative to BASE_DIR), rendering it first if
+    needed.  ``df`` skips the price‑store lookup when the caller has it.
+    """
+    field = CHART_FIELDS.get(kind)
+    rel_path = getattr(prediction, field, "") if field else ""
+    if not rel_path:
+        raise ChartUnavailable(f"No {kind} chart for prediction {prediction.pk}")
+    full_path = os.path.join(settings.BASE_DIR, rel_path)
+    if os.path.exists(full_path):
+        return rel_path
+
+    async def render():
+        meta = prediction.metrics or {}
+        window = meta.get("window", 60)
+        last_bar = meta.get("last_bar")
+        history = df
+        if history is None:
+            history = await sync_to_async(read_history)(prediction.ticker, end=last_bar)
+        if len(history) < window:
+            raise ChartUnavailable(f"Price history for {prediction.ticker} is no longer stored")
+        loop = asyncio.get_running_loop()
+        png = await loop.run_in_executor(
+            None, render_png, kind, prediction.ticker, history, float(prediction.next_price), window,
+            None, meta.get("path"),
+        )
+        await loop.run_in_executor(None, _write_atomic, full_path, png)
+
+    await _renders.do(rel_path, render)
+    return rel_path
+
+
+def ensure_chart(prediction, kind: str) -> str:
+    """Sync wrapper for views."""
+    return async_to_sync(ensure_chart_async)(prediction, kind)
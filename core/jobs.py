@@ -0,0 +1,244 @@
+# core/jobs.py
+"""
+Broker‑less prediction queue for the inference worker.
+
+The web process only inserts a ``PredictionJob`` row and returns its id.
+``manage.py inferenceworker`` claims queued rows with a conditional
+``UPDATE … WHERE status='queued'`` (portable across SQLite and Postgres;
+exactly one worker wins each row), runs the normal prediction pipeline and
+stores the result on the job.  Running N jobs concurrently in one worker
+process lets them share the loaded model and its micro‑batcher.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+from datetime import timedelta
+from typing import Awaitable, Callable, Optional
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from . import metrics
+from .models import PredictionJob
+from .progress import Progress, StageEvent
+
+logger = logging.getLogger(__name__)
+
+CLAIMED = metrics.counter("inference_jobs_claimed_total", "Jobs picked up by a worker")
+SUCCEEDED = metrics.counter("inference_jobs_succeeded_total", "Jobs that produced a prediction")
+FAILED = metrics.counter("inference_jobs_failed_total", "Jobs that raised or timed out")
+REQUEUED = metrics.counter("inference_jobs_requeued_total", "Stale running jobs put back in the queue")
+JOB_SECONDS = metrics.histogram(
+    "inference_job_seconds", "Claim → finish time per job",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+
+def enqueue(user, ticker: str, charts: bool = True, horizon: int = 1) -> PredictionJob:
+    return PredictionJob.objects.create(user=user, ticker=ticker.upper(), charts=charts, horizon=horizon)
+
+
+async def aenqueue(user, ticker: str, charts: bool = True, horizon: int = 1) -> PredictionJob:
+    return await PredictionJob.objects.acreate(
+        user=user, ticker=ticker.upper(), charts=charts, horizon=horizon
+    )
+
+
+def claim(worker: str) -> Optional[PredictionJob]:
+    """Oldest queued job, now marked running for ``worker``; ``None`` if idle."""
+    while True:
+        job_id = (
+            PredictionJob.objects.filter(status=PredictionJob.QUEUED)
+            .order_by("created", "pk")
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        won = PredictionJob.objects.filter(pk=job_id, status=PredictionJob.QUEUED).update(
+            status=PredictionJob.RUNNING,
+            worker=worker,
+            started_at=timezone.now(),
+            attempts=F("attempts") + 1,
+            progress=[],
+        )
+        if won:
+            CLAIMED.inc()
+            return PredictionJob.objects.select_related("user").get(pk=job_id)
+        # another worker got there first – try the next one
+
+
+def requeue_stale(older_than: Optional[float] = None, max_attempts: Optional[int] = None) -> int:
+    """
+    Put back jobs left ``running`` by a worker that died mid‑job.  Jobs
+    already claimed ``max_attempts`` times are failed instead, so one that
+    kills every worker that runs it does not take the fleet down forever.
+    """
+    older_than = settings.INFERENCE_JOB_TIMEOUT * 2 if older_than is None else older_than
+    max_attempts = settings.INFERENCE_MAX_ATTEMPTS if max_attempts is None else max_attempts
+    now = timezone.now()
+    stale = PredictionJob.objects.filter(
+        status=PredictionJob.RUNNING, started_at__lt=now - timedelta(seconds=older_than)
+    )
+    given_up = stale.filter(attempts__gte=max_attempts).update(
+        status=PredictionJob.FAILED,
+        error=f"gave up after {max_attempts} attempts: the worker stopped mid‑job each time",
+        finished_at=now,
+    )
+    if given_up:
+        logger.error("Failed %d job(s) that never finished in %d attempts", given_up, max_attempts)
+        FAILED.inc(given_up)
+    count = stale.update(status=PredictionJob.QUEUED, worker="")
+    REQUEUED.inc(count)
+    return count
+
+
+def _finish(job: PredictionJob, **fields) -> None:
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.finished_at = timezone.now()
+    job.save(update_fields=[*fields, "finished_at"])
+
+
+def _progress_recorder(job: PredictionJob):
+    """Listener that keeps ``job.progress`` current for status polls and the SSE stream."""
+    async def record(event) -> None:
+        job.progress = job.progress + [event.as_dict()]
+        await PredictionJob.objects.filter(pk=job.pk).aupdate(progress=job.progress)
+    return record
+
+
+async def run_job_async(job: PredictionJob, timeout: Optional[float] = None) -> PredictionJob:
+    """Run a claimed job to completion; failures are recorded, not raised."""
+    # imported here so enqueueing (web, thin bot) never loads the model stack
+    from .utils import run_prediction_async
+
+    timeout = settings.INFERENCE_JOB_TIMEOUT if timeout is None else timeout
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    progress = Progress(_progress_recorder(job))
+    try:
+        prediction = await asyncio.wait_for(
+            run_prediction_async(
+                job.user, job.ticker, charts=job.charts, progress=progress, horizon=job.horizon
+            ),
+            timeout,
+        )
+    except Exception as exc:
+        if isinstance(exc, asyncio.TimeoutError):
+            exc = TimeoutError(f"prediction took longer than {timeout:g}s")
+        logger.warning("Job %s (%s) failed: %s", job.pk, job.ticker, exc)
+        await sync_to_async(_finish)(job, status=PredictionJob.FAILED, error=str(exc))
+        FAILED.inc()
+    else:
+        await sync_to_async(_finish)(job, status=PredictionJob.DONE, prediction=prediction)
+        SUCCEEDED.inc()
+    JOB_SECONDS.observe(loop.time() - started)
+    return job
+
+
+async def wait_for_job(
+    pk: int,
+    listener: Optional[Callable[[StageEvent], Awaitable[None]]] = None,
+    timeout: Optional[float] = None,
+    poll_interval: float = 0.25,
+) -> PredictionJob:
+    """
+    Poll a job until a worker finishes it, passing its stage events to
+    ``listener`` as they are recorded.  Returns the job (with its
+    prediction) however it ended; raises ``TimeoutError`` if it is still
+    unfinished after ``timeout`` (default: three job timeouts).
+    """
+    timeout = settings.INFERENCE_JOB_TIMEOUT * 3 if timeout is None else timeout
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    seen = 0
+    while True:
+        job = await PredictionJob.objects.select_related("prediction").aget(pk=pk)
+        if listener is not None:
+            for event in job.progress[seen:]:
+                await listener(StageEvent(**event))
+        seen = len(job.progress)
+        if job.finished:
+            return job
+        if loop.time() >= deadline:
+            raise TimeoutError(f"job {pk} not finished after {timeout:g}s")
+        await asyncio.sleep(poll_interval)
+
+
+def default_worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class InferenceWorker:
+    """
+    ``concurrency`` job slots on one event loop.  Each slot claims a job,
+    runs it and claims the next; idle slots poll every ``poll_interval``.
+    Every ``requeue_interval`` seconds (default ``INFERENCE_JOB_TIMEOUT``)
+    jobs orphaned by dead workers are put back (``requeue_stale``).
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 2,
+        poll_interval: float = 0.5,
+        name: Optional[str] = None,
+        requeue_interval: Optional[float] = None,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.name = name or default_worker_name()
+        self.requeue_interval = settings.INFERENCE_JOB_TIMEOUT if requeue_interval is None else requeue_interval
+        self.processed = 0
+
+    async def _requeuer(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), self.requeue_interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await sync_to_async(requeue_stale)()
+            except Exception:
+                logger.exception("requeue_stale failed; retrying in %gs", self.requeue_interval)
+
+    async def _slot(self, index: int, stop: asyncio.Event, drain: bool) -> None:
+        worker = f"{self.name}/{index}"
+        while not stop.is_set():
+            job = await sync_to_async(claim)(worker)
+            if job is None:
+                if drain:
+                    return
+                try:
+                    await asyncio.wait_for(stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await run_job_async(job)
+            self.processed += 1
+
+    async def run(self, stop: Optional[asyncio.Event] = None, drain: bool = False) -> int:
+        """
+        Process jobs until ``stop`` is set (a job already started is
+        finished first).  ``drain=True`` returns once the queue is empty.
+        """
+        stop = stop or asyncio.Event()
+        await sync_to_async(requeue_stale)()
+        requeuer = asyncio.create_task(self._requeuer(stop))
+        try:
+            await asyncio.gather(*(self._slot(i, stop, drain) for i in range(self.concurrency)))
+        finally:
+            requeuer.cancel()
+        return self.processed
+
+
+def run_pending(concurrency: int = 1) -> int:
+    """Process every queued job in‑process and return how many ran (tests, dev)."""
+    return async_to_sync(InferenceWorker(concurrency, name="inline").run)(drain=True)
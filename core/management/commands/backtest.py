@@ -0,0 +1,65 @@
+"""
+Backtest the model over stored price histories (see core.backtest).
+"""
+
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.backtest import backtest, parse_horizons
+from core.validation import parse_ticker
+
+
+class Command(BaseCommand):
+    help = "Out‑of‑sample accuracy of the model over each ticker's history, per forecast horizon."
+
+    def add_arguments(self, parser):
+        parser.add_argument("tickers", nargs="+", help="Ticker symbols (e.g. AAPL MSFT)")
+        parser.add_argument(
+            "--horizons", type=str, default=",".join(map(str, settings.BACKTEST_HORIZONS)),
+            help="Comma‑separated days ahead to score (default: %(default)s)"
+        )
+        parser.add_argument(
+            "--stride", type=int, default=settings.BACKTEST_STRIDE,
+            help="Forecast from every N‑th day (default: %(default)s; 1 = every day)"
+        )
+        parser.add_argument(
+            "--refresh", action="store_true",
+            help="Recompute even if a cached report exists"
+        )
+        parser.add_argument("--json", type=str, default=None, metavar="PATH", help="Also write the reports here")
+
+    def handle(self, *args, **options):
+        try:
+            horizons = parse_horizons(options["horizons"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options["stride"] < 1:
+            raise CommandError("--stride must be at least 1")
+
+        reports = []
+        for ticker in options["tickers"]:
+            try:
+                report = backtest(parse_ticker(ticker), horizons, options["stride"], options["refresh"])
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"{ticker.upper()}: {e}"))
+                continue
+            reports.append(report.as_dict())
+            self.stdout.write(self.style.SUCCESS(
+                f"{report.ticker}: {report.origins} forecasts from {report.first_origin[:10]} "
+                f"to {report.last_origin[:10]} (every {report.stride} day(s), {report.seconds:.2f}s)"
+            ))
+            self.stdout.write(f"  {'days':>4}  {'n':>5}  {'MAE':>9}  {'RMSE':>9}  {'MAPE%':>6}  "
+                              f"{'R²':>6}  {'dir%':>5}  {'naive':>9}  {'skill':>6}")
+            for h in report.horizons:
+                self.stdout.write(
+                    f"  {h.horizon:>4}  {h.samples:>5}  {h.mae:>9.4f}  {h.rmse:>9.4f}  {h.mape:>6.2f}  "
+                    f"{h.r2:>6.3f}  {h.direction * 100:>5.1f}  {h.naive_rmse:>9.4f}  {h.skill:>6.3f}"
+                )
+
+        if options["json"]:
+            with open(options["json"], "w") as f:
+                json.dump(reports, f, indent=2)
+        if not reports:
+            raise CommandError("No ticker could be backtested")
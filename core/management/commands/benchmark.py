@@ -0,0 +1,689 @@
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import charts
+from core.rollout import rollout
+
+FIXTURE_DIR = Path(__file__).resolve().parents[2] / "testdata" / "benchmark"
+
+
+def _timings(fn, repeat: int, warmup: int = 1) -> list:
+    for _ in range(warmup):
+        fn()
+    out = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - started)
+    return out
+
+
+def _synthetic_history(points: int, freq: str = "B", seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, points)))
+    index = pd.date_range(end=pd.Timestamp.today().normalize(), periods=points, freq=freq, name="Date")
+    return pd.DataFrame({"Close": close}, index=index)
+
+
+def _peak_rss_bytes() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024     # Linux reports KiB
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=settings.BASE_DIR, timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def _fixture_histories(names: str = "") -> dict:
+    """
+    Daily bars from the chart‑API responses in testdata/benchmark (one
+    ``chart_<SYMBOL>.json`` each; ``--record`` adds real ones).  The
+    bundled BENCH series is a seeded random walk in Yahoo's response shape.
+    """
+    from core.market_data import _chart_result, parse_chart
+
+    wanted = {n.strip().upper() for n in names.split(",") if n.strip()}
+    out = {}
+    for path in sorted(FIXTURE_DIR.glob("chart_*.json")):
+        symbol = path.stem.split("_", 1)[1].upper()
+        if wanted and symbol not in wanted:
+            continue
+        out[symbol] = parse_chart(_chart_result(json.loads(path.read_text()), symbol))
+    if not out:
+        raise CommandError(f"No price fixtures in {FIXTURE_DIR}" + (f" for {sorted(wanted)}" if wanted else ""))
+    return out
+
+
+# Runs in a fresh interpreter: boot Django, optionally warm up, then time two predictions.
+_COLDSTART_CHILD = """
+import json, os, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from asgiref.sync import async_to_sync
+from django.urls import get_resolver
+get_resolver().url_patterns          # imports the views, as a server does at startup
+from core import utils
+out = {}
+if sys.argv[1] == "warm":
+    from core.warmup import warmup
+    warmup.run()
+    out["warmup"] = warmup.timings
+out["boot_seconds"] = time.perf_counter() - started
+from core.management.commands.benchmark import _fixture_histories
+symbol, df = next(iter(_fixture_histories(sys.argv[2]).items()))
+for label in ("first_seconds", "second_seconds"):
+    t = time.perf_counter()
+    async_to_sync(utils.compute_forecast_async)(symbol, df, "coldstart")
+    out[label] = time.perf_counter() - t
+out["to_first_answer_seconds"] = out["boot_seconds"] + out["first_seconds"]
+print(json.dumps(out))
+"""
+
+
+# Runs in a fresh interpreter: what starting `manage.py telegrambot` costs before it polls.
+_BOTSTART_CHILD = """
+import json, sys, time
+out = {}
+t = time.perf_counter()
+import django
+django.setup()
+from core.model_registry import current_rss_bytes as rss   # ru_maxrss would include the parent's
+out["setup_seconds"] = time.perf_counter() - t
+t = time.perf_counter()
+from core.management.commands.telegrambot import Command
+out["import_seconds"] = time.perf_counter() - t
+t = time.perf_counter()
+from telegram.ext import ApplicationBuilder
+ApplicationBuilder().token("123456:benchmark").build()
+out["build_seconds"] = time.perf_counter() - t
+out["startup_seconds"] = out["setup_seconds"] + out["import_seconds"] + out["build_seconds"]
+out["startup_rss_bytes"] = rss()
+out["heavy_modules"] = sorted(m for m in ("numpy", "pandas", "sklearn", "matplotlib", "yfinance",
+                                          "tensorflow", "keras") if m in sys.modules)
+t = time.perf_counter()
+import core.utils
+out["prediction_stack_seconds"] = time.perf_counter() - t
+out["prediction_stack_rss_bytes"] = rss()
+print(json.dumps(out))
+"""
+
+
+def _top_imports(importtime_log: str, limit: int = 10) -> list:
+    """Slowest top‑level imports from ``python -X importtime`` output."""
+    top = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if name.startswith("  ") or not cumulative.strip().isdigit():   # nested, or the header
+            continue
+        top.append((int(cumulative) / 1e6, name.strip()))
+    return [{"module": n, "seconds": round(s, 3)} for s, n in sorted(top, reverse=True)[:limit]]
+
+
+def _legacy_pyplot_render(ticker: str, df: pd.DataFrame, next_price: float, window: int, out_dir: str) -> None:
+    """The pre‑template path: fresh pyplot figures, tight bbox, savefig to disk."""
+    import matplotlib.pyplot as plt
+
+    fig1 = plt.figure(figsize=(10, 6))
+    ax1 = fig1.add_subplot(111)
+    ax1.plot(df.index, df["Close"], linewidth=2, label="Close")
+    ax1.set_title(f"{ticker} Close Price History")
+    ax1.set_xlabel("Date")
+    ax1.set_ylabel("Price ($)")
+    ax1.grid(alpha=0.3)
+    fig1.autofmt_xdate()
+
+    fig2 = plt.figure(figsize=(10, 6))
+    ax2 = fig2.add_subplot(111)
+    dates = pd.date_range(end=df.index[-1], periods=window)
+    ax2.plot(dates, df["Close"].to_numpy()[-window:], linewidth=2, label="Actual")
+    ax2.scatter(df.index[-1] + pd.Timedelta(days=1), next_price, s=100, label="Predicted", zorder=5)
+    ax2.set_title(f"{ticker} – Last {window} Days vs Prediction")
+    ax2.legend()
+    ax2.grid(alpha=0.3)
+    fig2.autofmt_xdate()
+
+    for fig, kind in ((fig1, "close"), (fig2, "cmp")):
+        try:
+            fig.savefig(os.path.join(out_dir, f"legacy_{kind}.png"), dpi=100, bbox_inches="tight")
+        finally:
+            plt.close(fig)
+
+
+class Command(BaseCommand):
+    help = "Micro‑benchmarks for the prediction pipeline."
+
+    SUITES = ("render", "load", "pipeline", "coldstart", "botstart", "backtest")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--suite", choices=self.SUITES, default="render",
+            help="Which benchmark to run (default: render)"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20,
+            help="Timed iterations per case (default: 20)"
+        )
+        parser.add_argument(
+            "--points", type=int, default=2520,
+            help="Bars in the synthetic series (default: 2520 ≈ 10y of daily bars)"
+        )
+        parser.add_argument(
+            "--freq", type=str, default="B",
+            help="Bar spacing as a pandas frequency, e.g. 1min for intraday (default: B)"
+        )
+        parser.add_argument(
+            "--json", type=str, default="",
+            help="Also write the results to this JSON file"
+        )
+        parser.add_argument(
+            "--compare", type=str, default="",
+            help="Results JSON of an earlier run to print p50/p99 changes against"
+        )
+
+        pipeline = parser.add_argument_group("pipeline suite (in process, recorded bars, no network)")
+        pipeline.add_argument(
+            "--fixtures", type=str, default="",
+            help="Comma‑separated fixture symbols to use (default: all in testdata/benchmark)"
+        )
+        pipeline.add_argument(
+            "--levels", type=str, default="1,4,16",
+            help="Concurrency levels for the throughput runs (default: 1,4,16)"
+        )
+        pipeline.add_argument(
+            "--boots", type=int, default=3,
+            help="Fresh processes per mode in the coldstart suite (default: 3)"
+        )
+        pipeline.add_argument(
+            "--record", type=str, default="",
+            help="Fetch 10y of daily bars for these tickers from Yahoo into fixtures, then exit"
+        )
+
+        load = parser.add_argument_group("load suite (HTTP against a running server)")
+        load.add_argument(
+            "--url", type=str, default="http://127.0.0.1:8000",
+            help="Base URL of the server under test"
+        )
+        load.add_argument(
+            "--endpoint", choices=("predict", "list"), default="predict",
+            help="POST /api/v1/predict/ or GET /api/v1/predictions/ (default: predict)"
+        )
+        load.add_argument(
+            "--tickers", type=str, default="AAPL",
+            help="Comma‑separated tickers to cycle through for predict"
+        )
+        load.add_argument(
+            "--concurrency", type=int, default=32,
+            help="Requests in flight (default: 32)"
+        )
+        load.add_argument(
+            "--requests", type=int, default=500,
+            help="Total requests (default: 500)"
+        )
+        load.add_argument(
+            "--warmup", type=int, default=20,
+            help="Unmeasured requests sent first, e.g. to load the model (default: 20)"
+        )
+        load.add_argument(
+            "--users", type=int, default=8,
+            help="Distinct API users the requests are spread over (default: 8)"
+        )
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1")
+        if options["record"]:
+            return self.record(options["record"])
+        self.results = []
+        self.meta = {}
+        getattr(self, f"suite_{options['suite']}")(options)
+
+        summary = {
+            "suite": options["suite"],
+            "revision": _git_revision(),
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "repeat": options["repeat"],
+            "peak_rss_bytes": _peak_rss_bytes(),
+            **self.meta,
+            "cases": self.results,
+        }
+        self.stdout.write(f"  peak RSS {summary['peak_rss_bytes'] / 2**20:.0f} MiB")
+        if options["compare"]:
+            self.compare(options["compare"], summary)
+        if options["json"]:
+            Path(options["json"]).write_text(json.dumps(summary, indent=2) + "\n")
+            self.stdout.write(f"  results written to {options['json']}")
+
+    def report(self, label: str, timings: list, **extra) -> float:
+        ms = sorted(t * 1000 for t in timings)
+        p50 = statistics.median(ms)
+        p99 = self.percentile(ms, 99)
+        self.stdout.write(
+            f"  {label:<28} mean {statistics.fmean(ms):8.1f} ms   "
+            f"p50 {p50:8.1f} ms   p99 {p99:8.1f} ms   max {ms[-1]:8.1f} ms"
+            + "".join(f"   {k} {v:g}" for k, v in extra.items() if isinstance(v, float))
+        )
+        if hasattr(self, "results"):
+            self.results.append({
+                "case": label, "runs": len(ms), "mean_ms": statistics.fmean(ms),
+                "p50_ms": p50, "p99_ms": p99, "max_ms": ms[-1],
+                "peak_rss_bytes": _peak_rss_bytes(), **extra,
+            })
+        return p50
+
+    def compare(self, path: str, summary: dict) -> None:
+        try:
+            before = {c["case"]: c for c in json.loads(Path(path).read_text())["cases"]}
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"Cannot read {path}: {exc}")
+        self.stdout.write(f"  vs {path}:")
+        for case in summary["cases"]:
+            old = before.get(case["case"])
+            if old is None:
+                continue
+            change = "   ".join(
+                f"{q[:3]} {100 * (case[q] / old[q] - 1):+6.1f}%" for q in ("p50_ms", "p99_ms") if old[q]
+            )
+            self.stdout.write(f"    {case['case']:<26} {change}")
+
+    @staticmethod
+    def percentile(values: list, q: float) -> float:
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+    # ── suites ──────────────────────────────────────────────────
+    def suite_render(self, options):
+        """Both charts of one forecast, rendered and written to disk."""
+        import matplotlib
+        matplotlib.use("Agg")
+
+        df = _synthetic_history(options["points"], options["freq"])
+        window, ticker = 60, "BENCH"
+        next_price = float(df["Close"].iloc[-1]) * 1.01
+        repeat = options["repeat"]
+
+        self.stdout.write(f"render · {len(df)} points @ {options['freq']} · {repeat} runs (close + cmp chart)")
+        with tempfile.TemporaryDirectory() as out_dir:
+            def legacy():
+                _legacy_pyplot_render(ticker, df, next_price, window, out_dir)
+
+            def templated(max_points=None):
+                for kind in ("close", "cmp"):
+                    png = charts.render_png(kind, ticker, df, next_price, window, max_points)
+                    charts._write_atomic(os.path.join(out_dir, f"fast_{kind}.png"), png)
+
+            old = self.report("pyplot + savefig(tight)", _timings(legacy, repeat))
+            full = self.report("template, every point", _timings(lambda: templated(0), repeat))
+            new = self.report(
+                f"template, ≤{settings.CHART_MAX_POINTS} points", _timings(templated, repeat)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"  speed‑up (p50): {old / full:.1f}× templates, {old / new:.1f}× with downsampling"
+        ))
+
+    def suite_load(self, options):
+        """Closed‑loop HTTP load: N clients, each sending its next request when the last returns."""
+        try:
+            import httpx
+        except ImportError:
+            raise CommandError("The load suite needs httpx (pip install httpx)")
+        from django.contrib.auth.models import User
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        tokens = []
+        for i in range(max(1, options["users"])):
+            user, _ = User.objects.get_or_create(username=f"loadtest_{i}")
+            tokens.append(str(RefreshToken.for_user(user).access_token))
+        tickers = [t.strip().upper() for t in options["tickers"].split(",") if t.strip()]
+        total, concurrency = options["requests"], options["concurrency"]
+        endpoint = options["endpoint"]
+
+        async def run(total):
+            latencies, statuses = [], Counter()
+            next_index = iter(range(total))
+            limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+            async with httpx.AsyncClient(base_url=options["url"], limits=limits, timeout=120) as client:
+                async def one(i):
+                    headers = {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+                    started = time.perf_counter()
+                    if endpoint == "predict":
+                        res = await client.post("/api/v1/predict/", headers=headers,
+                                                json={"ticker": tickers[i % len(tickers)], "charts": False})
+                    else:
+                        res = await client.get("/api/v1/predictions/", headers=headers)
+                    latencies.append((res.status_code, time.perf_counter() - started))
+                    statuses[res.status_code] += 1
+
+                async def client_loop():
+                    for i in next_index:
+                        try:
+                            await one(i)
+                        except httpx.HTTPError as exc:
+                            statuses[type(exc).__name__] += 1
+
+                started = time.perf_counter()
+                await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+                return time.perf_counter() - started, latencies, statuses
+
+        self.stdout.write(
+            f"load · {endpoint} · {options['url']} · {total} requests · concurrency {concurrency}"
+        )
+        if options["warmup"]:
+            asyncio.run(run(options["warmup"]))
+        wall, latencies, statuses = asyncio.run(run(total))
+        self.stdout.write(f"  throughput {len(latencies) / wall:8.1f} req/s")
+        for label, keep in (("all", lambda code: True), ("2xx", lambda code: 200 <= code < 300)):
+            ms = [t * 1000 for code, t in latencies if keep(code)]
+            if ms:
+                self.stdout.write(
+                    f"  {label:<4} p50 {self.percentile(ms, 50):7.1f} ms   "
+                    f"p99 {self.percentile(ms, 99):7.1f} ms   max {max(ms):7.1f} ms"
+                )
+                self.results.append({
+                    "case": f"{endpoint} {label} @{concurrency}", "runs": len(ms),
+                    "mean_ms": statistics.fmean(ms), "p50_ms": self.percentile(ms, 50),
+                    "p99_ms": self.percentile(ms, 99), "max_ms": max(ms),
+                    "concurrency": concurrency, "throughput_per_s": len(latencies) / wall,
+                })
+        self.stdout.write("  status   " + "  ".join(f"{k}: {v}" for k, v in sorted(statuses.items(), key=str)))
+
+    def suite_pipeline(self, options):
+        """
+        The prediction pipeline in this process: its pieces, the whole
+        ``run_prediction_async`` at several concurrency levels and
+        ``PredictionListView``, on recorded bars with the network mocked out.
+        Uses the configured database and model, but only under tickers no
+        real symbol can take (``AAPL_0``, ``AAPL_1`` …); those rows are deleted
+        afterwards.  Every cache alias is swapped for a private LocMem cache
+        for the run, so fixture forecasts never reach the real cache.
+        """
+        from asgiref.sync import async_to_sync
+        from django.contrib.auth.models import User
+        from django.test import RequestFactory, override_settings
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        from core import utils
+        from core.models import PriceSeries, Prediction
+        from core.prediction_cache import forecast_cache
+        from core.price_store import PriceStore
+        from core.views import PredictionListView
+
+        try:
+            levels = sorted({int(n) for n in options["levels"].split(",") if n.strip()})
+        except ValueError:
+            raise CommandError("--levels takes comma‑separated integers, e.g. 1,4,16")
+        if not levels or levels[0] < 1:
+            raise CommandError("--levels must be positive")
+        histories = _fixture_histories(options["fixtures"])
+        repeat = options["repeat"]
+
+        # every ticker is served from a fixture: BENCH_0, BENCH_1 … share its bars.  The "_"
+        # fails core.validation.parse_ticker, so these never collide with a real symbol's rows.
+        symbols = list(histories)
+        pool = [f"{symbols[i % len(symbols)]}_{i}" for i in range(max(len(symbols), max(levels)))]
+        caches = {
+            alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": f"benchmark-{alias}"}
+            for alias in settings.CACHES
+        }
+
+        def downloader(ticker, interval="1d", period=None, start=None):
+            df = histories[ticker.split("_", 1)[0]]
+            return df[df.index >= pd.Timestamp(start)] if start else df
+
+        async def miss(key, validate=None):
+            return None
+
+        async def offline(ticker):
+            raise CommandError(f"Price store failed for {ticker}; the benchmark never calls Yahoo")
+
+        df = histories[symbols[0]]
+        self.stdout.write(
+            f"pipeline · fixtures {', '.join(f'{k} ({len(v)} bars)' for k, v in histories.items())} · "
+            f"{repeat} runs · concurrency {', '.join(map(str, levels))}"
+        )
+        user, created = User.objects.get_or_create(username="benchmark_pipeline")
+        store = PriceStore(downloader=downloader)
+        try:
+            with override_settings(CACHES=caches):
+                with mock.patch.object(utils, "price_store", store), \
+                        mock.patch.object(utils, "fetch_yahoo_direct_async", offline):
+                    # model load and price back‑fill happen once, outside the timings
+                    started = time.perf_counter()
+                    utils.registry.get()
+                    self.meta["model_load_seconds"] = time.perf_counter() - started
+                    self.meta["model_version"] = utils.registry.entry().version
+                    for ticker in pool:
+                        store.get_history(ticker)
+                    self.pieces(df, repeat)
+
+                    def predict(ticker):
+                        return async_to_sync(utils.run_prediction_async)(user, ticker, charts=False)
+
+                    predict(pool[0])
+                    self.report("run_prediction (cached)", _timings(lambda: predict(pool[0]), repeat, warmup=0))
+                    with mock.patch.object(forecast_cache, "aget", miss):
+                        self.report("run_prediction (cold)", _timings(lambda: predict(pool[0]), repeat, warmup=0))
+                        for level in levels:
+                            self.concurrent(user, pool[:level], level, max(repeat, 2 * level))
+
+                token = str(RefreshToken.for_user(user).access_token)
+                request = RequestFactory().get("/api/v1/predictions/", HTTP_AUTHORIZATION=f"Bearer {token}")
+                view = PredictionListView.as_view()
+                rows = Prediction.objects.filter(user=user).count()
+                self.report(f"PredictionListView ({rows} rows)",
+                            _timings(lambda: async_to_sync(view)(request), repeat), rows=rows)
+        finally:
+            Prediction.objects.filter(user=user, ticker__in=pool).delete()
+            PriceSeries.objects.filter(ticker__in=pool).delete()
+            if created:
+                user.delete()
+
+    def suite_coldstart(self, options):
+        """
+        Time to first prediction in a freshly started process, without and
+        with the boot‑time warm‑up (core.warmup).  "boot" is the time until
+        the process would accept traffic – after the warm‑up when there is one.
+        """
+        import sys
+
+        boots = max(1, options["boots"])
+        fixtures = options["fixtures"] or next(iter(_fixture_histories()))
+        env = dict(os.environ, MODEL_WARMUP="0")
+        self.stdout.write(f"coldstart · {boots} fresh process(es) per mode · forecast on {fixtures}")
+        for mode in ("cold", "warm"):
+            runs = []
+            for _ in range(boots):
+                proc = subprocess.run(
+                    [sys.executable, "-c", _COLDSTART_CHILD, mode, fixtures],
+                    capture_output=True, text=True, cwd=settings.BASE_DIR, env=env,
+                )
+                if proc.returncode:
+                    raise CommandError(f"coldstart child failed:\n{proc.stderr[-2000:]}")
+                runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+            for key, label in (("boot_seconds", "boot"), ("first_seconds", "first prediction"),
+                               ("second_seconds", "second prediction"),
+                               ("to_first_answer_seconds", "boot → first answer")):
+                self.report(f"{mode}: {label}", [r[key] for r in runs])
+
+    def suite_botstart(self, options):
+        """
+        Startup of the Telegram bot process in fresh interpreters: Django
+        setup, importing the command, building the PTB application, peak
+        RSS, and what loading the prediction stack would add on top.
+        """
+        import sys
+
+        boots = max(1, options["boots"])
+        env = dict(os.environ, MODEL_WARMUP="0")
+        self.stdout.write(f"botstart · {boots} fresh process(es)")
+        runs, log = [], ""
+        for _ in range(boots):
+            proc = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", _BOTSTART_CHILD],
+                capture_output=True, text=True, cwd=settings.BASE_DIR, env=env,
+            )
+            if proc.returncode:
+                raise CommandError(f"botstart child failed:\n{proc.stderr[-2000:]}")
+            runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+            log = proc.stderr
+        for key, label in (("setup_seconds", "django.setup"), ("import_seconds", "import telegrambot"),
+                           ("build_seconds", "build application"), ("startup_seconds", "startup total"),
+                           ("prediction_stack_seconds", "+ import core.utils")):
+            self.report(label, [r[key] for r in runs])
+        last = runs[-1]
+        self.meta.update({
+            "startup_rss_bytes": last["startup_rss_bytes"],
+            "prediction_stack_rss_bytes": last["prediction_stack_rss_bytes"],
+            "heavy_modules_at_startup": last["heavy_modules"],
+            "top_imports": _top_imports(log),
+        })
+        self.stdout.write(
+            f"  RSS after startup {last['startup_rss_bytes'] / 2**20:.0f} MiB, "
+            f"with the prediction stack {last['prediction_stack_rss_bytes'] / 2**20:.0f} MiB"
+        )
+        self.stdout.write(f"  heavy modules at startup: {', '.join(last['heavy_modules']) or 'none'}")
+        for entry in self.meta["top_imports"][:5]:
+            self.stdout.write(f"    {entry['seconds']:6.2f}s  {entry['module']}")
+
+    def suite_backtest(self, options):
+        """
+        core.backtest on the recorded 10y histories: the whole history at
+        one and at several horizons, against the per‑day loop it replaces
+        (prepare_data + one predict per origin, timed on a sample of days).
+        """
+        from core import backtest, utils
+        from core.windows import WindowBuilder
+
+        model = utils.registry.get()
+        predict = model.predict_on_batch
+        repeat = min(options["repeat"], 3)
+        horizons = tuple(settings.BACKTEST_HORIZONS)
+        for symbol, df in _fixture_histories(options["fixtures"]).items():
+            closes = df["Close"].to_numpy(dtype=np.float64)
+            ends = backtest.origin_ends(len(closes))
+            self.stdout.write(f"backtest · {symbol} · {len(df)} bars · {len(ends)} origins · {repeat} runs")
+            backtest.run_backtest(symbol, df, (1,), predict=predict)          # trace the batch shapes
+
+            self.report(f"{symbol} backtest h=1", _timings(
+                lambda: backtest.run_backtest(symbol, df, (1,), predict=predict), repeat, warmup=0
+            ), origins=float(len(ends)))
+            for stride in sorted({1, settings.BACKTEST_STRIDE}):
+                self.report(f"{symbol} backtest h={','.join(map(str, horizons))} stride {stride}", _timings(
+                    lambda: backtest.run_backtest(symbol, df, horizons, stride, predict=predict), 1, warmup=0
+                ), origins=float(len(backtest.origin_ends(len(closes), stride=stride))))
+
+            sample = ends[:: max(1, len(ends) // 50)]
+            loop_preds = []
+
+            def per_day_loop():
+                loop_preds.clear()
+                for t in sample:
+                    scaler, _, x = utils.prepare_data(df.iloc[: t + 1])
+                    loop_preds.append(scaler.inverse_one(float(predict(x)[0, 0])))
+
+            per_origin = self.report(f"{symbol} per‑day loop ({len(sample)} days)", _timings(
+                per_day_loop, repeat, warmup=0
+            )) / len(sample)
+            paths = backtest.forecast_history(closes, predict, 1)
+            self.meta.setdefault("backtest", {})[symbol] = {
+                "origins": len(ends),
+                "loop_estimate_seconds": round(per_origin * len(ends) / 1000, 2),
+                "max_abs_diff_vs_loop": float(np.max(np.abs(paths[np.searchsorted(ends, sample), 0] - loop_preds))),
+                "windows_are_views": bool(np.shares_memory(WindowBuilder(closes).windows, closes)),
+                "all_windows_bytes": len(ends) * utils.WINDOW * 4,             # stacked float32 inputs
+                "batch_buffer_bytes": min(len(ends), settings.BACKTEST_BATCH_SIZE) * utils.WINDOW * 8,
+            }
+            self.stdout.write(
+                f"  per‑day loop over all {len(ends)} origins ≈ "
+                f"{self.meta['backtest'][symbol]['loop_estimate_seconds']:.1f}s; "
+                f"max |Δ| vs backtest {self.meta['backtest'][symbol]['max_abs_diff_vs_loop']:.2e}"
+            )
+
+    def pieces(self, df: pd.DataFrame, repeat: int) -> None:
+        from core import utils
+
+        window = utils.WINDOW
+        self.report("prepare_data", _timings(lambda: utils.prepare_data(df, window), repeat))
+        model = utils.registry.get()
+        _, scaled, x = utils.prepare_data(df, window)
+        self.report("inference (1 window)", _timings(lambda: model.predict_on_batch(x), repeat))
+        windows = np.stack([scaled[i - window:i] for i in range(len(scaled) - 31, len(scaled) + 1)])
+        self.report(f"inference ({len(windows)} windows)", _timings(lambda: model.predict_on_batch(windows), repeat))
+        horizon = settings.PREDICT_MAX_HORIZON
+        for batch in (x, windows):
+            self.report(f"rollout ({horizon} steps, {len(batch)} window(s))", _timings(
+                lambda: rollout(batch, horizon, model.predict_on_batch), repeat
+            ))
+        next_price = float(df["Close"].iloc[-1])
+        path = [next_price * (1 + 0.002 * day) for day in range(horizon)]
+        for kind in charts.CHART_FIELDS:
+            self.report(f"render {kind}", _timings(
+                lambda: charts.render_png(kind, "BENCH", df, next_price, window, None, path), repeat
+            ))
+
+    def concurrent(self, user, tickers: list, level: int, total: int) -> None:
+        """Closed loop: ``level`` callers, each predicting again as soon as its last call returns."""
+        from core import utils
+
+        async def run():
+            latencies, jobs = [], iter(range(total))
+
+            async def caller():
+                for i in jobs:
+                    started = time.perf_counter()
+                    await utils.run_prediction_async(user, tickers[i % len(tickers)], charts=False)
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(caller() for _ in range(level)))
+            return latencies, time.perf_counter() - started
+
+        latencies, wall = asyncio.run(run())
+        self.report(f"run_prediction @{level}", latencies,
+                    concurrency=level, throughput_per_s=round(len(latencies) / wall, 2))
+
+    def record(self, tickers: str) -> None:
+        """Save Yahoo's 10y daily chart response for each ticker as a pipeline fixture."""
+        from core.market_data import run_sync, yahoo
+        from core.validation import parse_ticker
+
+        try:
+            symbols = [parse_ticker(t) for t in tickers.split(",") if t.strip()]
+        except ValueError as exc:
+            raise CommandError(f"--record: {exc}")
+        FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+        for ticker in symbols:
+            payload = run_sync(yahoo.get_json(
+                f"/v8/finance/chart/{quote(ticker, safe='')}", {"interval": "1d", "range": "10y", "events": "div,splits"}
+            ))
+            path = FIXTURE_DIR / f"chart_{ticker}.json"
+            path.write_text(json.dumps(payload, separators=(",", ":")))
+            self.stdout.write(f"  recorded {ticker} → {path}")
+
@@ -0,0 +1,81 @@
+"""
+Inference worker: runs queued prediction jobs (see core.jobs).
+"""
+
+import asyncio
+import logging
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import metrics
+from core.jobs import InferenceWorker, default_worker_name
+from core.warmup import warmup
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Process queued prediction jobs until stopped (SIGINT / SIGTERM)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=settings.INFERENCE_WORKERS,
+            help=f"Concurrent jobs in this process (default: {settings.INFERENCE_WORKERS})"
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=settings.INFERENCE_POLL_SECONDS,
+            help="Seconds an idle slot waits before checking the queue again"
+        )
+        parser.add_argument(
+            "--name", type=str, default=None,
+            help="Worker name recorded on claimed jobs (default: host:pid)"
+        )
+        parser.add_argument(
+            "--drain", action="store_true",
+            help="Exit once the queue is empty instead of waiting for new jobs"
+        )
+        parser.add_argument(
+            "--no-warmup", action="store_true",
+            help="Do not load and trace the model before claiming the first job"
+        )
+        parser.add_argument(
+            "--metrics-port", type=int, default=settings.METRICS_PORT,
+            help="Serve Prometheus metrics on this port (0 = off)"
+        )
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1:
+            raise CommandError("--workers must be at least 1")
+        if options["metrics_port"]:
+            metrics.serve(options["metrics_port"], token=settings.METRICS_TOKEN)
+        worker = InferenceWorker(
+            concurrency=options["workers"],
+            poll_interval=options["poll_interval"],
+            name=options["name"] or default_worker_name(),
+        )
+        if not options["no_warmup"]:
+            # a job claimed by a cold worker would pay for the model load
+            warmup.start()
+            if warmup.wait():
+                self.stdout.write(f"Model ready in {warmup.timings['total_seconds']:.1f}s")
+            else:
+                self.stderr.write(f"Model warm‑up failed ({warmup.error}); loading on first job")
+        self.stdout.write(
+            f"Inference worker {worker.name}: {worker.concurrency} slot(s), "
+            f"polling every {worker.poll_interval:g}s"
+        )
+        processed = asyncio.run(self._run(worker, options["drain"]))
+        self.stdout.write(self.style.SUCCESS(f"Stopped after {processed} job(s)"))
+
+    async def _run(self, worker: InferenceWorker, drain: bool) -> int:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                # finish the jobs in hand, then exit
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):   # Windows / non‑main thread
+                pass
+        return await worker.run(stop, drain=drain)
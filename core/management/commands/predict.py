@@ -1,7 +1,11 @@
+from asgiref.sync import async_to_sync
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
+from core.bulk import BulkProgress, bulk_predict_async
 from core.utils import run_prediction
 from core.models import Prediction
+from core.validation import parse_ticker
 
 User = get_user_model()
 
@@ -16,12 +20,47 @@ class Command(BaseCommand):
         group.add_argument(
             "--all", action="store_true", help="Run for every unique ticker in Prediction table"
         )
+        group.add_argument(
+            "--tickers-file", type=str,
+            help="File with one ticker per line"
+        )
         parser.add_argument(
             "--user", type=str, default=None,
             help="Username to own the predictions (default: first superuser)"
         )
+        parser.add_argument(
+            "--horizon", type=int, default=1,
+            help=f"Trading days to forecast, 1–{settings.PREDICT_MAX_HORIZON} (default: 1)"
+        )
+
+        bulk = parser.add_argument_group("bulk mode")
+        bulk.add_argument(
+            "--bulk", action="store_true",
+            help="Batched downloads + one model call per chunk + bulk_create"
+        )
+        bulk.add_argument(
+            "--concurrency", type=int, default=8,
+            help="Concurrent price downloads in bulk mode (default: 8)"
+        )
+        bulk.add_argument(
+            "--chunk-size", type=int, default=500,
+            help="Tickers per batched inference / DB write (default: 500)"
+        )
+        bulk.add_argument(
+            "--resume", type=str, default=None, metavar="PROGRESS_FILE",
+            help="Record finished tickers here and skip them on the next run"
+        )
+        bulk.add_argument(
+            "--slowest", type=int, default=10,
+            help="How many of the slowest tickers to list in the summary"
+        )
 
     def handle(self, *args, **options):
+        if not 1 <= options["horizon"] <= settings.PREDICT_MAX_HORIZON:
+            raise CommandError(f"--horizon must be between 1 and {settings.PREDICT_MAX_HORIZON}")
+        for option in ("concurrency", "chunk_size"):
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be at least 1")
         # Pick the user that will own the prediction records
         if options["user"]:
             try:
@@ -44,11 +83,21 @@ class Command(BaseCommand):
             )
             if not tickers:
                 raise CommandError("No existing tickers in DB; use --ticker first")
+        elif options["tickers_file"]:
+            with open(options["tickers_file"]) as f:
+                tickers = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        try:
+            tickers = [parse_ticker(t) for t in tickers]
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options["bulk"]:
+            return self.handle_bulk(user, list(tickers), options)
 
         for t in tickers:
             self.stdout.write(f"Predicting {t} …", ending="")
             try:
-                pred = run_prediction(user, t)
+                pred = run_prediction(user, t, horizon=options["horizon"])
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f" failed: {e}"))
                 continue
@@ -56,3 +105,37 @@ class Command(BaseCommand):
             self.stdout.write(
                 f" → {t}: {pred.next_price}  (mse {pred.mse:.4e}, rmse {pred.rmse:.4f})"
             )
+            if options["horizon"] > 1:
+                self.stdout.write(f"   path: {', '.join(f'{p:.2f}' for p in pred.metrics['path'])}")
+
+    def handle_bulk(self, user, tickers, options):
+        progress = BulkProgress(options["resume"])
+        report = async_to_sync(bulk_predict_async)(
+            user,
+            tickers,
+            concurrency=options["concurrency"],
+            chunk_size=options["chunk_size"],
+            horizon=options["horizon"],
+            progress=progress,
+            on_chunk=lambda done, total: self.stdout.write(f"  {done}/{total} tickers"),
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Bulk run: {len(report.succeeded)} ok, {len(report.failed)} failed, "
+            f"{report.skipped} skipped (already done) in {report.wall_seconds:.1f}s"
+        ))
+        self.stdout.write(
+            f"  chunks {report.chunks} · inference {report.infer_seconds:.2f}s · "
+            f"db writes {report.write_seconds:.2f}s"
+        )
+        downloads = sorted(report.results, key=lambda r: r.download_seconds, reverse=True)
+        if downloads:
+            total = sum(r.download_seconds for r in downloads)
+            self.stdout.write(f"  download time (sum over tickers) {total:.1f}s; slowest:")
+            for r in downloads[: options["slowest"]]:
+                self.stdout.write(
+                    f"    {r.ticker:<10} download {r.download_seconds:6.2f}s  "
+                    f"prepare {r.prepare_seconds * 1000:6.1f}ms"
+                )
+        for r in report.failed:
+            self.stdout.write(self.style.ERROR(f"  {r.ticker}: {r.error}"))
@@ -1,26 +1,36 @@
 """
 Telegram bot management command for Stock‑Insight.
+
+The prediction stack (pandas, scikit‑learn, TensorFlow, matplotlib) is
+imported on first use, not at startup, so a bot that only answers
+``/start`` and ``/help`` stays small.  With ``--inference queue`` the bot
+never loads it at all: ``/predict`` enqueues a job for the inference
+worker (``manage.py inferenceworker``) and follows its progress.
 """
 
 from __future__ import annotations          # ← must be FIRST
 
 import asyncio
 import logging
-import os
+import signal
 from typing import Optional
 
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.management.base import BaseCommand
 from asgiref.sync import sync_to_async
-from telegram import Update, InputFile
+from telegram import Update
 from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes
 from telegram.error import BadRequest
 from telegram.helpers import escape_markdown
 
-from core.models import TelegramUser, Prediction
-from core.utils import run_prediction_async
-from core.tg_rate import too_many_calls
+from core import jobs, metrics
+from core.models import PredictionJob, TelegramUser, Prediction
+from core.progress import CACHED, DONE, FAILED, STARTED, Progress
+from core.ratelimit import ratelimit
+from core.tg_files import send_chart, send_charts
+from core.tg_webhook import ChatOrderedUpdateProcessor, WebhookServer, webhook_secret
+from core.validation import parse_horizon, parse_ticker
 
 BOT_TOKEN = settings.BOT_TOKEN
 logger = logging.getLogger(__name__)
@@ -46,46 +56,143 @@ def get_latest_user_prediction(user: User) -> Optional[Prediction]:
     )
 
 # ─────────────────────── File / image helpers ────────────────────────────────
-async def open_input_file(path: str) -> InputFile:
-    full_path = os.path.join(settings.BASE_DIR, path)
-    if not os.path.exists(full_path):
-        raise FileNotFoundError(f"Image not found: {full_path}")
-    if os.path.getsize(full_path) == 0:
-        raise ValueError(f"Empty image file: {full_path}")
-
-    loop = asyncio.get_event_loop()
-    with open(full_path, "rb") as f:
-        buf = await loop.run_in_executor(None, f.read)
-    return InputFile(buf, filename=os.path.basename(full_path))
-
-
-async def send_image_safely(update: Update, img_path: str, caption: str = "") -> bool:
+async def send_image_safely(update: Update, pred: Prediction, kind: str, caption: str = "") -> bool:
+    """Send the chart (by cached file_id, or rendered and uploaded once)."""
     try:
-        img = await open_input_file(img_path)
-        await update.message.reply_photo(img, caption=caption)
+        await send_chart(update.message, pred, kind, caption)
         return True
     except BadRequest as e:
-        logger.error("Telegram rejected %s: %s", img_path, e)
+        logger.error("Telegram rejected %s chart of prediction %s: %s", kind, pred.pk, e)
     except Exception as e:
-        logger.error("Failed to send %s: %s", img_path, e)
+        from core.charts import ChartUnavailable        # loaded already if it raised this
+
+        if isinstance(e, ChartUnavailable):
+            logger.info("No %s chart for prediction %s: %s", kind, pred.pk, e)
+        else:
+            logger.error("Failed to send %s chart of prediction %s: %s", kind, pred.pk, e)
     return False
 
+
+# ───────────────────────── Progress message ──────────────────────────────────
+_STAGE_ICONS = {STARTED: "⏳", DONE: "✅", CACHED: "♻️", FAILED: "❌"}
+
+
+class StatusMessage:
+    """
+    Edits the "Analyzing…" reply in place as pipeline stages finish, so
+    users can see the request is alive instead of resending it.  "started"
+    events are folded into the next edit unless the stage runs long.
+    """
+
+    min_interval = 1.0
+
+    def __init__(self, message, ticker: str):
+        self.message = message
+        self.header = f"🔍 Analyzing {ticker}…"
+        self.lines: dict = {}
+        self._text = message.text
+        self._edited = 0.0
+
+    def render(self) -> str:
+        return "\n".join([self.header, *self.lines.values()])
+
+    async def update(self, event) -> None:
+        took = f" {event.seconds:.2f}s" if event.status == DONE else ""
+        self.lines[event.stage] = f"{_STAGE_ICONS[event.status]} {event.stage}{took}"
+        loop = asyncio.get_running_loop()
+        if event.status == STARTED and loop.time() - self._edited < self.min_interval:
+            return
+        text = self.render()
+        if text == self._text:
+            return
+        self._text, self._edited = text, loop.time()
+        try:
+            await self.message.edit_text(text)
+        except BadRequest as e:
+            if "not modified" not in str(e):
+                raise
+
+
+async def send_charts_safely(update: Update, pred: Prediction, captions: dict) -> int:
+    """Send several charts in one media group; returns how many arrived."""
+    try:
+        return await send_charts(update.message, pred, captions)
+    except Exception as e:
+        logger.error("Failed to send charts of prediction %s: %s", pred.pk, e)
+        return 0
+
 # ───────────────────────────── Bot command ───────────────────────────────────
 class Command(BaseCommand):
     help = "Run Telegram bot"
+    inference = "inline"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--webhook", action="store_true",
+                            help="Receive updates on a webhook instead of long polling")
+        parser.add_argument("--url", default=settings.TELEGRAM_WEBHOOK_URL,
+                            help="Public base URL to register with Telegram (webhook mode)")
+        parser.add_argument("--listen", default=settings.TELEGRAM_WEBHOOK_LISTEN)
+        parser.add_argument("--port", type=int, default=settings.TELEGRAM_WEBHOOK_PORT)
+        parser.add_argument("--concurrency", type=int, default=settings.TELEGRAM_CONCURRENCY,
+                            help="Updates handled at once (each chat stays in order)")
+        parser.add_argument("--max-in-flight", type=int, default=settings.TELEGRAM_MAX_IN_FLIGHT,
+                            help="Updates accepted but not finished before new ones are refused")
+        parser.add_argument("--inference", choices=("inline", "queue"), default=settings.TELEGRAM_INFERENCE,
+                            help="Predict in the bot process, or queue jobs for the inference worker")
+        parser.add_argument("--metrics-port", type=int, default=settings.METRICS_PORT,
+                            help="Serve Prometheus metrics on this port (0 = off)")
 
     # entry point
     def handle(self, *args, **options):
-        app = ApplicationBuilder().token(BOT_TOKEN).build()
+        self.inference = options["inference"]
+        if options["metrics_port"]:
+            metrics.serve(options["metrics_port"], token=settings.METRICS_TOKEN)
+        processor = ChatOrderedUpdateProcessor(options["concurrency"], options["max_in_flight"])
+        app = ApplicationBuilder().token(BOT_TOKEN).concurrent_updates(processor).build()
         app.add_handler(CommandHandler("start", self.start))
-        app.add_handler(CommandHandler("help", self.help))
+        app.add_handler(CommandHandler("help", self.show_help))
         app.add_handler(CommandHandler("predict", self.predict))
         app.add_handler(CommandHandler("latest", self.latest))
         app.add_error_handler(self.error_handler)
 
+        if options["webhook"]:
+            asyncio.run(self.serve_webhook(app, processor, options))
+            return
         self.stdout.write(self.style.SUCCESS("🤖 Bot is polling..."))
         app.run_polling()
 
+    async def serve_webhook(self, app, processor, options):
+        """Run the bot behind the webhook listener (core.tg_webhook) until SIGINT/SIGTERM, then drain."""
+        secret = webhook_secret()
+        server = WebhookServer(
+            app.bot, processor, app.process_update,
+            path=settings.TELEGRAM_WEBHOOK_PATH,
+            secret=secret,
+            max_in_flight=options["max_in_flight"],
+        )
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        async with app:                                  # initialize … shutdown
+            await app.start()
+            await server.start(options["listen"], options["port"])
+            if options["url"]:
+                await app.bot.set_webhook(
+                    options["url"].rstrip("/") + settings.TELEGRAM_WEBHOOK_PATH,
+                    secret_token=secret,
+                    allowed_updates=Update.ALL_TYPES,
+                    max_connections=min(100, options["concurrency"] * 2),
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f"🤖 Bot webhook listening on {options['listen']}:{server.port}"
+            ))
+            await stop.wait()
+            self.stdout.write("Stopping: draining in‑flight updates…")
+            await server.stop()
+            await app.stop()
+
     # global error handler
     async def error_handler(self, update: object, context: ContextTypes.DEFAULT_TYPE):
         logger.error("Update %s caused error: %s", update, context.error)
@@ -99,20 +206,21 @@ class Command(BaseCommand):
         await link_telegram_user(chat_id, username)
         await update.message.reply_text(
             "📈 Welcome to Stock Insight Bot!\n\n"
-            "/predict <TICKER> – Get tomorrow's price prediction\n"
+            "/predict <TICKER> [DAYS] – Get tomorrow's price prediction, or DAYS ahead\n"
             "/latest – Show your most recent prediction\n"
             "/help – Show help"
         )
 
     # /help
-    async def help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def show_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(
             "ℹ️ Commands:\n"
-            "/predict <TICKER> – Predict price (e.g., /predict AAPL)\n"
+            "/predict <TICKER> [DAYS] – Predict price (e.g., /predict AAPL, /predict AAPL 5)\n"
             "/latest – Show your most recent prediction"
         )
 
     # /predict
+    @ratelimit("telegram")
     async def predict(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         chat_id = update.effective_chat.id
         username = update.effective_user.username or ""
@@ -120,33 +228,42 @@ class Command(BaseCommand):
         try:
             user, _ = await link_telegram_user(chat_id, username)
 
-            if await sync_to_async(too_many_calls)(chat_id):
-                await update.message.reply_text("⏳ Rate limit: 10 predictions per minute.")
-                return
-
             if not context.args:
-                await update.message.reply_text("Usage: /predict <TICKER>")
+                await update.message.reply_text("Usage: /predict <TICKER> [DAYS]")
                 return
 
-            ticker = context.args[0].upper()
-            await update.message.reply_text(f"🔍 Analyzing {ticker}…")
+            ticker = parse_ticker(context.args[0])
+            horizon = parse_horizon(context.args[1] if len(context.args) > 1 else None)
+            status = await update.message.reply_text(f"🔍 Analyzing {ticker}…")
+            progress = Progress(StatusMessage(status, ticker).update)
 
-            pred = await run_prediction_async(user, ticker)
+            pred = await self.run_prediction(update, user, ticker, progress, horizon)
+            if pred is None:
+                return
 
-            # send images
-            images_sent = 0
-            if pred.plot_closing and await send_image_safely(update, pred.plot_closing, f"{ticker} Price History"):
-                images_sent += 1
-            if pred.plot_cmp and await send_image_safely(update, pred.plot_cmp, f"{ticker} Prediction Comparison"):
-                images_sent += 1
+            # send the charts in one media group
+            captions = {
+                "close": f"{ticker} Price History",
+                "cmp": f"{ticker} Prediction Comparison",
+            }
+            if pred.plot_horizon:
+                captions["horizon"] = f"{ticker} {horizon}‑Day Forecast"
+            async with progress.stage("render"):
+                images_sent = await send_charts_safely(update, pred, captions)
+            path = (pred.metrics or {}).get("path") or []
+            outlook = (
+                f"📅 In {horizon} days: *${escape_markdown(f'{path[-1]:.2f}', 2)}*\n"
+                if horizon > 1 and len(path) >= horizon else ""
+            )
 
             # prediction summary (escape all special chars, avoid '=')
             result_msg = (
                 f"📊 *{escape_markdown(ticker, 2)} Prediction*\n\n"
                 f"➡️ Next Price: *${escape_markdown(f'{pred.next_price:.2f}', 2)}*\n"
+                f"{outlook}"
                 f"📈 Accuracy: R² {escape_markdown(f'{pred.r2:.3f}', 2)}, "
                 f"RMSE {escape_markdown(f'{pred.rmse:.4f}', 2)}\n\n"
-                f"{'🖼️ ' if images_sent else '⚠️ '}{images_sent}/2 charts shown"
+                f"{'🖼️ ' if images_sent else '⚠️ '}{images_sent}/{len(captions)} charts shown"
             )
             await update.message.reply_markdown_v2(result_msg)
 
@@ -156,6 +273,28 @@ class Command(BaseCommand):
             logger.exception("Prediction failed for %s", chat_id)
             await update.message.reply_text("🚨 Prediction failed. Please try again later.")
 
+    async def run_prediction(
+        self, update: Update, user, ticker: str, progress: Progress, horizon: int = 1
+    ) -> Optional[Prediction]:
+        """Predict in this process or, with ``--inference queue``, on the inference worker."""
+        if self.inference != "queue":
+            from core.utils import run_prediction_async
+
+            return await run_prediction_async(user, ticker, progress=progress, horizon=horizon)
+
+        async def relay(event):
+            await progress.emit(event.stage, event.status, event.seconds)
+
+        job = await jobs.aenqueue(user, ticker, horizon=horizon)
+        try:
+            job = await jobs.wait_for_job(job.pk, relay)
+        except TimeoutError:
+            await update.message.reply_text("⌛ Still working on it – check /latest in a minute.")
+            return None
+        if job.status == PredictionJob.FAILED:
+            raise ValueError(job.error or "Prediction failed")
+        return job.prediction
+
     # /latest
     async def latest(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         chat_id = update.effective_chat.id
@@ -168,9 +307,7 @@ class Command(BaseCommand):
                 await update.message.reply_text("No predictions yet. Use /predict first.")
                 return
 
-            image_sent = False
-            if pred.plot_cmp:
-                image_sent = await send_image_safely(update, pred.plot_cmp, f"Latest {pred.ticker} Prediction")
+            image_sent = await send_image_safely(update, pred, "cmp", f"Latest {pred.ticker} Prediction")
 
             latest_msg = (
                 f"⏱️ *Your Latest Prediction*\n\n"
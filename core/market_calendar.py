@@ -0,0 +1,115 @@
+# core/market_calendar.py
+"""
+NYSE trading calendar: full holidays, early closes and the next close.
+
+Rules follow the exchange's published schedule (weekend holidays are
+observed on the nearest weekday, except New Year's Day falling on a
+Saturday, which is not observed).  Ad‑hoc closures are not modelled.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import FrozenSet, List, Optional
+from zoneinfo import ZoneInfo
+
+MARKET_TZ = ZoneInfo("America/New_York")
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n‑th ``weekday`` (Mon=0) of a month; n = -1 means the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous algorithm)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    month = (h + l - 7 * m + 90) // 25
+    day = (h + l - 7 * m + 33 * month + 19) % 32
+    return date(year, month, day)
+
+
+def _observed(d: date) -> date:
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+@lru_cache(maxsize=64)
+def holidays(year: int) -> FrozenSet[date]:
+    days = {
+        _nth_weekday(year, 1, 0, 3),                # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),                # Washington's Birthday
+        _easter(year) - timedelta(days=2),          # Good Friday
+        _nth_weekday(year, 5, 0, -1),               # Memorial Day
+        _observed(date(year, 7, 4)),                # Independence Day
+        _nth_weekday(year, 9, 0, 1),                # Labor Day
+        _nth_weekday(year, 11, 3, 4),               # Thanksgiving
+        _observed(date(year, 12, 25)),              # Christmas
+    }
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days.add(_observed(new_year))
+    if year >= 2022:
+        days.add(_observed(date(year, 6, 19)))      # Juneteenth
+    return frozenset(days)
+
+
+def is_trading_day(d: date) -> bool:
+    return d.weekday() < 5 and d not in holidays(d.year)
+
+
+def trading_days_after(d: date, n: int) -> List[date]:
+    """The ``n`` trading days following ``d`` (the dates of an ``n``‑step forecast)."""
+    days: List[date] = []
+    while len(days) < n:
+        d += timedelta(days=1)
+        if is_trading_day(d):
+            days.append(d)
+    return days
+
+
+def close_time(d: date) -> Optional[time]:
+    """Closing time on ``d`` (exchange local), or ``None`` if the market is shut."""
+    if not is_trading_day(d):
+        return None
+    early = {
+        _nth_weekday(d.year, 11, 3, 4) + timedelta(days=1),   # day after Thanksgiving
+        date(d.year, 12, 24),                                   # Christmas Eve
+        date(d.year, 7, 3),                                     # eve of Independence Day
+    }
+    return EARLY_CLOSE if d in early else REGULAR_CLOSE
+
+
+def next_close(now: Optional[datetime] = None) -> datetime:
+    """The first market close strictly after ``now`` (timezone‑aware)."""
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    day = now.date()
+    for _ in range(15):
+        closes = close_time(day)
+        if closes is not None:
+            candidate = datetime.combine(day, closes, tzinfo=MARKET_TZ)
+            if candidate > now:
+                return candidate
+        day += timedelta(days=1)
+    raise RuntimeError("No market close found within 15 days")
+
+
+def seconds_until_next_close(now: Optional[datetime] = None) -> int:
+    now = now or datetime.now(MARKET_TZ)
+    return max(int((next_close(now) - now).total_seconds()), 1)
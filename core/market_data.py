@@ -0,0 +1,330 @@
+# core/market_data.py
+"""
+Shared async HTTP client for Yahoo market data.
+
+All fetches go through one ``httpx.AsyncClient`` with a bounded keep‑alive
+pool (``YAHOO_POOL_SIZE``), so DNS resolution and the TLS handshake happen
+once per pooled connection instead of once per request; with ``h2``
+installed the requests multiplex over a single HTTP/2 connection.
+
+An ``AsyncClient`` belongs to the event loop it was first used on, and
+callers here live on many loops (uvicorn's, the bot's, one per
+``async_to_sync`` call under WSGI).  The client therefore runs on a
+dedicated I/O loop thread; coroutines on other loops hand their request
+over with ``run_coroutine_threadsafe`` and await the result, the same way
+the micro‑batcher and single‑flight share work across threads.  Response
+parsing happens back on the caller's side so the I/O loop only does I/O.
+
+Every request draws from the call budget shared by all processes
+(core.throttle); when Yahoo pushes back the circuit opens and callers get
+``RateLimited`` straight away instead of adding to the storm.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Awaitable, Dict, Iterable, Optional, TypeVar, Union
+from urllib.parse import quote
+
+import httpx
+import pandas as pd
+from django.conf import settings
+
+from . import metrics
+from .throttle import OutboundBudget, backoff_delay, yahoo_budget
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+SPARK_BATCH = 20                         # symbols per /v7/finance/spark call
+DAILY_INTERVALS = {"1d", "5d", "1wk", "1mo", "3mo"}
+USER_AGENT = "Mozilla/5.0 (compatible; stock-insight)"
+
+REQUESTS = metrics.counter("yahoo_requests_total", "HTTP requests sent to Yahoo")
+ERRORS = metrics.counter("yahoo_request_errors_total", "Yahoo requests that failed (after retries)")
+LATENCY = {
+    endpoint: metrics.histogram(
+        "yahoo_request_seconds", "Yahoo request latency",
+        buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10), labels={"endpoint": endpoint},
+    )
+    for endpoint in ("chart", "spark", "other")
+}
+
+
+class YahooError(ValueError):
+    """Yahoo answered, but not with usable data (unknown symbol, empty result…)."""
+
+
+# ─── Dedicated I/O loop ─────────────────────────────────────────
+_io_lock = threading.Lock()
+_io_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def io_loop() -> asyncio.AbstractEventLoop:
+    global _io_loop
+    with _io_lock:
+        if _io_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="market-data-io", daemon=True).start()
+            _io_loop = loop
+        return _io_loop
+
+
+async def _on_io_loop(coro: Awaitable[T]) -> T:
+    loop = io_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+def run_sync(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Run a coroutine on the I/O loop from synchronous code."""
+    return asyncio.run_coroutine_threadsafe(coro, io_loop()).result(timeout)
+
+
+# ─── Response parsing ───────────────────────────────────────────
+def parse_chart(result: Dict[str, Any], interval: str = "1d") -> pd.DataFrame:
+    """
+    One ``chart.result[]`` entry → yfinance‑shaped OHLCV frame.  Daily and
+    longer bars are indexed by exchange‑local date ("Date"), intraday bars
+    by naive UTC time ("Datetime"), matching what yfinance returns.
+    """
+    timestamps = result.get("timestamp") or []
+    quotes = (result.get("indicators", {}).get("quote") or [{}])[0]
+    index = pd.to_datetime(timestamps, unit="s", utc=True)
+    if interval in DAILY_INTERVALS:
+        tz = result.get("meta", {}).get("exchangeTimezoneName") or "America/New_York"
+        index = index.tz_convert(tz).normalize().tz_localize(None).rename("Date")
+    else:
+        index = index.tz_localize(None).rename("Datetime")
+
+    n = len(index)
+    df = pd.DataFrame(
+        {
+            col: pd.to_numeric(pd.Series(quotes.get(col.lower()) or [None] * n), errors="coerce").to_numpy()
+            for col in ("Open", "High", "Low", "Close", "Volume")
+        },
+        index=index,
+    )
+    df = df.dropna(subset=["Close"])
+    return df[~df.index.duplicated(keep="last")]
+
+
+def _chart_result(payload: Dict[str, Any], ticker: str) -> Dict[str, Any]:
+    chart = payload.get("chart") or {}
+    if chart.get("error"):
+        err = chart["error"]
+        raise YahooError(f"{ticker}: {err.get('description') or err.get('code') or err}")
+    results = chart.get("result") or []
+    if not results:
+        raise YahooError(f"{ticker}: empty chart result")
+    return results[0]
+
+
+def _retry_after(res: httpx.Response) -> Optional[float]:
+    try:
+        return float(res.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _endpoint(path: str) -> str:
+    """Latency label for a request path: ``chart``, ``spark`` or ``other``."""
+    if "/finance/chart/" in path:
+        return "chart"
+    return "spark" if path.endswith("/finance/spark") else "other"
+
+
+def _epoch(day: str) -> int:
+    return int(datetime.fromisoformat(day).replace(tzinfo=dt_timezone.utc).timestamp())
+
+
+# ─── Client ─────────────────────────────────────────────────────
+class YahooClient:
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        http2: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff: float = 0.5,
+        budget: OutboundBudget = yahoo_budget,
+    ):
+        self._base_url = base_url
+        self._pool_size = pool_size
+        self._http2 = http2
+        self._timeout = timeout
+        self._max_retries = max_retries
+        self.backoff = backoff
+        self.budget = budget
+        self._client: Optional[httpx.AsyncClient] = None      # only touched on the I/O loop
+
+    # settings are read lazily so the module can be imported before Django is configured
+    @property
+    def base_url(self) -> str:
+        return (self._base_url or settings.YAHOO_BASE_URL).rstrip("/")
+
+    @property
+    def pool_size(self) -> int:
+        return self._pool_size or settings.YAHOO_POOL_SIZE
+
+    @property
+    def http2(self) -> bool:
+        wanted = settings.YAHOO_HTTP2 if self._http2 is None else self._http2
+        return bool(wanted) and HTTP2_AVAILABLE
+
+    @property
+    def max_retries(self) -> int:
+        return settings.YAHOO_MAX_RETRIES if self._max_retries is None else self._max_retries
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                    keepalive_expiry=60,
+                ),
+                timeout=self._timeout or settings.YAHOO_TIMEOUT,
+                headers={"User-Agent": USER_AGENT, "Accept": "application/json"},
+            )
+        return self._client
+
+    async def _get_json(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return await self._attempt_get(path, params)
+        except Exception:
+            ERRORS.inc()
+            raise
+
+    async def _attempt_get(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        GET on the I/O loop.  Every attempt draws from the shared call budget
+        (core.throttle); transport errors, 429 and 5xx are reported to its
+        circuit breaker and retried after a jittered backoff.
+        """
+        last_exc: Optional[Exception] = None
+        latency = LATENCY[_endpoint(path)]
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                logger.info("yahoo: retry %d for %s (%s)", attempt, path, last_exc)
+                await asyncio.sleep(backoff_delay(attempt, self.backoff))
+            probe = await self.budget.acquire()
+            REQUESTS.inc()
+            started = time.perf_counter()
+            try:
+                res = await self._http().get(path, params=params)
+            except httpx.TransportError as exc:
+                last_exc = exc
+                await self.budget.arecord(False, probe)
+                continue
+            finally:
+                latency.observe(time.perf_counter() - started)
+            if res.status_code == 429 or res.status_code >= 500:
+                last_exc = httpx.HTTPStatusError(
+                    f"{res.status_code} from Yahoo", request=res.request, response=res
+                )
+                await self.budget.arecord(False, probe)
+                retry_after = _retry_after(res)
+                if retry_after:
+                    # Yahoo said how long to stay away: every process honours it
+                    await self.budget.atrip(retry_after)
+                continue
+            await self.budget.arecord(True, probe)
+            if res.status_code == 404:
+                try:
+                    return res.json()      # chart.error explains it
+                except ValueError:
+                    raise YahooError(f"404 from Yahoo for {path}") from None
+            res.raise_for_status()
+            return res.json()
+        raise last_exc  # type: ignore[misc]
+
+    async def get_json(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        return await _on_io_loop(self._get_json(path, params))
+
+    # ── endpoints ───────────────────────────────────────────────
+    async def chart(
+        self,
+        ticker: str,
+        interval: str = "1d",
+        period: Optional[str] = None,
+        start: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """OHLCV bars for one symbol: a ``period`` ("10y", "1d") or everything since ``start``."""
+        params: Dict[str, Any] = {"interval": interval, "includePrePost": "false", "events": "div,splits"}
+        if start:
+            params["period1"] = _epoch(start)
+            params["period2"] = int((datetime.now(dt_timezone.utc) + timedelta(days=1)).timestamp())
+        else:
+            params["range"] = period or "1y"
+        # one path segment, whatever the symbol holds (^GSPC, EURUSD=X, or worse)
+        payload = await self.get_json(f"/v8/finance/chart/{quote(ticker, safe='')}", params)
+        return parse_chart(_chart_result(payload, ticker), interval)
+
+    async def charts(
+        self, tickers: Iterable[str], **kwargs
+    ) -> Dict[str, Union[pd.DataFrame, Exception]]:
+        """``chart()`` for many symbols at once over the shared pool; failures are returned, not raised."""
+        tickers = list(dict.fromkeys(tickers))
+        results = await asyncio.gather(*(self.chart(t, **kwargs) for t in tickers), return_exceptions=True)
+        return dict(zip(tickers, results))
+
+    async def spark(
+        self, tickers: Iterable[str], interval: str = "1d", period: str = "1mo"
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Close prices for many symbols in batched requests (``SPARK_BATCH``
+        symbols each).  Symbols Yahoo does not know are left out.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        batches = [tickers[i:i + SPARK_BATCH] for i in range(0, len(tickers), SPARK_BATCH)]
+        payloads = await asyncio.gather(*(
+            self.get_json("/v7/finance/spark", {"symbols": ",".join(b), "interval": interval, "range": period})
+            for b in batches
+        ))
+        frames: Dict[str, pd.DataFrame] = {}
+        for payload in payloads:
+            for item in (payload.get("spark") or {}).get("result") or []:
+                response = item.get("response") or []
+                if response:
+                    frames[item["symbol"]] = parse_chart(response[0], interval)[["Close"]]
+        return frames
+
+    # ── PriceStore downloader interface ─────────────────────────
+    async def adownload(
+        self, ticker: str, interval: str = "1d", period: Optional[str] = None, start: Optional[str] = None
+    ) -> pd.DataFrame:
+        try:
+            return await self.chart(ticker, interval=interval, period=period, start=start)
+        except YahooError:
+            if start:                       # nothing new since ``start`` is a valid answer
+                return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+            raise
+
+    def download(self, ticker: str, **kwargs) -> pd.DataFrame:
+        return run_sync(self.adownload(ticker, **kwargs))
+
+    async def aclose(self) -> None:
+        async def close():
+            if self._client is not None:
+                await self._client.aclose()
+                self._client = None
+        await _on_io_loop(close())
+
+
+yahoo = YahooClient()
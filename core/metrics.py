@@ -0,0 +1,253 @@
+# core/metrics.py
+"""
+Tiny in‑process metrics: counters, gauges and fixed‑bucket histograms.
+
+Metrics are created once at import time of the module that owns them and
+registered by name (plus optional labels, e.g. ``stage="infer"``), so any
+view can snapshot them without knowing where they live.  ``exposition()``
+renders the registry in the Prometheus text format; the web app serves it
+on ``/metrics`` and processes without an HTTP server (bot, inference
+worker) can start one with ``serve(port)``.
+
+Updates are a lock and an add (a ``bisect`` for histograms), cheap enough
+to leave on everywhere.  Each process keeps its own registry.
+"""
+
+from __future__ import annotations
+
+import bisect
+import hmac
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+_REGISTRY: Dict[str, "Metric"] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str = "", labels: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.help = help
+        self.labels = dict(sorted((labels or {}).items()))
+        self.key = name + _label_str(self.labels)
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Dict:
+        raise NotImplementedError
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = "", labels: Optional[Dict[str, str]] = None):
+        super().__init__(name, help, labels)
+        self._value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> Dict:
+        return {"value": self._value}
+
+    def samples(self) -> Iterator[str]:
+        yield f"{self.key} {self.value!r}"
+
+
+class Gauge(Metric):
+    """A value that goes up and down; with ``fn`` it is read at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str = "",
+        labels: Optional[Dict[str, str]] = None,
+        fn: Optional[Callable[[], float]] = None,
+    ):
+        super().__init__(name, help, labels)
+        self._value = 0.0
+        self._fn = fn
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    @property
+    def value(self) -> float:
+        return float(self._fn()) if self._fn is not None else self._value
+
+    def snapshot(self) -> Dict:
+        return {"value": self.value}
+
+    def samples(self) -> Iterator[str]:
+        yield f"{self.key} {self.value!r}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str = "",
+        buckets: Iterable[float] = (),
+        labels: Optional[Dict[str, str]] = None,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets: List[float] = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of the ``with`` block, in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative, running = {}, 0
+        for bound, n in zip(self.buckets + [float("inf")], counts):
+            running += n
+            cumulative["+Inf" if bound == float("inf") else repr(bound)] = running
+        return {"buckets": cumulative, "count": count, "sum": total}
+
+    def samples(self) -> Iterator[str]:
+        snap = self.snapshot()
+        for le, n in snap["buckets"].items():
+            yield f"{self.name}_bucket{_label_str({**self.labels, 'le': le})} {n}"
+        yield f"{self.name}_sum{_label_str(self.labels)} {snap['sum']!r}"
+        yield f"{self.name}_count{_label_str(self.labels)} {snap['count']}"
+
+
+def _get_or_create(cls, name: str, labels: Optional[Dict[str, str]] = None, **kwargs) -> Metric:
+    key = name + _label_str(dict(sorted((labels or {}).items())))
+    with _REGISTRY_LOCK:
+        metric = _REGISTRY.get(key)
+        if metric is None:
+            metric = _REGISTRY[key] = cls(name, labels=labels, **kwargs)
+        elif not isinstance(metric, cls):
+            raise TypeError(f"Metric {name!r} already registered as {metric.kind}")
+    return metric
+
+
+def counter(name: str, help: str = "", labels: Optional[Dict[str, str]] = None) -> Counter:
+    return _get_or_create(Counter, name, labels, help=help)
+
+
+def gauge(
+    name: str, help: str = "", labels: Optional[Dict[str, str]] = None, fn: Optional[Callable[[], float]] = None
+) -> Gauge:
+    return _get_or_create(Gauge, name, labels, help=help, fn=fn)
+
+
+def histogram(
+    name: str, help: str = "", buckets: Iterable[float] = (), labels: Optional[Dict[str, str]] = None
+) -> Histogram:
+    return _get_or_create(Histogram, name, labels, help=help, buckets=buckets)
+
+
+def snapshot(prefix: str = "") -> Dict[str, Dict[str, Union[float, Dict]]]:
+    """JSON‑friendly view of every registered metric (optionally filtered)."""
+    with _REGISTRY_LOCK:
+        metrics = [m for n, m in _REGISTRY.items() if n.startswith(prefix)]
+    return {m.key: m.snapshot() for m in metrics}
+
+
+def exposition() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    with _REGISTRY_LOCK:
+        metrics = sorted(_REGISTRY.values(), key=lambda m: (m.name, m.key))
+    lines: List[str] = []
+    family = None
+    for m in metrics:
+        if m.name != family:
+            family = m.name
+            lines.append(f"# HELP {m.name} {m.help}".rstrip())
+            lines.append(f"# TYPE {m.name} {m.kind}")
+        lines.extend(m.samples())
+    return "\n".join(lines) + "\n"
+
+
+def serve(port: int, host: str = "0.0.0.0", token: str = "") -> ThreadingHTTPServer:
+    """
+    Serve ``GET /metrics`` from a daemon thread (for processes without a web
+    server).  With ``token`` set, requests need ``Authorization: Bearer <token>``.
+    """
+    expected = f"Bearer {token}".encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            given = self.headers.get("Authorization", "").encode()
+            if token and not hmac.compare_digest(given, expected):
+                self.send_response(401)
+                self.send_header("WWW-Authenticate", "Bearer")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = exposition().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+_STARTED = time.time()
+PROCESS_START = gauge("process_start_time_seconds", "Unix time the process started", fn=lambda: _STARTED)
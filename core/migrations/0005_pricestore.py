@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-17 14:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_remove_userprofile_daily_used_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=10)),
+                ('interval', models.CharField(default='1d', max_length=8)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('ticker', 'interval'), name='uniq_price_series')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PriceBar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ts', models.DateTimeField()),
+                ('open', models.FloatField(null=True)),
+                ('high', models.FloatField(null=True)),
+                ('low', models.FloatField(null=True)),
+                ('close', models.FloatField()),
+                ('volume', models.BigIntegerField(null=True)),
+                ('series', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bars', to='core.priceseries')),
+            ],
+            options={
+                'ordering': ['ts'],
+                'constraints': [models.UniqueConstraint(fields=('series', 'ts'), name='uniq_price_bar')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-17 15:03
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_predictionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelegramFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=8)),
+                ('file_id', models.CharField(max_length=255)),
+                ('file_unique_id', models.CharField(blank=True, max_length=64)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('prediction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='telegram_files', to='core.prediction')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('prediction', 'kind'), name='unique_telegram_file')],
+            },
+        ),
+    ]
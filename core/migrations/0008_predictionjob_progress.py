@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_telegramfile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predictionjob',
+            name='progress',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-17 15:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_predictionjob_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prediction',
+            name='plot_horizon',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='predictionjob',
+            name='horizon',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+    ]
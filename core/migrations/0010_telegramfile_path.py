@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-17 18:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+# TelegramFile is re-keyed from (prediction, kind) to the chart's path.  The
+# table only caches Telegram file ids, so it is recreated empty rather than
+# converted; each chart is uploaded once more on its next send.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_prediction_horizon'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='TelegramFile',
+        ),
+        migrations.CreateModel(
+            name='TelegramFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255, unique=True)),
+                ('file_id', models.CharField(max_length=255)),
+                ('file_unique_id', models.CharField(blank=True, max_length=64)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,173 @@
+# core/model_registry.py
+"""
+Process‑wide registry of loaded Keras models.
+
+Every thread in the process shares one copy of each model.  Models are
+registered by name (and optionally version) and loaded lazily on first use;
+concurrent callers asking for the same model block on a per‑entry lock while
+the first one loads it, so the file is only read once per process.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "default"
+MODEL_PATH = os.getenv("MODEL_PATH", "stock_prediction_model.keras")
+
+
+# ─── Memory helpers ──────────────────────────────────────────────
+def current_rss_bytes() -> int:
+    """Resident set size of this process (Linux /proc, falls back to peak RSS)."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+RSS = metrics.gauge("process_resident_memory_bytes", "Resident set size of this process", fn=current_rss_bytes)
+
+
+def file_version(path: str) -> str:
+    """Short content hash of a model file, stable across processes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+# ─── Registry entry ──────────────────────────────────────────────
+@dataclass
+class ModelEntry:
+    name: str
+    version: str
+    path: str
+    model: Any = None
+    load_seconds: Optional[float] = None
+    rss_delta_bytes: Optional[int] = None
+    weights_bytes: Optional[int] = None
+    loaded_at: Optional[float] = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "version": self.version,
+            "path": self.path,
+            "loaded": self.loaded,
+            "load_seconds": self.load_seconds,
+            "rss_delta_bytes": self.rss_delta_bytes,
+            "weights_bytes": self.weights_bytes,
+            "loaded_at": self.loaded_at,
+        }
+
+
+# ─── Registry ────────────────────────────────────────────────────
+class ModelRegistry:
+    """
+    Thread‑safe map of ``(name, version) → ModelEntry``.
+
+    ``get(name)`` without a version returns the most recently registered
+    version of that name.
+    """
+
+    def __init__(self, loader=None):
+        self._loader = loader
+        self._entries: Dict[Tuple[str, str], ModelEntry] = {}
+        self._current: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    # ── registration ────────────────────────────────────────────
+    def register(self, name: str, path: str, version: Optional[str] = None) -> ModelEntry:
+        """Register a model file; it is not loaded until first requested."""
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model file not found: {path}")
+        version = version or file_version(path)
+        with self._lock:
+            entry = self._entries.get((name, version))
+            if entry is None:
+                entry = ModelEntry(name=name, version=version, path=path)
+                self._entries[(name, version)] = entry
+            self._current[name] = version
+        return entry
+
+    def entry(self, name: str = DEFAULT_MODEL, version: Optional[str] = None) -> ModelEntry:
+        if name == DEFAULT_MODEL and name not in self._current:
+            # the bundled model registers itself on first use
+            self.register(DEFAULT_MODEL, MODEL_PATH, os.getenv("MODEL_VERSION") or None)
+        with self._lock:
+            version = version or self._current.get(name)
+            entry = self._entries.get((name, version)) if version else None
+        if entry is None:
+            raise KeyError(f"Unknown model {name!r} (version {version!r})")
+        return entry
+
+    # ── loading ─────────────────────────────────────────────────
+    def get(self, name: str = DEFAULT_MODEL, version: Optional[str] = None):
+        """Return the loaded model, loading it once if needed."""
+        entry = self.entry(name, version)
+        if entry.model is not None:
+            return entry.model
+        with entry.lock:
+            if entry.model is None:
+                self._load(entry)
+        return entry.model
+
+    def _load(self, entry: ModelEntry) -> None:
+        loader = self._loader
+        if loader is None:
+            from keras.models import load_model as loader
+
+        rss_before = current_rss_bytes()
+        started = time.perf_counter()
+        model = loader(entry.path)
+        entry.load_seconds = time.perf_counter() - started
+        entry.rss_delta_bytes = max(current_rss_bytes() - rss_before, 0)
+        try:
+            entry.weights_bytes = int(sum(w.nbytes for w in model.get_weights()))
+        except Exception:
+            entry.weights_bytes = None
+        entry.loaded_at = time.time()
+        entry.model = model
+        logger.info(
+            "Loaded model %s@%s in %.2fs (RSS +%.1f MB)",
+            entry.name, entry.version, entry.load_seconds,
+            entry.rss_delta_bytes / 1e6,
+        )
+
+    def unload(self, name: str, version: Optional[str] = None) -> None:
+        """Drop the in‑memory model; it will be reloaded on next ``get``."""
+        entry = self.entry(name, version)
+        with entry.lock:
+            entry.model = None
+
+    # ── introspection ───────────────────────────────────────────
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = list(self._entries.values())
+        return [
+            dict(e.stats(), current=self._current.get(e.name) == e.version)
+            for e in entries
+        ]
+
+
+registry = ModelRegistry()
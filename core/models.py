@@ -3,6 +3,10 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+# chart kind → Prediction field that stores its path
+CHART_FIELDS = {"close": "plot_closing", "cmp": "plot_cmp", "horizon": "plot_horizon"}
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     bio  = models.TextField(blank=True)
@@ -21,6 +25,7 @@ class Prediction(models.Model):
     r2            = models.FloatField()
     plot_closing  = models.CharField(max_length=255)
     plot_cmp      = models.CharField(max_length=255)
+    plot_horizon  = models.CharField(max_length=255, blank=True, default="")   # multi‑step forecasts only
     metrics       = models.JSONField(default=dict)
 
     class Meta:
@@ -37,3 +42,84 @@ class TelegramUser(models.Model):
 
     def __str__(self):
         return f"{self.user.username} ↔️ {self.chat_id}"
+
+
+class PriceSeries(models.Model):
+    """One locally stored OHLCV history (ticker × bar interval)."""
+    ticker         = models.CharField(max_length=10)
+    interval       = models.CharField(max_length=8, default="1d")
+    refreshed_at   = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["ticker", "interval"], name="uniq_price_series"),
+        ]
+
+    def __str__(self):
+        return f"{self.ticker} [{self.interval}]"
+
+
+class PriceBar(models.Model):
+    series  = models.ForeignKey(PriceSeries, on_delete=models.CASCADE, related_name="bars")
+    ts      = models.DateTimeField()
+    open    = models.FloatField(null=True)
+    high    = models.FloatField(null=True)
+    low     = models.FloatField(null=True)
+    close   = models.FloatField()
+    volume  = models.BigIntegerField(null=True)
+
+    class Meta:
+        ordering    = ["ts"]
+        constraints = [
+            models.UniqueConstraint(fields=["series", "ts"], name="uniq_price_bar"),
+        ]
+
+    def __str__(self):
+        return f"{self.series_id} @ {self.ts:%Y-%m-%d %H:%M}"
+
+
+class PredictionJob(models.Model):
+    """A queued prediction, picked up by ``manage.py inferenceworker``."""
+    QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    user        = models.ForeignKey(User, on_delete=models.CASCADE)
+    ticker      = models.CharField(max_length=10)
+    charts      = models.BooleanField(default=True)
+    horizon     = models.PositiveSmallIntegerField(default=1)               # trading days ahead
+    status      = models.CharField(max_length=8, choices=STATUS_CHOICES, default=QUEUED)
+    prediction  = models.ForeignKey(Prediction, null=True, blank=True, on_delete=models.SET_NULL)
+    error       = models.TextField(blank=True)
+    progress    = models.JSONField(default=list, blank=True)      # core.progress stage events
+    worker      = models.CharField(max_length=64, blank=True)
+    attempts    = models.PositiveSmallIntegerField(default=0)
+    created     = models.DateTimeField(default=timezone.now)
+    started_at  = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created"]
+        indexes  = [models.Index(fields=["status", "created"])]
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.DONE, self.FAILED)
+
+    def __str__(self):
+        return f"{self.ticker} job #{self.pk} [{self.status}]"
+
+
+class TelegramFile(models.Model):
+    """
+    Telegram's ``file_id`` for a chart already uploaded by the bot, so later
+    sends (``/latest``, resends) reference it instead of uploading the PNG.
+    Keyed on the chart's path: chart files are named after their content, so
+    every prediction of the same forecast shares one upload.
+    """
+    path           = models.CharField(max_length=255, unique=True)   # as stored on Prediction
+    file_id        = models.CharField(max_length=255)
+    file_unique_id = models.CharField(max_length=64, blank=True)
+    created        = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.path
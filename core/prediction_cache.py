@@ -0,0 +1,84 @@
+# core/prediction_cache.py
+"""
+Cache of computed forecasts, backed by Django's cache framework.
+
+Entries are keyed on ``(ticker, last bar timestamp, model version)`` and
+expire at the next market close, when a new daily bar makes them stale.
+Storing an entry for a newer bar evicts the ticker's previous entry right
+away instead of waiting for it to expire.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from . import metrics
+from .market_calendar import seconds_until_next_close
+
+CacheKey = Tuple[str, Optional[str], str]
+
+HITS = metrics.counter("forecast_cache_hits_total", "Forecasts served from cache")
+MISSES = metrics.counter("forecast_cache_misses_total", "Forecasts not found in cache")
+EVICTIONS = metrics.counter(
+    "forecast_cache_evictions_total", "Entries dropped early (superseded or invalid)"
+)
+
+
+class ForecastCache:
+    prefix = "forecast:v1"
+
+    def __init__(self, alias: Optional[str] = None, ttl: Callable[[], int] = seconds_until_next_close):
+        self.alias = alias or settings.PREDICTION_CACHE_ALIAS
+        self.ttl = ttl
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _key(self, key: CacheKey) -> str:
+        ticker, last_bar, model_version = key
+        return f"{self.prefix}:{ticker}:{last_bar}:{model_version}"
+
+    def _latest_key(self, ticker: str) -> str:
+        return f"{self.prefix}:latest:{ticker}"
+
+    # ── sync API ────────────────────────────────────────────────
+    def get(self, key: CacheKey, validate: Optional[Callable[[Dict], bool]] = None) -> Optional[Dict]:
+        """Cached forecast fields, or ``None``; entries failing ``validate`` are evicted."""
+        data = self.cache.get(self._key(key))
+        if data is not None and validate is not None and not validate(data):
+            self.evict(key)
+            data = None
+        (HITS if data is not None else MISSES).inc()
+        return data
+
+    def set(self, key: CacheKey, data: Dict) -> None:
+        ticker = key[0]
+        full_key = self._key(key)
+        timeout = self.ttl()
+        previous = self.cache.get(self._latest_key(ticker))
+        if previous and previous != full_key and self.cache.delete(previous):
+            EVICTIONS.inc()
+        self.cache.set_many({full_key: data, self._latest_key(ticker): full_key}, timeout=timeout)
+
+    def evict(self, key: CacheKey) -> None:
+        if self.cache.delete(self._key(key)):
+            EVICTIONS.inc()
+
+    # ── async API (the pipeline runs on an event loop) ─────────
+    async def aget(self, key: CacheKey, validate: Optional[Callable[[Dict], bool]] = None) -> Optional[Dict]:
+        return await sync_to_async(self.get)(key, validate)
+
+    async def aset(self, key: CacheKey, data: Dict) -> None:
+        await sync_to_async(self.set)(key, data)
+
+    @staticmethod
+    def stats() -> Dict:
+        return {"hits": HITS.value, "misses": MISSES.value, "evictions": EVICTIONS.value}
+
+
+forecast_cache = ForecastCache()
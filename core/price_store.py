@@ -0,0 +1,164 @@
+# core/price_store.py
+"""
+Local OHLCV store with incremental refresh.
+
+The first request for a ticker back‑fills ``PRICE_STORE_BACKFILL_PERIOD`` of
+bars; after that only the bars since the last stored timestamp are fetched,
+and not more often than every ``PRICE_STORE_REFRESH_SECONDS``.  The last
+stored bar is always re‑fetched so a partial (intraday) daily bar gets
+overwritten with its final values.
+
+The downloader is injected, so tests can pass a fake and never touch the
+network.  It is called as ``downloader(ticker, interval=..., period=...)``
+for a back‑fill and ``downloader(ticker, interval=..., start=...)`` for an
+incremental refresh, and must return a yfinance‑shaped DataFrame (may be
+empty when there is nothing new).  It may be a plain function (run in the
+default executor by ``aget_history``) or a coroutine function (awaited).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+import pandas as pd
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PriceBar, PriceSeries
+
+logger = logging.getLogger(__name__)
+
+Downloader = Callable[..., pd.DataFrame]
+_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Flatten yfinance's (field, ticker) columns and drop rows without a close."""
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.droplevel(-1, axis=1) if "Close" in df.columns.get_level_values(0) else df.droplevel(0, axis=1)
+    return df.dropna(subset=["Close"])
+
+
+def _aware(ts) -> datetime:
+    ts = pd.Timestamp(ts)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    return ts.to_pydatetime()
+
+
+def read_history(ticker: str, interval: str = "1d", end: Optional[datetime] = None) -> pd.DataFrame:
+    """Read stored bars as a yfinance‑shaped DataFrame (no network)."""
+    qs = PriceBar.objects.filter(series__ticker=ticker.upper(), series__interval=interval)
+    if end is not None:
+        qs = qs.filter(ts__lte=_aware(end))
+    rows = list(qs.order_by("ts").values_list("ts", *_FIELDS))
+    df = pd.DataFrame(rows, columns=["Date", *(f.capitalize() for f in _FIELDS)])
+    df["Date"] = pd.to_datetime(df["Date"], utc=True).dt.tz_localize(None)
+    return df.set_index("Date")
+
+
+class PriceStore:
+    def __init__(
+        self,
+        downloader: Downloader,
+        backfill_period: Optional[str] = None,
+        refresh_seconds: Optional[float] = None,
+    ):
+        self.downloader = downloader
+        self.backfill_period = backfill_period or settings.PRICE_STORE_BACKFILL_PERIOD
+        self.refresh_after = timedelta(
+            seconds=refresh_seconds if refresh_seconds is not None else settings.PRICE_STORE_REFRESH_SECONDS
+        )
+
+    # ── planning / persistence (sync ORM) ───────────────────────
+    def _plan(self, ticker: str, interval: str) -> Tuple[PriceSeries, Optional[dict]]:
+        """Return the series and downloader kwargs, or ``None`` if it is fresh."""
+        series, _ = PriceSeries.objects.get_or_create(ticker=ticker, interval=interval)
+        if series.refreshed_at and timezone.now() - series.refreshed_at < self.refresh_after:
+            return series, None
+        last_ts = series.bars.order_by("-ts").values_list("ts", flat=True).first()
+        if last_ts is None:
+            return series, {"interval": interval, "period": self.backfill_period}
+        return series, {"interval": interval, "start": last_ts.date().isoformat()}
+
+    @transaction.atomic
+    def _save(self, series: PriceSeries, df: pd.DataFrame) -> int:
+        bars: List[PriceBar] = []
+        if not df.empty:
+            df = normalize_frame(df)
+            cols = {f: f.capitalize() for f in _FIELDS}
+            for ts, row in zip(df.index, df.to_dict("records")):
+                values = {
+                    f: (None if pd.isna(row.get(col)) else row[col])
+                    for f, col in cols.items()
+                }
+                if values["volume"] is not None:
+                    values["volume"] = int(values["volume"])
+                bars.append(PriceBar(series=series, ts=_aware(ts), **values))
+            PriceBar.objects.bulk_create(
+                bars,
+                update_conflicts=True,
+                unique_fields=["series", "ts"],
+                update_fields=list(_FIELDS),
+            )
+        series.refreshed_at = timezone.now()
+        series.save(update_fields=["refreshed_at"])
+        return len(bars)
+
+    def history(
+        self, ticker: str, interval: str = "1d", end: Optional[datetime] = None
+    ) -> pd.DataFrame:
+        return read_history(ticker, interval, end)
+
+    def _refresh_failed(self, ticker: str, kwargs: dict, exc: Exception) -> None:
+        """A failed incremental refresh falls back to stored bars; a failed back‑fill raises."""
+        if "start" not in kwargs:
+            raise exc
+        logger.warning("price_store: refresh of %s failed (%s); serving stored bars", ticker, exc)
+
+    def _download(self, ticker: str, kwargs: dict) -> Optional[pd.DataFrame]:
+        fetch = self.downloader
+        if asyncio.iscoroutinefunction(fetch):
+            fetch = async_to_sync(fetch)
+        try:
+            return fetch(ticker, **kwargs)
+        except Exception as exc:
+            self._refresh_failed(ticker, kwargs, exc)
+            return None
+
+    async def _adownload(self, ticker: str, kwargs: dict) -> Optional[pd.DataFrame]:
+        try:
+            if asyncio.iscoroutinefunction(self.downloader):
+                return await self.downloader(ticker, **kwargs)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, lambda: self.downloader(ticker, **kwargs))
+        except Exception as exc:
+            self._refresh_failed(ticker, kwargs, exc)
+            return None
+
+    # ── public API ──────────────────────────────────────────────
+    def refresh(self, ticker: str, interval: str = "1d") -> int:
+        """Bring the stored series up to date; returns the number of bars written."""
+        series, kwargs = self._plan(ticker.upper(), interval)
+        if kwargs is None:
+            return 0
+        df = self._download(series.ticker, kwargs)
+        return 0 if df is None else self._save(series, df)
+
+    def get_history(self, ticker: str, interval: str = "1d") -> pd.DataFrame:
+        self.refresh(ticker, interval)
+        return self.history(ticker, interval)
+
+    async def aget_history(self, ticker: str, interval: str = "1d") -> pd.DataFrame:
+        """Async variant: the download never runs on the ORM thread."""
+        series, kwargs = await sync_to_async(self._plan)(ticker.upper(), interval)
+        if kwargs is not None:
+            df = await self._adownload(series.ticker, kwargs)
+            if df is not None:
+                written = await sync_to_async(self._save)(series, df)
+                logger.debug("price_store: %s %s +%d bars", series.ticker, interval, written)
+        return await sync_to_async(self.history)(ticker, interval)
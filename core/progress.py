@@ -0,0 +1,94 @@
+# core/progress.py
+"""
+Stage events for one prediction.
+
+``run_prediction_async`` reports each pipeline stage – ``download``,
+``scale``, ``infer``, ``persist`` – as it starts and finishes, and whoever
+draws the charts reports ``render``.  Listeners (the bot's status message,
+the job row the SSE endpoint streams from) get every event as it happens;
+the stage durations end up in ``Prediction.metrics["timings"]``.
+
+Stages a request did not run itself – a forecast served from the cache or
+shared with an identical in‑flight request – are reported as ``cached``.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("download", "scale", "infer", "render", "persist")
+STARTED, DONE, FAILED, CACHED = "started", "done", "failed", "cached"
+
+STAGE_SECONDS = {
+    stage: metrics.histogram(
+        "pipeline_stage_seconds", "Time spent in one prediction stage",
+        buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10), labels={"stage": stage},
+    )
+    for stage in STAGES
+}
+STAGE_FAILURES = {
+    stage: metrics.counter("pipeline_stage_failures_total", "Prediction stages that raised", labels={"stage": stage})
+    for stage in STAGES
+}
+
+
+@dataclass(frozen=True)
+class StageEvent:
+    stage: str
+    status: str
+    seconds: Optional[float] = None
+    at: float = 0.0
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+Listener = Callable[[StageEvent], Awaitable[None]]
+
+
+class Progress:
+    def __init__(self, *listeners: Listener):
+        self.events: List[StageEvent] = []
+        self.timings: Dict[str, float] = {}
+        self._listeners = list(listeners)
+
+    def subscribe(self, listener: Listener) -> None:
+        self._listeners.append(listener)
+
+    async def emit(self, stage: str, status: str, seconds: Optional[float] = None) -> None:
+        event = StageEvent(stage, status, None if seconds is None else round(seconds, 4), time.time())
+        self.events.append(event)
+        for listener in self._listeners:
+            try:
+                await listener(event)
+            except Exception:                # a broken listener must not fail the prediction
+                logger.exception("progress listener failed on %s/%s", stage, status)
+
+    @asynccontextmanager
+    async def stage(self, name: str) -> AsyncIterator[None]:
+        await self.emit(name, STARTED)
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            STAGE_FAILURES[name].inc()
+            await self.emit(name, FAILED, time.perf_counter() - started)
+            raise
+        elapsed = time.perf_counter() - started
+        self.timings[name] = round(elapsed, 4)
+        STAGE_SECONDS[name].observe(elapsed)
+        await self.emit(name, DONE, elapsed)
+
+    async def skipped(self, *names: str) -> None:
+        """Report stages someone else ran for us (cache hit, shared flight)."""
+        for name in names:
+            if name not in self.timings:
+                await self.emit(name, CACHED)
@@ -0,0 +1,233 @@
+# core/ratelimit.py
+"""
+Per‑user request rate limits, shared by every process through the cache.
+
+Each (scope, caller) pair keeps two integer counters – this window's and
+the previous one's – and the rate is estimated as a sliding window:
+
+    previous × (1 − elapsed / period) + current
+
+so memory and work per call are constant however many hits there are.
+A hit is counted with an atomic ``cache.incr`` and taken back with
+``cache.decr`` when refused, which means concurrent callers can never be
+admitted past the limit (a refusal racing a hit may at worst refuse one
+call too many).
+
+Limits are configured per scope and tier in ``settings.RATE_LIMITS``:
+
+    RATE_LIMITS = {"predict": {"default": "10/m", "pro": "60/m"}}
+
+A user's tier is the name of a Django auth group they belong to; users in
+no configured group get ``"default"``.
+
+``@ratelimit(scope)`` applies a limit to DRF view methods, async Django
+view methods and Telegram bot handlers alike: the caller is taken from the
+request (user, or client IP when anonymous) or from the update's chat.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import math
+import re
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import caches
+from django.http import JsonResponse
+from rest_framework.exceptions import Throttled
+
+from . import metrics
+
+DEFAULT_TIER = "default"
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_RATE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*([smhd])\w*\s*$")
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """``"10/m"`` → ``(10, 60)``; ``"100/15m"`` → ``(100, 900)``."""
+    match = _RATE.match(rate)
+    if not match:
+        raise ValueError(f"Invalid rate {rate!r}; expected e.g. '10/m' or '100/15m'")
+    count, multiple, unit = match.groups()
+    return int(count), int(multiple or 1) * _UNITS[unit]
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    limit: int
+    period: int
+    remaining: int
+    retry_after: int
+
+
+class RateLimiter:
+    prefix = "rl:v1"
+
+    def __init__(
+        self,
+        scope: str,
+        rates: Optional[Dict[str, str]] = None,
+        alias: str = "default",
+        clock: Callable[[], float] = time.time,
+    ):
+        self.scope = scope
+        self._rates = rates
+        self.alias = alias
+        self.clock = clock
+        self.allowed = metrics.counter(f"ratelimit_{scope}_allowed_total", "Calls within the limit")
+        self.refused = metrics.counter(f"ratelimit_{scope}_refused_total", "Calls over the limit")
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def rates(self) -> Dict[str, Tuple[int, int]]:
+        rates = self._rates if self._rates is not None else settings.RATE_LIMITS.get(self.scope, {})
+        return {tier: parse_rate(rate) for tier, rate in rates.items()}
+
+    def rate_for(self, tier: str) -> Tuple[int, int]:
+        rates = self.rates
+        return rates.get(tier) or rates[DEFAULT_TIER]
+
+    def _key(self, ident: Any, window: int) -> str:
+        return f"{self.prefix}:{self.scope}:{ident}:{window}"
+
+    # ── core ────────────────────────────────────────────────────
+    def hit(self, ident: Any, tier: str = DEFAULT_TIER) -> Decision:
+        """Count one call by ``ident``; refused calls are not counted."""
+        limit, period = self.rate_for(tier)
+        now = self.clock()
+        window = int(now // period)
+        elapsed = now - window * period
+        weight = 1 - elapsed / period
+        current = self._key(ident, window)
+
+        self.cache.add(current, 0, timeout=2 * period + 1)
+        try:
+            count = self.cache.incr(current)
+        except ValueError:                          # expired between add and incr
+            self.cache.set(current, 1, timeout=2 * period + 1)
+            count = 1
+        previous = self.cache.get(self._key(ident, window - 1), 0)
+        estimate = previous * weight + count
+
+        if estimate <= limit:
+            self.allowed.inc()
+            return Decision(True, limit, period, int(limit - estimate), 0)
+
+        try:
+            self.cache.decr(current)
+        except ValueError:
+            pass
+        self.refused.inc()
+        # time until the previous window's share has decayed enough for one more call
+        if count > limit or not previous:
+            wait = period - elapsed
+        else:
+            wait = period * (1 - (limit - count) / previous) - elapsed
+        return Decision(False, limit, period, 0, max(1, math.ceil(wait)))
+
+    def reset(self, ident: Any) -> None:
+        periods = {p for _, p in self.rates.values()}
+        keys = []
+        for period in periods:
+            window = int(self.clock() // period)
+            keys += [self._key(ident, window), self._key(ident, window - 1)]
+        self.cache.delete_many(keys)
+
+    # ── callers ─────────────────────────────────────────────────
+    def check(self, subject: Any) -> Decision:
+        """Rate‑limit a request or a Telegram update (sync; may query the DB for the tier)."""
+        ident, tier = self._identify(subject)
+        return self.hit(ident, tier)
+
+    async def acheck(self, subject: Any) -> Decision:
+        return await sync_to_async(self.check)(subject)
+
+    def _identify(self, subject: Any) -> Tuple[str, str]:
+        chat = getattr(subject, "effective_chat", None)
+        if chat is not None:                                     # telegram Update
+            return f"chat:{chat.id}", self._chat_tier(chat.id)
+        user = getattr(subject, "user", None)
+        if user is not None and user.is_authenticated:
+            return f"user:{user.pk}", self._user_tier(user.groups)
+        return f"ip:{subject.META.get('REMOTE_ADDR', '')}", DEFAULT_TIER
+
+    def _user_tier(self, groups) -> str:
+        rates = self.rates
+        tiers = [t for t in rates if t != DEFAULT_TIER]
+        names = set(groups.filter(name__in=tiers).values_list("name", flat=True)) if tiers else ()
+        if not names:
+            return DEFAULT_TIER
+        # the most generous tier the user belongs to
+        return max(names, key=lambda t: rates[t][0] / rates[t][1])
+
+    def _chat_tier(self, chat_id: int) -> str:
+        return self._user_tier(Group.objects.filter(user__telegramuser__chat_id=chat_id))
+
+
+def too_many_requests(decision: Decision) -> JsonResponse:
+    response = JsonResponse(
+        {"detail": f"Rate limit exceeded ({decision.limit} per {decision.period}s)"}, status=429
+    )
+    response["Retry-After"] = str(decision.retry_after)
+    return response
+
+
+async def _refuse(subject: Any, decision: Decision):
+    if getattr(subject, "effective_chat", None) is not None:
+        minutes = decision.period // 60
+        per = f"{minutes} min" if minutes > 1 else "minute" if minutes else f"{decision.period}s"
+        await subject.effective_message.reply_text(
+            f"⏳ Rate limit: {decision.limit} requests per {per}. Try again in {decision.retry_after}s."
+        )
+        return None
+    return too_many_requests(decision)
+
+
+def _subject(args) -> Any:
+    for arg in args:
+        if hasattr(arg, "effective_chat") or hasattr(arg, "META"):
+            return arg
+    raise TypeError("@ratelimit needs a request or a telegram Update argument")
+
+
+def ratelimit(scope: str, on_limited: Optional[Callable] = None, limiter: Optional[RateLimiter] = None):
+    """
+    Limit calls to a view method or bot handler.  Over the limit, async
+    views answer 429 (with ``Retry-After``), bot handlers reply with a
+    notice, and sync DRF views raise ``Throttled``; ``on_limited(subject,
+    decision)`` replaces that default.
+    """
+    limiter = limiter or RateLimiter(scope)
+
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                subject = _subject(args)
+                decision = await limiter.acheck(subject)
+                if not decision.allowed:
+                    return await (on_limited or _refuse)(subject, decision)
+                return await fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                subject = _subject(args)
+                decision = limiter.check(subject)
+                if not decision.allowed:
+                    if on_limited is not None:
+                        return on_limited(subject, decision)
+                    raise Throttled(wait=decision.retry_after)
+                return fn(*args, **kwargs)
+
+        wrapper.limiter = limiter
+        return wrapper
+
+    return decorator
@@ -0,0 +1,71 @@
+# core/rollout.py
+"""
+Multi‑step forecasts by recursive rollout.
+
+The model predicts one close from the last ``window`` scaled closes.  For
+``horizon`` days ahead each prediction is appended to the window and fed
+back in: step ``k`` sees the ``window - k`` most recent real closes and the
+``k`` predictions before it.
+
+All series of a rollout advance together, so every step is one batched
+model call however many tickers are in flight.  The windows live in one
+preallocated ``(n, window + horizon - 1, 1)`` buffer; each step's input is
+a view into it, nothing is copied or shifted between steps.
+"""
+
+from __future__ import annotations
+
+from typing import Awaitable, Callable
+
+import numpy as np
+
+
+class Rollout:
+    """State of a rollout over ``n`` scaled ``(window, 1)`` windows."""
+
+    def __init__(self, windows: np.ndarray, horizon: int):
+        windows = np.asarray(windows, dtype=np.float32)
+        if windows.ndim == 2:
+            windows = windows[None]
+        if horizon < 1:
+            raise ValueError("horizon must be at least 1")
+        n, self.window, features = windows.shape
+        self.horizon = horizon
+        self._inputs = np.empty((n, self.window + horizon - 1, features), dtype=np.float32)
+        self._inputs[:, :self.window] = windows
+        self.path = np.empty((n, horizon), dtype=np.float64)      # scaled predictions
+        self.step = 0
+
+    @property
+    def done(self) -> bool:
+        return self.step >= self.horizon
+
+    def inputs(self) -> np.ndarray:
+        """The ``(n, window, 1)`` model input of the current step (a view)."""
+        return self._inputs[:, self.step:self.step + self.window]
+
+    def push(self, preds: np.ndarray) -> None:
+        """Record the current step's predictions (one per series) and feed them back."""
+        preds = np.asarray(preds).reshape(len(self.path), -1)[:, 0]
+        self.path[:, self.step] = preds
+        if self.step < self.horizon - 1:          # the last prediction is never an input
+            self._inputs[:, self.step + self.window, 0] = preds
+        self.step += 1
+
+
+def rollout(windows: np.ndarray, horizon: int, predict: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    """``(n, horizon)`` scaled path; ``predict`` maps ``(n, window, 1)`` to ``(n, 1)``."""
+    state = Rollout(windows, horizon)
+    while not state.done:
+        state.push(predict(state.inputs()))
+    return state.path
+
+
+async def arollout(
+    windows: np.ndarray, horizon: int, predict: Callable[[np.ndarray], Awaitable[np.ndarray]]
+) -> np.ndarray:
+    """``rollout`` with an awaitable ``predict`` (e.g. ``MicroBatcher.predict_many``)."""
+    state = Rollout(windows, horizon)
+    while not state.done:
+        state.push(await predict(state.inputs()))
+    return state.path
@@ -0,0 +1,93 @@
+# core/scaling.py
+"""
+Min–max scaling for model inputs, in plain NumPy.
+
+The model was trained on closes scaled by scikit‑learn's ``MinMaxScaler()``
+fitted on the whole history.  ``MinMaxScale`` repeats its arithmetic step
+for step – ``scale = 1 / (max - min)`` (1 for a flat series),
+``x * scale + (0 - min * scale)`` and back ``(y - min_) / scale`` – so the
+results are bit‑identical, without scikit‑learn's import time, input
+validation or per‑call copies.
+
+One instance can hold the parameters of many series (one per ticker); a
+batch of predictions is then turned back into prices in a single call.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+# scikit‑learn treats a range below this as zero (and scales by 1 instead)
+_ZERO_RANGE = 10 * np.finfo(np.float64).eps
+
+
+class MinMaxScale:
+    """Fitted min–max parameters, one entry per series (arrays of shape ``(n,)``)."""
+
+    def __init__(self, data_min: np.ndarray, data_max: np.ndarray):
+        self.data_min = np.asarray(data_min, dtype=np.float64).reshape(-1)
+        self.data_max = np.asarray(data_max, dtype=np.float64).reshape(-1)
+        data_range = self.data_max - self.data_min
+        data_range[data_range < _ZERO_RANGE] = 1.0
+        self.scale = 1.0 / data_range
+        self.min_ = 0.0 - self.data_min * self.scale
+
+    def __len__(self) -> int:
+        return len(self.scale)
+
+    def __getitem__(self, index) -> "MinMaxScale":
+        """The entries selected by ``index`` (an int, slice or index array)."""
+        return MinMaxScale(self.data_min[index], self.data_max[index])
+
+    @classmethod
+    def fit(cls, prices: np.ndarray) -> "MinMaxScale":
+        """Fit one series, ``(T,)`` or ``(T, 1)``."""
+        prices = np.asarray(prices, dtype=np.float64)
+        return cls(np.nanmin(prices), np.nanmax(prices))
+
+    @classmethod
+    def fit_many(cls, series: Iterable[np.ndarray]) -> "MinMaxScale":
+        """Fit several series of any lengths; entry ``i`` belongs to ``series[i]``."""
+        series = [np.asarray(s, dtype=np.float64) for s in series]
+        return cls([np.nanmin(s) for s in series], [np.nanmax(s) for s in series])
+
+    @classmethod
+    def concat(cls, scalers: Iterable["MinMaxScale"]) -> "MinMaxScale":
+        """One instance holding the entries of ``scalers``, in order."""
+        scalers = list(scalers)
+        return cls(
+            np.concatenate([s.data_min for s in scalers]), np.concatenate([s.data_max for s in scalers])
+        )
+
+    def _per_series(self, params: np.ndarray, values: np.ndarray) -> np.ndarray:
+        # one series broadcasts as is; several pair row ``i`` with entry ``i``
+        if len(params) > 1 and values.ndim > 1:
+            return params[:, None]
+        return params
+
+    def transform(self, prices: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Scale ``prices``; with ``out`` (may be ``prices`` itself) nothing is allocated."""
+        prices = np.asarray(prices, dtype=np.float64)
+        out = np.multiply(prices, self._per_series(self.scale, prices), out=out)
+        return np.add(out, self._per_series(self.min_, out), out=out)
+
+    def inverse(self, scaled: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Prices for scaled values; ``scaled[i]`` (a value or a row) belongs to series ``i``."""
+        scaled = np.asarray(scaled, dtype=np.float64)
+        out = np.subtract(scaled, self._per_series(self.min_, scaled), out=out)
+        return np.divide(out, self._per_series(self.scale, out), out=out)
+
+    def inverse_one(self, value: float, index: int = 0) -> float:
+        """A single scaled value back to a price, in plain float arithmetic."""
+        return (float(value) - float(self.min_[index])) / float(self.scale[index])
+
+    # scikit‑learn spelling, for callers written against ``MinMaxScaler``
+    inverse_transform = inverse
+
+
+def fit_transform(prices: np.ndarray, out: Optional[np.ndarray] = None) -> Tuple[MinMaxScale, np.ndarray]:
+    """Fit one series and scale it: ``(scaler, scaled)``, ``scaled`` shaped like ``prices``."""
+    scaler = MinMaxScale.fit(prices)
+    return scaler, scaler.transform(prices, out=out)
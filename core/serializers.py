@@ -19,12 +19,61 @@ class RegisterSerializer(serializers.ModelSerializer):
 
 
 # core/serializers.py  (add below RegisterSerializer)
-from .models import Prediction
+from django.urls import reverse
+from .models import Prediction, PredictionJob
 
 class PredictionSerializer(serializers.ModelSerializer):
+    # lazily rendered charts (None when the prediction opted out of charts)
+    plot_closing_url = serializers.SerializerMethodField()
+    plot_cmp_url     = serializers.SerializerMethodField()
+    plot_horizon_url = serializers.SerializerMethodField()
+    # multi‑step forecast: one price per trading day ahead, path[0] == next_price
+    horizon          = serializers.SerializerMethodField()
+    path             = serializers.SerializerMethodField()
+
     class Meta:
         model  = Prediction
         fields = [
-            "id", "ticker", "created", "next_price",
-            "mse", "rmse", "r2", "plot_closing", "plot_cmp"
+            "id", "ticker", "created", "next_price", "horizon", "path",
+            "mse", "rmse", "r2", "plot_closing", "plot_cmp", "plot_horizon",
+            "plot_closing_url", "plot_cmp_url", "plot_horizon_url",
         ]
+
+    def _plot_url(self, obj, kind, field):
+        if not getattr(obj, field):
+            return None
+        return reverse("prediction-plot", args=[obj.pk, kind])
+
+    def get_plot_closing_url(self, obj):
+        return self._plot_url(obj, "close", "plot_closing")
+
+    def get_plot_cmp_url(self, obj):
+        return self._plot_url(obj, "cmp", "plot_cmp")
+
+    def get_plot_horizon_url(self, obj):
+        return self._plot_url(obj, "horizon", "plot_horizon")
+
+    def get_horizon(self, obj):
+        return (obj.metrics or {}).get("horizon", 1)
+
+    def get_path(self, obj):
+        return (obj.metrics or {}).get("path") or [float(obj.next_price)]
+
+
+class PredictionJobSerializer(serializers.ModelSerializer):
+    prediction = PredictionSerializer(read_only=True)
+    status_url = serializers.SerializerMethodField()
+    events_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model  = PredictionJob
+        fields = [
+            "id", "ticker", "horizon", "status", "error", "created",
+            "started_at", "finished_at", "status_url", "events_url", "progress", "prediction",
+        ]
+
+    def get_status_url(self, obj):
+        return reverse("prediction-job", args=[obj.pk])
+
+    def get_events_url(self, obj):
+        return reverse("prediction-job-events", args=[obj.pk])
@@ -0,0 +1,70 @@
+# core/singleflight.py
+"""
+Coalesce identical in‑flight async computations.
+
+The first caller for a key (the leader) runs the coroutine; everyone who
+asks for the same key while it is running awaits the leader's result
+instead of starting their own.  Results are handed over through a
+``concurrent.futures.Future``, so callers on different threads or event
+loops (WSGI ``async_to_sync`` calls, the bot's loop) still share the work.
+Nothing is cached once the leader finishes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from . import metrics
+
+T = TypeVar("T")
+
+
+class _LeaderAbandoned(Exception):
+    """The leader was cancelled; followers should try again themselves."""
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = metrics.counter(f"singleflight_{name}_leaders_total", "Computations started")
+        self.followers = metrics.counter(f"singleflight_{name}_followers_total", "Callers that joined one")
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            with self._lock:
+                fut = self._calls.get(key)
+                leader = fut is None
+                if leader:
+                    fut = self._calls[key] = Future()
+
+            if not leader:
+                self.followers.inc()
+                try:
+                    # shield: one follower giving up must not cancel the shared future
+                    return await asyncio.shield(asyncio.wrap_future(fut))
+                except _LeaderAbandoned:
+                    continue
+
+            self.leaders.inc()
+            try:
+                result = await fn()
+            except Exception as exc:
+                fut.set_exception(exc)
+                raise
+            except BaseException:
+                fut.set_exception(_LeaderAbandoned())
+                raise
+            else:
+                fut.set_result(result)
+                return result
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
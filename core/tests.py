@@ -1,3 +1,1724 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+import httpx
+import numpy as np
+import pandas as pd
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import Group, User
+from django.core.management import CommandError, call_command
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import RefreshToken
+from telegram import Bot, PhotoSize
+from telegram.error import BadRequest
+
+from .backpressure import ConcurrencyLimiter, Saturated
+from .batching import MicroBatcher
+from .bulk import BulkProgress, bulk_predict_async
+from . import charts
+from .charts import chart_paths
+from . import market_data
+from . import metrics
+from .market_calendar import MARKET_TZ, holidays, next_close
+from .market_data import YahooClient, YahooError, run_sync
+from .throttle import OutboundBudget, RateLimited
+from .tg_files import send_chart, send_charts
+from .tg_webhook import ChatOrderedUpdateProcessor, WebhookServer
+from .warmup import Warmup
+from .model_registry import ModelRegistry
+from . import jobs
+from .models import Prediction, PredictionJob, PriceSeries, TelegramFile, TelegramUser
+from .prediction_cache import EVICTIONS, HITS, MISSES, ForecastCache
+from .price_store import PriceStore
+from .progress import Progress
+from .ratelimit import RateLimiter, parse_rate, ratelimit
+from .singleflight import SingleFlight
+
+
+class _FakeModel:
+    """Predicts the last value of every window."""
+
+    def __init__(self):
+        self.batches = []
+
+    def get_weights(self):
+        return []
+
+    def predict_on_batch(self, x):
+        self.batches.append(x.shape)
+        return x[:, -1, :]
+
+
+async def _read_stream(response) -> bytes:
+    return b"".join([chunk async for chunk in response.streaming_content])
+
+
+def _fake_registry(model_path):
+    reg = ModelRegistry(loader=lambda path: _FakeModel())
+    reg.register("default", model_path, version="test")
+    return reg
+
+
+class ModelRegistryTests(SimpleTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".keras")
+        os.write(fd, b"weights")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def test_concurrent_get_loads_once(self):
+        loads = []
+
+        def loader(path):
+            loads.append(path)
+            time.sleep(0.05)
+            return _FakeModel()
+
+        reg = ModelRegistry(loader=loader)
+        reg.register("m", self.path)
+        seen = []
+        threads = [threading.Thread(target=lambda: seen.append(reg.get("m"))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(len({id(m) for m in seen}), 1)
+        stats = reg.stats()[0]
+        self.assertTrue(stats["loaded"])
+        self.assertGreaterEqual(stats["load_seconds"], 0.05)
+
+    def test_versions_are_kept_side_by_side(self):
+        reg = ModelRegistry(loader=lambda path: _FakeModel())
+        v1 = reg.register("m", self.path, version="v1")
+        reg.register("m", self.path, version="v2")
+        self.assertEqual(reg.entry("m").version, "v2")
+        self.assertIs(reg.entry("m", "v1"), v1)
+        self.assertIsNot(reg.get("m", "v1"), reg.get("m", "v2"))
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def test_concurrent_windows_share_one_call_and_keep_their_rows(self):
+        calls = []
+
+        def predict_fn(x):
+            calls.append(x.shape)
+            return x.sum(axis=(1, 2)).reshape(-1, 1)
+
+        batcher = MicroBatcher(predict_fn, max_batch_size=16, max_wait_ms=100)
+        windows = [np.full((60, 1), i, dtype=np.float32) for i in range(10)]
+        futures = batcher.submit_many(windows)
+        results = [f.result(timeout=5)[0] for f in futures]
+
+        self.assertEqual(results, [60.0 * i for i in range(10)])
+        self.assertEqual(calls, [(10, 60, 1)])
+
+    def test_errors_reach_every_caller(self):
+        def predict_fn(x):
+            raise RuntimeError("boom")
+
+        batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=1)
+        with self.assertLogs("core.batching", "ERROR"):
+            fut = batcher.submit(np.zeros((1, 60, 1)))
+            with self.assertRaises(RuntimeError):
+                fut.result(timeout=5)
+
+
+def _bars(start, periods, first_close=100.0):
+    idx = pd.bdate_range(start, periods=periods, name="Date")
+    close = first_close + np.arange(periods, dtype=float)
+    return pd.DataFrame(
+        {"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 1000},
+        index=idx,
+    )
+
+
+def _jwt_client(user):
+    """API client sending a real bearer token (the async views do their own auth)."""
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+    return client
+
+
+class FakeDownloader:
+    """Serves slices of a fixed history and records every call."""
+
+    def __init__(self, full):
+        self.full = full
+        self.calls = []
+
+    def __call__(self, ticker, interval="1d", period=None, start=None):
+        self.calls.append({"ticker": ticker, "period": period, "start": start})
+        return self.full if start is None else self.full.loc[start:]
+
+
+class PriceStoreTests(TestCase):
+    def test_backfill_then_incremental_refresh(self):
+        full = _bars("2024-01-01", 80)
+        fake = FakeDownloader(full.iloc[:70])
+        store = PriceStore(fake, backfill_period="10y", refresh_seconds=0)
+
+        df = store.get_history("aapl")
+        self.assertEqual(len(df), 70)
+        self.assertEqual(fake.calls[-1], {"ticker": "AAPL", "period": "10y", "start": None})
+
+        # new bars arrive; the last stored bar is revised
+        fake.full = full.copy()
+        fake.full.iloc[69, fake.full.columns.get_loc("Close")] = 999.0
+        df = store.get_history("AAPL")
+
+        self.assertEqual(fake.calls[-1]["start"], full.index[69].date().isoformat())
+        self.assertEqual(len(df), 80)
+        self.assertEqual(df["Close"].iloc[69], 999.0)
+        self.assertTrue(df.index.is_monotonic_increasing)
+
+    def test_fresh_series_skips_download(self):
+        fake = FakeDownloader(_bars("2024-01-01", 65))
+        store = PriceStore(fake, refresh_seconds=3600)
+        store.get_history("MSFT")
+        store.get_history("MSFT")
+        self.assertEqual(len(fake.calls), 1)
+
+    def test_failed_refresh_serves_stored_bars(self):
+        fake = FakeDownloader(_bars("2024-01-01", 65))
+        store = PriceStore(fake, refresh_seconds=0)
+        store.get_history("TSLA")
+
+        def broken(*args, **kwargs):
+            raise ConnectionError("offline")
+
+        store.downloader = broken
+        with self.assertLogs("core.price_store", "WARNING"):
+            self.assertEqual(len(store.get_history("TSLA")), 65)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_identical_calls_share_one_computation(self):
+        flights = SingleFlight("test_share")
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return object()
+
+        async def main():
+            return await asyncio.gather(*[flights.do("AAPL", compute) for _ in range(10)])
+
+        results = asyncio.run(main())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len({id(r) for r in results}), 1)
+        self.assertEqual(flights.in_flight(), 0)
+
+    def test_callers_on_other_threads_join_the_leader(self):
+        flights = SingleFlight("test_threads")
+        calls, results = [], []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.2)
+            return "done"
+
+        threads = [
+            threading.Thread(target=lambda: results.append(asyncio.run(flights.do("k", compute))))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, ["done"] * 4)
+
+    def test_failures_propagate_and_are_not_cached(self):
+        flights = SingleFlight("test_fail")
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("no data")
+
+        async def main():
+            return await asyncio.gather(*[flights.do("X", fail) for _ in range(3)], return_exceptions=True)
+
+        self.assertTrue(all(isinstance(r, ValueError) for r in asyncio.run(main())))
+        self.assertEqual(flights.in_flight(), 0)
+
+
+class MarketCalendarTests(SimpleTestCase):
+    def test_holidays_2026(self):
+        self.assertEqual(
+            sorted(holidays(2026)),
+            [
+                date(2026, 1, 1), date(2026, 1, 19), date(2026, 2, 16), date(2026, 4, 3),
+                date(2026, 5, 25), date(2026, 6, 19), date(2026, 7, 3), date(2026, 9, 7),
+                date(2026, 11, 26), date(2026, 12, 25),
+            ],
+        )
+
+    def test_next_close(self):
+        def at(*args):
+            return datetime(*args, tzinfo=MARKET_TZ)
+
+        # before the bell → same day; after → next session
+        self.assertEqual(next_close(at(2026, 10, 14, 10, 0)), at(2026, 10, 14, 16, 0))
+        self.assertEqual(next_close(at(2026, 10, 16, 16, 30)), at(2026, 10, 19, 16, 0))
+        # Thanksgiving is shut, the day after closes early
+        self.assertEqual(next_close(at(2026, 11, 25, 17, 0)), at(2026, 11, 27, 13, 0))
+
+
+class ForecastCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.fc = ForecastCache(alias="default", ttl=lambda: 60)
+        self.fc.cache.clear()
+
+    def test_hit_miss_and_supersede(self):
+        old, new = ("AAPL", "2026-10-15", "v1"), ("AAPL", "2026-10-16", "v1")
+        hits, misses, evictions = HITS.value, MISSES.value, EVICTIONS.value
+
+        self.assertIsNone(self.fc.get(old))
+        self.fc.set(old, {"next_price": 1.0})
+        self.assertEqual(self.fc.get(old), {"next_price": 1.0})
+        self.fc.set(new, {"next_price": 2.0})       # newer bar evicts the old entry
+
+        self.assertIsNone(self.fc.get(old))
+        self.assertEqual(self.fc.get(new), {"next_price": 2.0})
+        self.assertEqual(HITS.value - hits, 2)
+        self.assertEqual(MISSES.value - misses, 2)
+        self.assertEqual(EVICTIONS.value - evictions, 1)
+
+    def test_invalid_entries_are_evicted(self):
+        key = ("MSFT", "2026-10-16", "v1")
+        self.fc.set(key, {"plot_cmp": "gone.png"})
+        self.assertIsNone(self.fc.get(key, validate=lambda data: False))
+        self.assertIsNone(self.fc.cache.get(self.fc._key(key)))
+
+
+class BulkPredictTests(TestCase):
+    def setUp(self):
+        fd, path = tempfile.mkstemp(suffix=".keras")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        self.registry = _fake_registry(path)
+        self.user = User.objects.create(username="nightly")
+
+        histories = {"AAA": _bars("2024-01-01", 90), "BBB": _bars("2024-01-01", 90, 50.0),
+                     "CCC": _bars("2024-01-01", 90, 10.0), "TINY": _bars("2024-01-01", 20)}
+
+        def downloader(ticker, interval="1d", period=None, start=None):
+            return histories[ticker]
+
+        self.store = PriceStore(downloader, refresh_seconds=3600)
+        patches = [mock.patch("core.bulk.registry", self.registry),
+                   mock.patch("core.bulk.price_store", self.store)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_chunks_share_one_model_call_and_resume(self):
+        fd, progress_path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        os.remove(progress_path)
+        self.addCleanup(lambda: os.path.exists(progress_path) and os.remove(progress_path))
+
+        report = async_to_sync(bulk_predict_async)(
+            self.user, ["aaa", "BBB", "TINY"], chunk_size=3, progress=BulkProgress(progress_path),
+        )
+        self.assertEqual(sorted(r.ticker for r in report.succeeded), ["AAA", "BBB"])
+        self.assertEqual([r.ticker for r in report.failed], ["TINY"])
+        self.assertEqual(self.registry.get().batches, [(2, 60, 1)])
+        self.assertEqual(Prediction.objects.count(), 2)
+        # the fake model echoes the last scaled close, so the price is the last close
+        self.assertAlmostEqual(float(Prediction.objects.get(ticker="AAA").next_price), 189.0, places=3)
+
+        report = async_to_sync(bulk_predict_async)(
+            self.user, ["AAA", "BBB", "CCC"], progress=BulkProgress(progress_path),
+        )
+        self.assertEqual(report.skipped, 2)
+        self.assertEqual([r.ticker for r in report.succeeded], ["CCC"])
+        self.assertEqual(Prediction.objects.count(), 3)
+
+    def test_a_failing_chunk_does_not_stop_the_run(self):
+        model = self.registry.get()
+        predict = model.predict_on_batch
+        calls = []
+
+        def flaky(x):
+            calls.append(len(x))
+            if len(calls) == 1:
+                raise RuntimeError("out of memory")
+            return predict(x)
+
+        model.predict_on_batch = flaky
+        with self.assertLogs("core.bulk", "ERROR"):
+            report = async_to_sync(bulk_predict_async)(self.user, ["AAA", "TINY", "BBB"], chunk_size=2)
+        self.assertEqual((report.chunks, calls), (2, [1, 1]))
+        self.assertEqual([r.ticker for r in report.succeeded], ["BBB"])
+        errors = {r.ticker: r.error for r in report.failed}
+        self.assertEqual(errors["AAA"], "chunk failed: out of memory")
+        self.assertIn("daily points", errors["TINY"])
+        self.assertEqual(list(Prediction.objects.values_list("ticker", flat=True)), ["BBB"])
+
+    def test_command_rejects_non_positive_sizes(self):
+        for option in ("--concurrency", "--chunk-size"):
+            with self.assertRaisesMessage(CommandError, f"{option} must be at least 1"):
+                call_command("predict", "--ticker", "AAA", "--bulk", option, "0", stdout=StringIO())
+
+
+class LazyChartTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        override = override_settings(BASE_DIR=self.tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        bars = _bars("2024-01-01", 90)
+        PriceStore(lambda *a, **kw: bars, refresh_seconds=3600).refresh("AAPL")
+        self.user = User.objects.create(username="viewer")
+        self.client = _jwt_client(self.user)
+        last_bar = bars.index[-1].isoformat()
+        self.pred = Prediction.objects.create(
+            user=self.user, ticker="AAPL", next_price="190.5", mse=0, rmse=0, r2=0,
+            metrics={"window": 60, "last_bar": last_bar},
+            **chart_paths("AAPL", last_bar, 190.5, 60),
+        )
+
+    def test_chart_is_rendered_once_on_first_request(self):
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, self.pred.plot_cmp)))
+        url = f"/api/v1/predictions/{self.pred.pk}/plot/cmp/"
+        with mock.patch.object(charts, "render_png", wraps=charts.render_png) as render:
+            first = self.client.get(url)
+            second = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first["Content-Type"], "image/png")
+        self.assertTrue(b"".join(second.streaming_content).startswith(b"\x89PNG"))
+        self.assertEqual(render.call_count, 1)
+
+    def test_opted_out_prediction_has_no_charts(self):
+        self.pred.plot_closing = self.pred.plot_cmp = ""
+        self.pred.save()
+        self.assertEqual(self.client.get(f"/api/v1/predictions/{self.pred.pk}/plot/close/").status_code, 404)
+        listing = self.client.get("/api/v1/predictions/").json()
+        self.assertIsNone(listing[0]["plot_closing_url"])
+
+    def test_telegram_uploads_each_chart_once(self):
+        message = _FakeMessage()
+        captions = {"close": "history", "cmp": "comparison"}
+        self.assertEqual(async_to_sync(send_charts)(message, self.pred, captions), 2)
+        self.assertEqual(message.calls, [("group", ["upload", "upload"])])      # one round trip
+        self.assertEqual(
+            dict(TelegramFile.objects.values_list("path", "file_id")),
+            {self.pred.plot_closing: "id-0", self.pred.plot_cmp: "id-1"},
+        )
+
+        async_to_sync(send_charts)(message, self.pred, captions)
+        async_to_sync(send_chart)(message, self.pred, "cmp")
+        self.assertEqual(message.calls[1:], [("group", ["id-0", "id-1"]), ("photo", ["id-1"])])
+
+        message.reject_ids = True                        # e.g. the bot token changed
+        async_to_sync(send_chart)(message, self.pred, "cmp")
+        self.assertEqual(message.calls[-1], ("photo", ["upload"]))
+        self.assertEqual(TelegramFile.objects.get(path=self.pred.plot_cmp).file_id, "id-5")
+
+        # another user's prediction of the same forecast has the same chart files: no upload
+        other = Prediction.objects.create(
+            user=User.objects.create(username="other"), ticker="AAPL", next_price="190.5",
+            mse=0, rmse=0, r2=0, metrics=self.pred.metrics,
+            plot_closing=self.pred.plot_closing, plot_cmp=self.pred.plot_cmp,
+        )
+        async_to_sync(send_charts)(message, other, captions)
+        self.assertEqual(message.calls[-1], ("group", ["id-0", "id-5"]))
+        self.assertEqual(TelegramFile.objects.count(), 2)
+
+    def test_upload_metrics_count_only_sent_charts(self):
+        from . import tg_files
+
+        message = _FakeMessage()
+        misses, hits, uploaded = tg_files.MISSES.value, tg_files.HITS.value, tg_files.UPLOAD_BYTES.value
+        message.fail_uploads = True
+        with self.assertRaises(BadRequest):
+            async_to_sync(send_chart)(message, self.pred, "cmp")
+        self.assertEqual((tg_files.MISSES.value, tg_files.UPLOAD_BYTES.value), (misses, uploaded))
+
+        # a one‑chart "group" sends the media it already loaded
+        with mock.patch("core.tg_files.open_input_file", wraps=tg_files.open_input_file) as opened:
+            self.assertEqual(async_to_sync(send_charts)(message, self.pred, {"close": "history"}), 1)
+        self.assertEqual((opened.call_count, message.calls), (1, [("photo", ["upload"])]))
+        size = os.path.getsize(os.path.join(self.tmp.name, self.pred.plot_closing))
+        self.assertEqual(tg_files.MISSES.value - misses, 1)
+        self.assertEqual(tg_files.UPLOAD_BYTES.value - uploaded, size)
+
+        message.reject_ids = True                        # stale id: counted once, as the re‑upload
+        async_to_sync(send_chart)(message, self.pred, "close")
+        self.assertEqual((tg_files.HITS.value - hits, tg_files.MISSES.value - misses), (0, 2))
+
+
+class _FakeMessage:
+    """Stands in for ``telegram.Message``: records what would be sent."""
+
+    def __init__(self):
+        self.calls = []
+        self.reject_ids = False
+        self.fail_uploads = False
+        self._next = 0
+
+    def _sent(self, call, media):
+        names = [m if isinstance(m, str) else "upload" for m in media]
+        if self.fail_uploads and "upload" in names:
+            self.fail_uploads = False
+            raise BadRequest("Photo_invalid_dimensions")
+        if self.reject_ids and any(n != "upload" for n in names):
+            self.reject_ids = False
+            raise BadRequest("Wrong file identifier/http url specified")
+        self.calls.append((call, names))
+        messages = []
+        for _ in media:
+            photo = PhotoSize(f"id-{self._next}", f"u-{self._next}", 1, 1)
+            self._next += 1
+            messages.append(mock.Mock(photo=[photo]))
+        return messages
+
+    async def reply_photo(self, photo, caption=""):
+        return self._sent("photo", [photo])[0]
+
+    async def reply_media_group(self, media):
+        return tuple(self._sent("group", [m.media for m in media]))
+
+
+class ChartRendererTests(SimpleTestCase):
+    def test_templates_are_reused_without_pyplot_figures(self):
+        import matplotlib.pyplot as plt
+
+        plt.close("all")
+        df = _bars("2024-01-01", 300)
+        first = charts.render_png("close", "AAPL", df, 0, 60)
+        tpl = charts._template("close")
+        second = charts.render_png("cmp", "AAPL", df, 190.5, 60)
+        third = charts.render_png("close", "MSFT", df.iloc[-100:], 0, 60)
+
+        for png in (first, second, third):
+            self.assertTrue(png.startswith(b"\x89PNG"))
+        self.assertIs(charts._template("close"), tpl)
+        self.assertEqual(len(tpl.lines[0].get_xdata()), 100)
+        self.assertEqual(plt.get_fignums(), [])
+
+
+class DownsampleTests(SimpleTestCase):
+    def test_minmax_keeps_the_per_column_envelope(self):
+        rng = np.random.default_rng(7)
+        n, max_points = 50_000, 1000
+        x = np.cumsum(rng.integers(1, 4, n)).astype(float)      # sorted, uneven spacing
+        y = np.cumsum(rng.normal(0, 1, n))
+        y[12_345] += 500                                           # a one‑bar spike
+
+        dx, dy = charts.downsample_minmax(x, y, max_points)
+
+        self.assertLessEqual(len(dx), max_points)
+        self.assertTrue(np.all(np.diff(dx) > 0))
+        self.assertEqual((dx[0], dx[-1]), (x[0], x[-1]))
+        self.assertIn(y[12_345], dy)
+
+        columns = (max_points - 2) // 2
+        def envelope(xs, ys):
+            col = np.minimum(((xs - x[0]) * (columns / (x[-1] - x[0]))).astype(int), columns - 1)
+            frame = pd.DataFrame({"col": col, "y": ys}).groupby("col")["y"]
+            return frame.min(), frame.max()
+        for full, reduced in zip(envelope(x, y), envelope(dx, dy)):
+            pd.testing.assert_series_equal(full, reduced)
+
+    def test_short_series_are_untouched(self):
+        x, y = np.arange(10.0), np.arange(10.0) ** 2
+        dx, dy = charts.downsample_minmax(x, y, 2000)
+        np.testing.assert_array_equal(dy, y)
+        self.assertEqual(len(charts.downsample_minmax(x, y, 0)[0]), 10)
+
+    def test_close_chart_keeps_the_same_axis_range(self):
+        df = _bars("2020-01-01", 5000)
+        tpl = charts._template("close")
+        charts.render_png("close", "AAPL", df, 0, 60, max_points=0)
+        full = (tpl.ax.get_xlim(), tpl.ax.get_ylim())
+        charts.render_png("close", "AAPL", df, 0, 60, max_points=500)
+        self.assertLessEqual(len(tpl.lines[0].get_xdata()), 500)
+        self.assertEqual((tpl.ax.get_xlim(), tpl.ax.get_ylim()), full)
+
+
+class InferenceJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="queued")
+        self.client = _jwt_client(self.user)
+
+        async def fake_prediction(user, ticker, charts=True, progress=None, horizon=1):
+            async with progress.stage("download"):
+                pass
+            if ticker == "FAIL":
+                raise ValueError("No data for FAIL")
+            return await sync_to_async(Prediction.objects.create)(
+                user=user, ticker=ticker, next_price="101.5", mse=0, rmse=0, r2=0,
+                plot_closing="", plot_cmp="",
+            )
+
+        patcher = mock.patch("core.utils.run_prediction_async", side_effect=fake_prediction)
+        self.run_prediction = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(INFERENCE_BACKEND="queue")
+    def test_predict_returns_job_and_worker_fills_it_in(self):
+        res = self.client.post("/api/v1/predict/", {"ticker": "aapl", "charts": False}, format="json")
+        self.assertEqual(res.status_code, 202)
+        job = res.json()
+        self.assertEqual((job["ticker"], job["status"], job["prediction"]), ("AAPL", "queued", None))
+        self.assertEqual(res["Location"], job["status_url"])
+        self.run_prediction.assert_not_called()
+
+        self.assertEqual(jobs.run_pending(concurrency=2), 1)
+        self.run_prediction.assert_called_once_with(
+            self.user, "AAPL", charts=False, progress=mock.ANY, horizon=1
+        )
+
+        done = self.client.get(job["status_url"]).json()
+        self.assertEqual(done["status"], "done")
+        self.assertEqual(done["prediction"]["next_price"], "101.5000")
+        self.assertEqual([(e["stage"], e["status"]) for e in done["progress"]],
+                         [("download", "started"), ("download", "done")])
+
+        # under ASGI the events are streamed; under WSGI the same frames come as one snapshot
+        token = f"Bearer {RefreshToken.for_user(self.user).access_token}"
+        stream = async_to_sync(AsyncClient().get)(job["events_url"], headers={"Authorization": token})
+        self.assertEqual(stream["Content-Type"], "text/event-stream")
+        body = async_to_sync(_read_stream)(stream).decode()
+        self.assertEqual(self.client.get(job["events_url"]).content.decode(), body)
+        frames = [f.split("\n") for f in body.strip().split("\n\n")]
+        self.assertEqual([f[0] for f in frames], ["event: stage", "event: stage", "event: done"])
+        self.assertEqual(json.loads(frames[-1][1][len("data: "):])["prediction"]["ticker"], "AAPL")
+
+        # a job still running: WSGI never holds the request, it says where to poll
+        queued = jobs.enqueue(self.user, "MSFT")
+        snapshot = self.client.get(f"/api/v1/jobs/{queued.pk}/events/")
+        self.assertFalse(snapshot.streaming)
+        self.assertTrue(snapshot.content.decode().startswith("event: poll\n"))
+
+        stranger = _jwt_client(User.objects.create(username="other"))
+        self.assertEqual(stranger.get(job["status_url"]).status_code, 404)
+
+    def test_failures_are_recorded_on_the_job(self):
+        job = jobs.enqueue(self.user, "FAIL")
+        with self.assertLogs("core.jobs", "WARNING"):
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, PredictionJob.FAILED)
+        self.assertIn("No data for FAIL", job.error)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_each_job_is_claimed_once_and_stale_jobs_requeue(self):
+        job = jobs.enqueue(self.user, "MSFT")
+        self.assertEqual(jobs.claim("a").pk, job.pk)
+        self.assertIsNone(jobs.claim("b"))
+
+        self.assertEqual(jobs.requeue_stale(older_than=60), 0)
+        PredictionJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(jobs.requeue_stale(older_than=60), 1)
+        again = jobs.claim("b")
+        self.assertEqual((again.pk, again.attempts, again.worker), (job.pk, 2, "b"))
+
+    @override_settings(INFERENCE_MAX_ATTEMPTS=2)
+    def test_job_that_keeps_killing_workers_is_failed(self):
+        job = jobs.enqueue(self.user, "MSFT")
+        long_ago = timezone.now() - timedelta(minutes=5)
+        # worker "a" dies mid‑job: the job goes back in the queue
+        self.assertEqual(jobs.claim("a").pk, job.pk)
+        PredictionJob.objects.filter(pk=job.pk).update(started_at=long_ago)
+        self.assertEqual(jobs.requeue_stale(older_than=60), 1)
+        # so does worker "b": that was the last attempt
+        self.assertEqual(jobs.claim("b").pk, job.pk)
+        PredictionJob.objects.filter(pk=job.pk).update(started_at=long_ago)
+        with self.assertLogs("core.jobs", "ERROR"):
+            self.assertEqual(jobs.requeue_stale(older_than=60), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (PredictionJob.FAILED, 2))
+        self.assertIn("gave up after 2 attempts", job.error)
+        self.assertIsNone(jobs.claim("c"))
+
+    def test_worker_requeues_stale_jobs_while_running(self):
+        worker = jobs.InferenceWorker(concurrency=1, poll_interval=0.01, name="w", requeue_interval=0.02)
+
+        async def scenario():
+            stop = asyncio.Event()
+            running = asyncio.create_task(worker.run(stop))
+            await asyncio.sleep(0.05)
+            # orphaned by another worker after this one started
+            job = await PredictionJob.objects.acreate(
+                user=self.user, ticker="MSFT", status=PredictionJob.RUNNING, worker="dead/0",
+                attempts=1, started_at=timezone.now() - timedelta(hours=1),
+            )
+            for _ in range(200):
+                await job.arefresh_from_db()
+                if job.finished:
+                    break
+                await asyncio.sleep(0.01)
+            stop.set()
+            await running
+            return job
+
+        job = async_to_sync(scenario)()
+        self.assertEqual((job.status, job.worker, job.attempts), (PredictionJob.DONE, "w/0", 2))
+
+    @override_settings(INFERENCE_BACKEND="inline")
+    def test_inline_backend_predicts_in_the_request(self):
+        pred = Prediction(pk=7, user=self.user, ticker="AAPL", next_price="1", mse=0, rmse=0, r2=0)
+        with mock.patch("core.views.run_prediction_async", return_value=pred) as run:
+            res = self.client.post("/api/v1/predict/", {"ticker": "AAPL"}, format="json")
+        self.assertEqual(res.status_code, 201)
+        run.assert_called_once_with(self.user, "AAPL", charts=True, horizon=1)
+        self.assertFalse(PredictionJob.objects.exists())
+
+
+class BackpressureTests(TestCase):
+    def test_limiter_waits_then_refuses(self):
+        limiter = ConcurrencyLimiter("test_limiter", limit=2, per_key=1, wait=0.05)
+
+        async def scenario():
+            async with limiter.slot("alice"):
+                with self.assertRaises(Saturated) as same_user:
+                    async with limiter.slot("alice"):
+                        pass
+                async with limiter.slot("bob"):
+                    started = time.monotonic()
+                    with self.assertRaises(Saturated) as busy:
+                        async with limiter.slot("carol"):
+                            pass
+                    waited = time.monotonic() - started
+            async with limiter.slot("carol"):           # slots were released
+                pass
+            return same_user.exception, busy.exception, waited
+
+        same_user, busy, waited = async_to_sync(scenario)()
+        self.assertEqual((same_user.status, busy.status), (429, 503))
+        self.assertGreaterEqual(waited, 0.05)
+        self.assertEqual(limiter.stats()["active"], 0)
+
+    def test_waiter_gets_the_released_slot(self):
+        limiter = ConcurrencyLimiter("test_limiter_wake", limit=1, wait=2.0)
+
+        async def scenario():
+            order = []
+
+            async def holder():
+                async with limiter.slot():
+                    order.append("held")
+                    await asyncio.sleep(0.05)
+                order.append("released")
+
+            async def waiter():
+                await asyncio.sleep(0.01)
+                started = time.monotonic()
+                async with limiter.slot():
+                    order.append("admitted")
+                return time.monotonic() - started
+
+            _, waited = await asyncio.gather(holder(), waiter())
+            return order, waited
+
+        order, waited = async_to_sync(scenario)()
+        self.assertEqual(order, ["held", "released", "admitted"])
+        self.assertLess(waited, 1.0)
+
+    def test_async_views_authenticate_and_shed_load(self):
+        user = User.objects.create(username="busy")
+        self.assertEqual(APIClient().get("/api/v1/predictions/").status_code, 401)
+        bad = APIClient()
+        bad.credentials(HTTP_AUTHORIZATION="Bearer not-a-token")
+        self.assertEqual(bad.get("/api/v1/predictions/").status_code, 401)
+
+        client = _jwt_client(user)
+        self.assertEqual(client.get("/api/v1/predictions/").json(), [])
+
+        limiter = ConcurrencyLimiter("test_view_limiter", limit=1, per_key=1, wait=0)
+        with mock.patch("core.views.predict_limiter", limiter):
+            limiter._try_acquire(user.pk)                    # a request already in flight
+            res = client.post("/api/v1/predict/", {"ticker": "AAPL"}, format="json")
+            self.assertEqual(res.status_code, 429)
+            res = _jwt_client(User.objects.create(username="other")).post(
+                "/api/v1/predict/", {"ticker": "AAPL"}, format="json")
+            self.assertEqual(res.status_code, 503)
+            self.assertEqual(res["Retry-After"], "1")
+        self.assertFalse(PredictionJob.objects.exists())
+
+
+YAHOO_DATA = Path(__file__).parent / "testdata" / "yahoo"
+
+
+class YahooStub:
+    """Local HTTP/1.1 server replaying the recorded responses in testdata/yahoo."""
+
+    def __init__(self):
+        self.requests = []
+        self.connections = set()
+        self.fail_next = 0
+        self.fail_status = 503
+        self.fail_headers = {}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"          # keep‑alive
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                stub.requests.append((url.path, query))
+                stub.connections.add(self.client_address)
+                status, body = stub.respond(url.path, query)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                for name, value in (stub.fail_headers if status == stub.fail_status else {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @staticmethod
+    def _load(name):
+        return json.loads((YAHOO_DATA / name).read_text())
+
+    def respond(self, path, query):
+        if self.fail_next:
+            self.fail_next -= 1
+            return self.fail_status, {}
+        if path.startswith("/v8/finance/chart/"):
+            recorded = YAHOO_DATA / f"chart_{path.rsplit('/', 1)[-1]}.json"
+            if recorded.exists():
+                return 200, json.loads(recorded.read_text())
+            return 404, self._load("chart_not_found.json")
+        if path == "/v7/finance/spark":
+            wanted = query["symbols"].split(",")
+            body = self._load("spark.json")
+            body["spark"]["result"] = [r for r in body["spark"]["result"] if r["symbol"] in wanted]
+            return 200, body
+        return 404, {}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class YahooClientTests(TestCase):
+    def setUp(self):
+        self.stub = YahooStub()
+        self.addCleanup(self.stub.close)
+        self.budget = OutboundBudget("test_yahoo", rate=100, per=1, failure_threshold=100, cooldown=30)
+        self.addCleanup(self.budget.reset)
+        self.client = YahooClient(
+            base_url=self.stub.url, http2=False, max_retries=2, backoff=0, budget=self.budget
+        )
+        self.addCleanup(run_sync, self.client.aclose())
+
+    def test_chart_is_parsed_and_connections_are_reused(self):
+        for _ in range(3):
+            df = async_to_sync(self.client.chart)("AAPL", period="5d")
+        self.assertEqual(list(df.columns), ["Open", "High", "Low", "Close", "Volume"])
+        self.assertEqual(df.index.name, "Date")
+        self.assertEqual(df.index[0], pd.Timestamp("2024-06-03"))
+        self.assertAlmostEqual(df["Close"].iloc[-1], 196.89)
+        self.assertEqual(self.stub.requests[0][1]["range"], "5d")
+        # a sync caller on another thread shares the same pooled connection
+        self.assertEqual(len(run_sync(self.client.adownload("AAPL", period="1y"))), 5)
+        self.assertEqual(len(self.stub.requests), 4)
+        self.assertEqual(len(self.stub.connections), 1)
+
+    def test_unknown_symbols_fail_without_retries_and_5xx_is_retried(self):
+        results = async_to_sync(self.client.charts)(["AAPL", "NOPE"])
+        self.assertEqual(len(results["AAPL"]), 5)
+        self.assertIsInstance(results["NOPE"], YahooError)
+        self.assertEqual(len(self.stub.requests), 2)
+
+        # nothing new since ``start`` is not an error for incremental refreshes
+        self.assertTrue(async_to_sync(self.client.adownload)("NOPE", start="2024-06-07").empty)
+
+        self.stub.fail_next = 2
+        self.assertEqual(len(async_to_sync(self.client.chart)("AAPL")), 5)
+        self.stub.fail_next = 3
+        with self.assertRaises(Exception):
+            async_to_sync(self.client.chart)("AAPL")
+
+    def test_symbol_stays_one_path_segment(self):
+        with self.assertRaises(YahooError):
+            async_to_sync(self.client.chart)("../../v7/finance/spark?symbols=AAPL")
+        self.assertEqual(self.stub.requests[0][0], "/v8/finance/chart/..%2F..%2Fv7%2Ffinance%2Fspark%3Fsymbols%3DAAPL")
+        self.assertEqual(self.stub.requests[0][1]["range"], "1y")
+
+    def test_spark_batches_symbols(self):
+        with mock.patch.object(market_data, "SPARK_BATCH", 2):
+            frames = async_to_sync(self.client.spark)(["AAPL", "MSFT", "NOPE"], period="5d")
+        self.assertEqual(sorted(frames), ["AAPL", "MSFT"])
+        self.assertAlmostEqual(frames["MSFT"]["Close"].iloc[-1], 423.85)
+        self.assertEqual(sorted(q["symbols"] for _, q in self.stub.requests), ["AAPL,MSFT", "NOPE"])
+
+    def test_price_store_backfills_through_the_client(self):
+        store = PriceStore(self.client.adownload, refresh_seconds=0)
+        df = async_to_sync(store.aget_history)("aapl")
+        self.assertEqual(len(df), 5)
+        path, query = self.stub.requests[0]
+        self.assertEqual((path, query["range"]), ("/v8/finance/chart/AAPL", "10y"))
+
+        store.refresh("AAPL")                      # sync caller, incremental
+        self.assertEqual(self.stub.requests[-1][1]["period1"], str(int(pd.Timestamp("2024-06-07", tz="UTC").timestamp())))
+
+
+class OutboundBudgetTests(TestCase):
+    def budget(self, **kwargs):
+        budget = OutboundBudget("test_budget", **{"rate": 2, "per": 0.5, "max_wait": 2,
+                                                   "failure_threshold": 2, "cooldown": 30, **kwargs})
+        budget.reset()
+        self.addCleanup(budget.reset)
+        return budget
+
+    def test_process_local_cache_is_warned_about_once(self):
+        from . import throttle
+
+        with mock.patch.object(throttle, "_local_aliases", set()):
+            with self.assertLogs("core.throttle", "WARNING") as logs:
+                budget = self.budget()
+                budget.state()
+                self.budget(rate=5).state()
+            self.assertEqual(len(logs.records), 1)
+            self.assertIn("REDIS_URL", logs.output[0])
+
+    def test_calls_over_the_budget_wait_for_the_next_window(self):
+        budget = self.budget()
+        throttled = budget.throttled.value
+
+        async def scenario():
+            await asyncio.sleep(0.5 - time.time() % 0.5)    # start at a window boundary
+            started = time.monotonic()
+            await asyncio.gather(*(budget.acquire() for _ in range(3)))
+            return time.monotonic() - started
+
+        self.assertGreater(async_to_sync(scenario)(), 0)
+        self.assertEqual(budget.throttled.value, throttled + 1)
+        self.assertEqual(budget.queued.value, 0)
+
+        spent = self.budget(rate=1, per=60, max_wait=0)
+        async_to_sync(spent.acquire)()
+        with self.assertRaises(RateLimited) as refused:
+            async_to_sync(spent.acquire)()
+        self.assertEqual(refused.exception.status, 503)
+        self.assertGreater(refused.exception.retry_after, 1)
+
+    def test_circuit_opens_on_failures_and_a_probe_closes_it(self):
+        budget = self.budget(rate=100)
+        budget.record_failure()
+        self.assertEqual(budget.state(), "closed")
+        budget.record_failure()
+        self.assertEqual(budget.state(), "open")
+        with self.assertRaises(RateLimited):
+            async_to_sync(budget.acquire)()
+
+        budget.cache.delete(budget._key("open"))          # cooldown elapsed
+        self.assertEqual(budget.state(), "half-open")
+        probe = async_to_sync(budget.acquire)()
+        self.assertTrue(probe)
+        with self.assertRaises(RateLimited):              # one probe at a time
+            async_to_sync(budget.acquire)()
+        async_to_sync(budget.arecord)(True, probe)
+        self.assertEqual(budget.state(), "closed")
+        self.assertFalse(async_to_sync(budget.acquire)())
+
+    def test_yahoo_retry_after_opens_the_shared_circuit(self):
+        stub = YahooStub()
+        self.addCleanup(stub.close)
+        budget = self.budget(rate=100, failure_threshold=10)
+        client = YahooClient(base_url=stub.url, http2=False, max_retries=3, backoff=0, budget=budget)
+        self.addCleanup(run_sync, client.aclose())
+        stub.fail_next, stub.fail_status, stub.fail_headers = 1, 429, {"Retry-After": "120"}
+
+        with self.assertRaises(RateLimited) as refused:
+            async_to_sync(client.chart)("AAPL")
+        self.assertEqual(len(stub.requests), 1)           # no retries into an open circuit
+        self.assertGreater(refused.exception.retry_after, 60)
+        # other clients sharing the budget back off as well, without a request
+        other = YahooClient(base_url=stub.url, http2=False, max_retries=0, backoff=0, budget=budget)
+        with self.assertRaises(RateLimited):
+            async_to_sync(other.chart)("MSFT")
+        self.assertEqual(len(stub.requests), 1)
+
+        # a back‑fill has nothing stored to fall back on
+        store = PriceStore(client.adownload, refresh_seconds=0)
+        with self.assertRaises(RateLimited):
+            store.get_history("AAPL")
+
+
+class RateLimitTests(TestCase):
+    def limiter(self, rates, clock=time.time):
+        limiter = RateLimiter("test", rates=rates, clock=clock)
+        limiter.cache.clear()
+        return limiter
+
+    def test_concurrent_hits_are_never_lost(self):
+        limiter = self.limiter({"default": "300/h"})
+        start = threading.Barrier(16)
+        allowed = []
+
+        def caller():
+            start.wait()
+            allowed.append(sum(limiter.hit("alice").allowed for _ in range(25)))
+
+        threads = [threading.Thread(target=caller) for _ in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sum(allowed), 300)                      # 400 tried
+        window = int(time.time() // 3600)
+        self.assertEqual(limiter.cache.get(limiter._key("alice", window)), 300)
+
+    def test_sliding_window_weights_the_previous_window(self):
+        now = [600.0]
+        limiter = self.limiter({"default": "10/m"}, clock=lambda: now[0])
+        self.assertEqual(parse_rate("100/15m"), (100, 900))
+        self.assertTrue(all(limiter.hit("bob").allowed for _ in range(10)))
+        refused = limiter.hit("bob")
+        self.assertFalse(refused.allowed)
+        self.assertEqual(refused.retry_after, 60)
+
+        now[0] = 690.0                        # half way through the next window
+        decisions = [limiter.hit("bob") for _ in range(6)]
+        self.assertEqual([d.allowed for d in decisions], [True] * 5 + [False])
+        self.assertEqual(decisions[-1].retry_after, 6)      # 10 × (1 − 36/60) + 6 ≤ 10
+        self.assertTrue(limiter.hit("carol").allowed)           # per caller
+
+    def test_decorator_limits_views_and_bot_handlers_by_tier(self):
+        limiter = self.limiter({"default": "1/m", "pro": "3/m"})
+        alice = User.objects.create(username="alice")
+        pro = User.objects.create(username="pro")
+        pro.groups.add(Group.objects.create(name="pro"))
+
+        class Quote(APIView):
+            @ratelimit("test", limiter=limiter)
+            def get(self, request):
+                return Response({"ok": True})
+
+        view = Quote.as_view()
+        factory = APIRequestFactory()
+
+        def call(user):
+            request = factory.get("/quote/")
+            force_authenticate(request, user)
+            return view(request).status_code
+
+        self.assertEqual([call(alice) for _ in range(2)], [200, 429])
+        self.assertEqual([call(pro) for _ in range(4)], [200, 200, 200, 429])
+
+        # async bot handler: the chat's linked user decides the tier
+        TelegramUser.objects.create(user=pro, chat_id=42)
+        replies = []
+
+        class Bot:
+            @ratelimit("test", limiter=limiter)
+            async def predict(self, update, context):
+                return "ran"
+
+        async def reply_text(text):
+            replies.append(text)
+
+        update = mock.Mock()
+        update.effective_chat.id = 42
+        update.effective_message.reply_text = reply_text
+        results = [async_to_sync(Bot().predict)(update, None) for _ in range(4)]
+        self.assertEqual(results, ["ran"] * 3 + [None])
+        self.assertIn("Rate limit: 3 requests per minute", replies[0])
+
+        # async API view: 429 with Retry-After
+        with override_settings(RATE_LIMITS={"predict": {"default": "0/m"}}):
+            response = _jwt_client(alice).post("/api/v1/predict/", {"ticker": "AAPL"}, format="json")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+
+def _update_json(update_id, chat_id, text):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": text,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "t"},
+        },
+    }
+
+
+class TelegramWebhookTests(SimpleTestCase):
+    def test_webhook_processes_chats_concurrently_in_order_and_drains(self):
+        events = []
+
+        async def scenario():
+            gate = asyncio.Event()
+
+            async def handle(update):
+                text = update.message.text
+                events.append(("start", update.effective_chat.id, text))
+                if text == "/predict":
+                    await gate.wait()                    # a slow prediction
+                events.append(("end", update.effective_chat.id, text))
+
+            processor = ChatOrderedUpdateProcessor(concurrency=4, max_in_flight=8)
+            server = WebhookServer(Bot("123:TEST"), processor, handle, secret="s3cret", max_in_flight=2)
+            await server.start("127.0.0.1", 0)
+            url = f"http://127.0.0.1:{server.port}/telegram/webhook"
+            headers = {"X-Telegram-Bot-Api-Secret-Token": "s3cret"}
+            async with httpx.AsyncClient() as client:
+                async def post(i, chat, text, headers=headers):
+                    response = await client.post(url, json=_update_json(i, chat, text), headers=headers)
+                    return response.status_code
+
+                codes = [await post(1, 1, "/help", headers={}), await post(2, 1, "/predict"),
+                         await post(3, 2, "/help")]
+                for _ in range(100):                     # chat 2 is not stuck behind chat 1
+                    if ("end", 2, "/help") in events:
+                        break
+                    await asyncio.sleep(0.01)
+                codes += [await post(4, 1, "/latest"), await post(5, 3, "/help")]
+                midway = list(events)
+                gate.set()
+                await server.stop()                      # drains chat 1
+            return codes, midway
+
+        codes, midway = async_to_sync(scenario)()
+        self.assertEqual(codes, [403, 200, 200, 200, 503])     # bad secret; 2 in flight at most
+        self.assertIn(("end", 2, "/help"), midway)
+        self.assertNotIn(("start", 1, "/latest"), midway)      # chat 1 stays in order
+        chat1 = [e for e in events if e[1] == 1]
+        self.assertEqual(chat1, [("start", 1, "/predict"), ("end", 1, "/predict"),
+                                 ("start", 1, "/latest"), ("end", 1, "/latest")])
+
+
+    def test_webhook_leaves_http_to_uvicorn(self):
+        handled = []
+
+        async def scenario():
+            async def handle(update):
+                handled.append(update.update_id)
+
+            server = WebhookServer(Bot("123:TEST"), ChatOrderedUpdateProcessor(), handle, max_body=4096)
+            await server.start("127.0.0.1", 0)
+            url = f"http://127.0.0.1:{server.port}/telegram/webhook"
+
+            async def chunks():                          # Transfer-Encoding: chunked
+                payload = json.dumps(_update_json(7, 1, "/help")).encode()
+                for i in range(0, len(payload), 16):
+                    yield payload[i:i + 16]
+
+            async with httpx.AsyncClient() as client:
+                codes = [
+                    (await client.post(url, content=chunks())).status_code,
+                    (await client.post(url, content=b"x" * 5000)).status_code,
+                    (await client.post(url, content=b"{", headers={"X-Big": "a" * 200_000})).status_code,
+                    (await client.get(url)).status_code,
+                    (await client.post(url + "/../admin", json={})).status_code,
+                ]
+            await server.stop()
+            return codes
+
+        codes = async_to_sync(scenario)()
+        self.assertEqual(codes[:2], [200, 413])
+        self.assertEqual(codes[2] // 100, 4)             # refused by the HTTP layer
+        self.assertEqual(codes[3:], [405, 404])
+        self.assertEqual(handled, [7])
+
+
+class PipelineProgressTests(TestCase):
+    def setUp(self):
+        fd, path = tempfile.mkstemp(suffix=".keras")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        bars = _bars("2024-01-01", 90)
+
+        async def load_history(ticker):
+            return bars
+
+        class Batcher:
+            async def predict_many(self, x):
+                return x[:, -1, :]
+
+        patches = [mock.patch("core.utils.load_history_async", load_history),
+                   mock.patch("core.utils.registry", _fake_registry(path)),
+                   mock.patch("core.utils.get_batcher", lambda: Batcher())]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        ForecastCache().cache.clear()
+        self.user = User.objects.create(username="progress")
+
+    def test_stages_are_reported_and_timed(self):
+        from .management.commands.telegrambot import StatusMessage
+        from .utils import run_prediction_async
+
+        class Reply:
+            text = "🔍 Analyzing AAPL…"
+            edits = []
+
+            async def edit_text(self, text):
+                self.edits.append(text)
+
+        status = StatusMessage(Reply(), "AAPL")
+        progress = Progress(status.update)
+        pred = async_to_sync(run_prediction_async)(self.user, "aapl", progress=progress)
+        self.assertEqual(
+            [(e.stage, e.status) for e in progress.events],
+            [(stage, status) for stage in ("download", "scale", "infer", "persist")
+             for status in ("started", "done")],
+        )
+        self.assertEqual(sorted(pred.metrics["timings"]), ["download", "infer", "scale"])
+        self.assertTrue(Reply.edits[-1].endswith("s"))
+        self.assertIn("✅ infer", Reply.edits[-1])
+
+        again = Progress()
+        async_to_sync(run_prediction_async)(self.user, "AAPL", progress=again)   # forecast cached
+        self.assertIn(("scale", "cached"), [(e.stage, e.status) for e in again.events])
+        self.assertNotIn("scale", again.timings)
+
+        stage = metrics.snapshot('pipeline_stage_seconds{stage="infer"}')
+        self.assertGreaterEqual(stage['pipeline_stage_seconds{stage="infer"}']["count"], 1)
+
+
+class MetricsTests(SimpleTestCase):
+    def test_exposition_format(self):
+        hist = metrics.histogram("test_op_seconds", "Op time", buckets=(0.1, 1), labels={"op": 'a"b'})
+        metrics.histogram("test_op_seconds", "Op time", buckets=(0.1, 1), labels={"op": "c"})
+        hits = metrics.counter("test_hits_total", "Hits")
+        metrics.gauge("test_answer", "Answer", fn=lambda: 42)
+        hist.observe(0.05)
+        hist.observe(5)
+        hits.inc(3)
+
+        text = metrics.exposition()
+        self.assertEqual(text.count("# TYPE test_op_seconds histogram"), 1)
+        self.assertIn('test_op_seconds_bucket{op="a\\"b",le="0.1"} 1', text)
+        self.assertIn('test_op_seconds_bucket{op="a\\"b",le="+Inf"} 2', text)
+        self.assertIn('test_op_seconds_count{op="a\\"b"} 2', text)
+        self.assertIn('test_op_seconds_count{op="c"} 0', text)
+        self.assertIn("# HELP test_hits_total Hits\n# TYPE test_hits_total counter\ntest_hits_total 3.0", text)
+        self.assertIn("test_answer 42.0", text)
+        self.assertIn("process_resident_memory_bytes ", text)
+        self.assertIs(metrics.counter("test_hits_total"), hits)
+
+    def test_timer_observes_on_error(self):
+        hist = metrics.histogram("test_timer_seconds", buckets=(1,))
+        with self.assertRaises(ZeroDivisionError):
+            with hist.time():
+                1 / 0
+        self.assertEqual(hist.snapshot()["count"], 1)
+
+    def test_endpoint_and_token(self):
+        metrics.counter("test_scraped_total").inc()
+        res = self.client.get("/metrics")
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn(b"test_scraped_total 1.0", res.content)
+
+        with override_settings(METRICS_TOKEN="s3cret"):
+            self.assertEqual(self.client.get("/metrics").status_code, 401)
+            ok = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+            self.assertEqual(ok.status_code, 200)
+
+    def test_standalone_server(self):
+        server = metrics.serve(0, host="127.0.0.1")
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        res = httpx.get(f"http://127.0.0.1:{server.server_address[1]}/metrics")
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("process_start_time_seconds", res.text)
+
+    def test_standalone_server_requires_token(self):
+        server = metrics.serve(0, host="127.0.0.1", token="s3cret")
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        denied = httpx.get(url, headers={"Authorization": "Bearer nope"})
+        self.assertEqual(denied.status_code, 401)
+        self.assertEqual(denied.headers["WWW-Authenticate"], "Bearer")
+        self.assertEqual(httpx.get(url).status_code, 401)
+        ok = httpx.get(url, headers={"Authorization": "Bearer s3cret"})
+        self.assertEqual(ok.status_code, 200)
+
+
+class PipelineBenchmarkTests(TransactionTestCase):
+    def test_pipeline_suite_writes_results(self):
+        fd, model_path = tempfile.mkstemp(suffix=".keras")
+        os.close(fd)
+        self.addCleanup(os.remove, model_path)
+        registry = _fake_registry(model_path)
+
+        class Batcher:
+            async def predict_many(self, x):
+                return registry.get().predict_on_batch(x)
+
+        # rows and cache entries that belong to the real app
+        PriceSeries.objects.create(ticker="BENCH", interval="1d")
+        owner = User.objects.create_user("owner")
+        Prediction.objects.create(user=owner, ticker="BENCH", next_price=1, mse=0, rmse=0, r2=0, plot_closing="", plot_cmp="")
+        real_cache = ForecastCache()
+        real_cache.cache.clear()
+
+        out = os.path.join(tempfile.mkdtemp(), "bench.json")
+        with mock.patch("core.utils.registry", registry), mock.patch("core.utils.get_batcher", lambda: Batcher()):
+            call_command("benchmark", suite="pipeline", repeat=2, levels="1,2", json=out, stdout=StringIO())
+
+        with open(out) as f:
+            result = json.load(f)
+        cases = {c["case"]: c for c in result["cases"]}
+        self.assertIn("prepare_data", cases)
+        self.assertIn("render cmp", cases)
+        self.assertEqual(cases["run_prediction @2"]["concurrency"], 2)
+        self.assertGreater(cases["run_prediction @2"]["throughput_per_s"], 0)
+        self.assertLessEqual(cases["run_prediction (cold)"]["p50_ms"], cases["run_prediction (cold)"]["p99_ms"])
+        self.assertGreater(result["peak_rss_bytes"], 0)
+        # the run cleans up after itself
+        self.assertFalse(User.objects.filter(username="benchmark_pipeline").exists())
+        self.assertEqual(list(Prediction.objects.values_list("ticker", flat=True)), ["BENCH"])
+        self.assertEqual(list(PriceSeries.objects.values_list("ticker", flat=True)), ["BENCH"])
+        self.assertIsNone(real_cache.cache.get(real_cache._latest_key("BENCH_0")))
+
+    def test_record_rejects_unsafe_tickers(self):
+        with mock.patch("core.market_data.yahoo.get_json") as get_json:
+            with self.assertRaises(CommandError):
+                call_command("benchmark", record="AAPL,../../etc", stdout=StringIO())
+        get_json.assert_not_called()
+
+
+class WarmupTests(SimpleTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".keras")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def test_readyz_waits_for_load_and_trace(self):
+        model = _FakeModel()
+        gate = threading.Event()
+
+        def loader(path):
+            gate.wait(5)
+            return model
+
+        registry = ModelRegistry(loader=loader)
+        registry.register("default", self.path, version="test")
+        warm = Warmup(window=60)
+        with mock.patch("core.warmup.registry", registry), mock.patch("core.view_health.warmup", warm), \
+                override_settings(INFERENCE_BACKEND="inline"):
+            res = self.client.get("/readyz/")             # the probe starts the warm-up
+            self.assertEqual(res.status_code, 503)
+            self.assertEqual(res.json()["status"], "warming")
+            gate.set()
+            self.assertTrue(warm.wait(5))
+            res = self.client.get("/readyz/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["status"], "ready")
+        self.assertEqual(model.batches, [(1, 60, 1), (2, 60, 1)])
+
+    def test_queue_backend_web_never_loads_the_model(self):
+        from . import warmup
+
+        warm = Warmup(window=60)
+        with mock.patch("core.view_health.warmup", warm), override_settings(INFERENCE_BACKEND="queue"):
+            res = self.client.get("/readyz/")
+            self.assertFalse(warmup.web_warmup_enabled())
+        self.assertEqual((res.status_code, res.json()["inference"]), (200, "queue"))
+        self.assertEqual(warm.state, "cold")
+        with override_settings(INFERENCE_BACKEND="inline", GUNICORN_WARMUP=True):
+            self.assertTrue(warmup.web_warmup_enabled())
+        with override_settings(INFERENCE_BACKEND="inline", GUNICORN_WARMUP=False):
+            self.assertFalse(warmup.web_warmup_enabled())
+
+    def test_failure_is_reported_and_retried(self):
+        attempts = []
+
+        def loader(path):
+            attempts.append(path)
+            if len(attempts) == 1:
+                raise OSError("disk on fire")
+            return _FakeModel()
+
+        registry = ModelRegistry(loader=loader)
+        registry.register("default", self.path, version="test")
+        warm = Warmup(window=60)
+        with mock.patch("core.warmup.registry", registry):
+            warm.start()
+            self.assertFalse(warm.wait(5))
+            self.assertIn("disk on fire", warm.status()["error"])
+            warm.start()
+            self.assertTrue(warm.wait(5))
+        self.assertEqual(len(attempts), 2)
+
+
+class BotThinClientTests(TestCase):
+    def setUp(self):
+        from .management.commands.telegrambot import Command
+
+        self.user = User.objects.create(username="thin")
+        self.command = Command()
+        self.command.inference = "queue"
+
+    async def _worker(self, status, error=""):
+        """Stand-in for the inference worker: finish the first queued job."""
+        while (job := await PredictionJob.objects.filter(status=PredictionJob.QUEUED).afirst()) is None:
+            await asyncio.sleep(0.01)
+        pred = None
+        if status == PredictionJob.DONE:
+            pred = await Prediction.objects.acreate(
+                user=self.user, ticker=job.ticker, next_price="42.0", mse=0, rmse=0, r2=0,
+                plot_closing="", plot_cmp="",
+            )
+        events = [{"stage": "download", "status": "started", "seconds": None, "at": 0.0},
+                  {"stage": "download", "status": "done", "seconds": 0.5, "at": 0.0}]
+        await PredictionJob.objects.filter(pk=job.pk).aupdate(
+            status=status, prediction=pred, error=error, progress=events, finished_at=timezone.now(),
+        )
+
+    def _predict(self, status, error=""):
+        async def scenario():
+            worker = asyncio.ensure_future(self._worker(status, error))
+            try:
+                return await self.command.run_prediction(mock.Mock(), self.user, "AAPL", progress)
+            finally:
+                await worker
+
+        progress = Progress()
+        return async_to_sync(scenario)(), progress
+
+    def test_queue_mode_waits_for_the_worker(self):
+        with mock.patch("core.utils.run_prediction_async") as inline:
+            pred, progress = self._predict(PredictionJob.DONE)
+        inline.assert_not_called()
+        self.assertEqual(pred.ticker, "AAPL")
+        self.assertEqual(float(pred.next_price), 42.0)
+        self.assertEqual([(e.stage, e.status) for e in progress.events],
+                         [("download", "started"), ("download", "done")])
+
+    def test_failed_job_is_reported(self):
+        with self.assertRaisesMessage(ValueError, "No data for AAPL"):
+            self._predict(PredictionJob.FAILED, "No data for AAPL")
+
+
+
+class ScalingTests(SimpleTestCase):
+    """``MinMaxScale`` must reproduce scikit‑learn's ``MinMaxScaler`` exactly."""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.series = [100 + rng.normal(0, 5, n).cumsum() for n in (60, 250, 2515)]
+
+    def test_matches_sklearn(self):
+        from sklearn.preprocessing import MinMaxScaler
+
+        from .scaling import MinMaxScale, fit_transform
+
+        for prices in self.series + [np.full(80, 42.0)]:        # a flat series scales by 1
+            col = prices.reshape(-1, 1)
+            ref = MinMaxScaler()
+            expected = ref.fit_transform(col)
+            scaler, scaled = fit_transform(col)
+            np.testing.assert_array_equal(scaled, expected)
+            np.testing.assert_array_equal(scaler.scale, ref.scale_)
+            np.testing.assert_array_equal(scaler.min_, ref.min_)
+            np.testing.assert_array_equal(scaler.inverse_transform(scaled), ref.inverse_transform(expected))
+            self.assertEqual(scaler.inverse_one(0.5), float(ref.inverse_transform([[0.5]])[0][0]))
+
+            buf = col.copy()                                   # in place: nothing allocated
+            self.assertIs(MinMaxScale.fit(buf).transform(buf, out=buf), buf)
+            np.testing.assert_array_equal(buf, expected)
+
+    def test_many_series_at_once(self):
+        from sklearn.preprocessing import MinMaxScaler
+
+        from .scaling import MinMaxScale
+
+        refs = [MinMaxScaler().fit(s.reshape(-1, 1)) for s in self.series]
+        scaler = MinMaxScale.fit_many(self.series)
+        self.assertEqual(len(scaler), 3)
+        preds = np.array([0.25, 0.5, 1.1])
+        expected = [float(r.inverse_transform([[p]])[0][0]) for r, p in zip(refs, preds)]
+        self.assertEqual(scaler.inverse(preds).tolist(), expected)
+        concat = MinMaxScale.concat(MinMaxScale.fit(s) for s in self.series)
+        self.assertEqual(concat.inverse(preds).tolist(), expected)
+
+        # a row per series (e.g. several steps ahead)
+        paths = np.tile(preds[:, None], (1, 4))
+        np.testing.assert_array_equal(scaler.inverse(paths), np.tile(np.array(expected)[:, None], (1, 4)))
+        windows = np.stack([s[-60:] for s in self.series])
+        np.testing.assert_array_equal(
+            scaler.transform(windows),
+            np.stack([r.transform(s[-60:].reshape(-1, 1))[:, 0] for r, s in zip(refs, self.series)]),
+        )
+
+    def test_prediction_path_does_not_import_sklearn(self):
+        import subprocess
+        import sys
+
+        code = "import sys, django; django.setup(); import core.utils, core.bulk; print('sklearn' in sys.modules)"
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "stock_prediction_main.settings"}
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env,
+                             cwd=Path(__file__).resolve().parent.parent, check=True)
+        self.assertEqual(out.stdout.strip(), "False")
+
+
+class HorizonForecastTests(TestCase):
+    def setUp(self):
+        fd, path = tempfile.mkstemp(suffix=".keras")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.bars = bars = _bars("2024-01-01", 90)
+        self.calls = calls = []
+
+        async def load_history(ticker):
+            return bars
+
+        class Batcher:
+            async def predict_many(self, x):
+                calls.append(len(x))
+                return x[:, -1, :] + 0.01            # a little above the last input
+
+        patches = [mock.patch("core.utils.load_history_async", load_history),
+                   mock.patch("core.utils.registry", _fake_registry(path)),
+                   mock.patch("core.utils.get_batcher", lambda: Batcher())]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        override = override_settings(BASE_DIR=self.tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        ForecastCache().cache.clear()
+        self.user = User.objects.create(username="horizon")
+
+    def test_rollout_feeds_predictions_back(self):
+        from .rollout import rollout
+
+        windows = np.random.default_rng(3).random((3, 5, 1))
+        batches = []
+
+        def predict(x):
+            batches.append(x.shape)
+            return x.mean(axis=1)
+
+        path = rollout(windows, 4, predict)
+        self.assertEqual(batches, [(3, 5, 1)] * 4)            # every step is one batched call
+        for series, expected_path in zip(windows.astype(np.float32), path):
+            window, expected = series[:, 0], []
+            for _ in range(4):
+                expected.append(float(window.mean()))
+                window = np.append(window[1:], np.float32(expected[-1]))
+            np.testing.assert_allclose(expected_path, expected, rtol=1e-6)
+
+    def test_path_is_stored_cached_and_charted(self):
+        from .utils import run_prediction_async
+
+        pred = async_to_sync(run_prediction_async)(self.user, "AAPL", horizon=5)
+        path = pred.metrics["path"]
+        self.assertEqual((pred.metrics["horizon"], len(path), self.calls), (5, 5, [1] * 5))
+        self.assertEqual(path[0], float(pred.next_price))
+        self.assertEqual(path, sorted(path))
+        self.assertTrue(pred.plot_horizon)
+
+        # a shorter horizon is a prefix of the cached path: no model calls
+        short = async_to_sync(run_prediction_async)(self.user, "AAPL", horizon=3)
+        self.assertEqual((short.metrics["path"], len(self.calls)), (path[:3], 5))
+        one = async_to_sync(run_prediction_async)(self.user, "AAPL")
+        self.assertEqual((one.metrics["path"], one.plot_horizon), (path[:1], ""))
+
+        rel_path = async_to_sync(charts.ensure_chart_async)(pred, "horizon", self.bars)
+        with open(os.path.join(self.tmp.name, rel_path), "rb") as f:
+            self.assertTrue(f.read().startswith(b"\x89PNG"))
+        with self.assertRaises(charts.ChartUnavailable):
+            async_to_sync(charts.ensure_chart_async)(one, "horizon", self.bars)
+
+        listing = _jwt_client(self.user).get("/api/v1/predictions/").json()
+        self.assertEqual([(p["horizon"], len(p["path"])) for p in listing], [(1, 1), (3, 3), (5, 5)])
+        self.assertIsNone(listing[0]["plot_horizon_url"])
+        self.assertEqual(listing[2]["plot_horizon_url"], f"/api/v1/predictions/{pred.pk}/plot/horizon/")
+
+    def test_invalid_horizon_is_rejected(self):
+        client = _jwt_client(self.user)
+        for horizon in (0, 99, "soon"):
+            res = client.post("/api/v1/predict/", {"ticker": "AAPL", "horizon": horizon}, format="json")
+            self.assertEqual(res.status_code, 400)
+            self.assertIn("horizon", res.json()["detail"])
+
+
+class BacktestTests(TestCase):
+    def setUp(self):
+        fd, path = tempfile.mkstemp(suffix=".keras")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        self.bars = bars = _bars("2023-01-02", 140)
+        bars["Close"] = 100 + np.random.default_rng(7).normal(0, 1, len(bars)).cumsum()
+        self.registry = _fake_registry(path)
+
+        class Store:
+            async def aget_history(self, ticker):
+                return bars
+
+        patches = [mock.patch("core.backtest.price_store", Store()),
+                   mock.patch("core.backtest.registry", self.registry)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        ForecastCache().cache.clear()
+        self.user = User.objects.create(username="backtest")
+
+    def test_matches_the_pipeline_on_every_past_day(self):
+        from .backtest import forecast_history, origin_ends, run_backtest
+        from .utils import WINDOW, prepare_data
+
+        closes = self.bars["Close"].to_numpy()
+        ends = origin_ends(len(closes), stride=3)
+        model = _FakeModel()
+        paths = forecast_history(closes, model.predict_on_batch, 5, stride=3, batch_size=8)
+        self.assertEqual(paths.shape, (len(ends), 5))
+        self.assertEqual({b[0] for b in model.batches}, {8, len(ends) % 8})    # batched, never per day
+        for row, t in zip(paths, ends):
+            scaler, _, x = prepare_data(self.bars.iloc[: t + 1])
+            expected = scaler.inverse_one(float(_FakeModel().predict_on_batch(x.astype(np.float32))[0, 0]))
+            self.assertAlmostEqual(row[0], expected, places=4)
+            np.testing.assert_allclose(row, row[0], rtol=1e-6)                 # "last value" model: flat path
+
+        report = run_backtest("T", self.bars, (1, 5), predict=_FakeModel().predict_on_batch)
+        one, five = report.horizons
+        self.assertEqual((report.origins, one.samples, five.samples),
+                         (len(closes) - WINDOW, len(closes) - WINDOW, len(closes) - WINDOW - 4))
+        # predicting the last close is exactly the naive baseline
+        self.assertAlmostEqual(one.rmse, one.naive_rmse, places=3)
+        self.assertAlmostEqual(one.skill, 0.0, places=3)
+
+    @override_settings(INFERENCE_BACKEND="inline")
+    def test_endpoint_caches_and_validates(self):
+        from . import backtest
+
+        client = _jwt_client(self.user)
+        misses, hits = backtest.MISSES.value, backtest.HITS.value
+        first = client.get("/api/v1/backtest/aapl/?horizons=1,5&stride=2")
+        self.assertEqual(first.status_code, 200)
+        body = first.json()
+        self.assertEqual((body["ticker"], body["stride"], body["model_version"]), ("AAPL", 2, "test"))
+        self.assertEqual([h["horizon"] for h in body["horizons"]], [1, 5])
+
+        again = client.get("/api/v1/backtest/AAPL/?horizons=5,1&stride=2")
+        self.assertEqual(again.json(), body)
+        self.assertEqual((backtest.MISSES.value - misses, backtest.HITS.value - hits), (1, 1))
+
+        for query in ("horizons=0", "horizons=soon", "stride=0", "stride=x"):
+            self.assertEqual(client.get(f"/api/v1/backtest/AAPL/?{query}").status_code, 400, query)
+
+    @override_settings(INFERENCE_BACKEND="queue")
+    def test_queue_backend_never_loads_the_model_in_the_web_process(self):
+        loader = mock.Mock(side_effect=lambda path: _FakeModel())
+        self.registry._loader = loader
+        client = _jwt_client(self.user)
+        res = client.get("/api/v1/backtest/AAPL/?horizons=1,5&stride=2")
+        self.assertEqual(res.status_code, 503)
+        self.assertIn("manage.py backtest AAPL", res.json()["detail"])
+        loader.assert_not_called()
+
+        # once the worker side has computed it, the web process serves the cached report
+        call_command("backtest", "AAPL", "--horizons", "1,5", "--stride", "2", stdout=StringIO())
+        loader.reset_mock()
+        res = client.get("/api/v1/backtest/AAPL/?horizons=1,5&stride=2")
+        self.assertEqual((res.status_code, res.json()["ticker"]), (200, "AAPL"))
+        loader.assert_not_called()
+
+    def test_command_writes_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = StringIO()
+            call_command("backtest", "AAPL", "--horizons", "1,3", "--stride", "1",
+                         "--json", os.path.join(tmp, "bt.json"), stdout=out)
+            with open(os.path.join(tmp, "bt.json")) as f:
+                (report,) = json.load(f)
+        self.assertEqual((report["ticker"], report["origins"]), ("AAPL", len(self.bars) - 60))
+        self.assertIn("AAPL: 80 forecasts", out.getvalue())
+
+
+class WindowBuilderTests(SimpleTestCase):
+    def test_windows_are_views_and_batches_reuse_one_buffer(self):
+        from .scaling import MinMaxScale
+        from .windows import WindowBuilder
+
+        series = np.arange(20, dtype=np.float64)
+        builder = WindowBuilder(series, window=4, stride=3, lookahead=2)
+        self.assertTrue(np.shares_memory(builder.windows, series))
+        self.assertEqual(builder.ends.tolist(), [3, 6, 9, 12, 15])      # 17 would leave one value after it
+        np.testing.assert_array_equal(builder.windows[:, -1], builder.ends)
+        np.testing.assert_array_equal(builder.targets(2), [[4, 5], [7, 8], [10, 11], [13, 14], [16, 17]])
+
+        batches = [(rows, batch.copy(), batch) for rows, batch in builder.batches(2)]
+        self.assertEqual([rows for rows, _, _ in batches], [slice(0, 2), slice(2, 4), slice(4, 5)])
+        self.assertEqual({b.dtype for _, b, _ in batches}, {np.dtype(np.float32)})
+        self.assertTrue(all(np.shares_memory(batches[0][2], b) for _, _, b in batches))
+        np.testing.assert_array_equal(np.concatenate([b for _, b, _ in batches])[..., 0], builder.windows)
+
+        scale = MinMaxScale(np.zeros(5), builder.ends.astype(float))       # one scaler per window
+        (rows, batch), = builder.batches(8, scale, dtype=np.float64)
+        np.testing.assert_array_equal(batch[:, -1, 0], 1.0)
+        with self.assertRaises(ValueError):
+            builder.targets(3)
+
+    def test_memory_mapped_training_pairs(self):
+        from .windows import WindowBuilder, windows_with_targets
+
+        series = np.random.default_rng(0).random(100).astype(np.float32)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "closes.npy")
+            np.save(path, series)
+            builder = WindowBuilder.load(path, window=60, lookahead=1)
+            self.assertIsInstance(builder.series, np.memmap)
+            self.assertEqual((len(builder), builder.windows.shape), (40, (40, 60)))
+            x, y = windows_with_targets(builder.series, 60, horizon=5)
+            self.assertEqual((x.shape, y.shape), ((36, 60, 1), (36, 5)))
+            self.assertTrue(np.shares_memory(x, builder.series) and np.shares_memory(y, builder.series))
+            np.testing.assert_array_equal(y[:, 0], series[60:96])
+            del builder, x, y
+        self.assertEqual(len(WindowBuilder(series[:10])), 0)
+
+
+class TickerValidationTests(TestCase):
+    def test_only_symbol_characters_get_through(self):
+        from .validation import parse_ticker
+
+        for ticker in ("aapl", " BRK.B ", "^GSPC", "EURUSD=X", "BTC-USD"):
+            self.assertEqual(parse_ticker(ticker), ticker.strip().upper())
+        self.assertEqual(parse_ticker("X" * 10), "X" * 10)      # the ticker columns' max_length
+        for ticker in ("", None, "../../etc/passwd", "AAPL/../x", "A B", "AAPL?range=1d", "X" * 11):
+            with self.assertRaises(ValueError):
+                parse_ticker(ticker)
+
+    def test_entry_points_reject_bad_tickers(self):
+        client = _jwt_client(User.objects.create(username="validation"))
+        with mock.patch("core.views.aenqueue") as enqueue:
+            res = client.post("/api/v1/predict/", {"ticker": "../../static/x"}, format="json")
+            self.assertEqual(res.status_code, 400)
+            self.assertIn("invalid ticker", res.json()["detail"])
+            too_long = client.post("/api/v1/predict/", {"ticker": "X" * 11}, format="json")
+            self.assertEqual(too_long.status_code, 400)             # not a DB error on insert
+            enqueue.assert_not_called()
+        self.assertEqual(client.get("/api/v1/backtest/A$B/").status_code, 400)
+        with self.assertRaises(CommandError):
+            call_command("predict", "--ticker", "../x", "--user", "validation")
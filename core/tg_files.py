@@ -0,0 +1,153 @@
+# core/tg_files.py
+"""
+Chart delivery for the Telegram bot.
+
+Telegram keeps every photo the bot uploads and returns a ``file_id`` for
+it; sending that id again costs no upload.  The first send of a chart
+uploads the PNG and records the id in ``TelegramFile`` under the chart's
+path; later sends (``/latest``, resends, other predictions of the same
+forecast, whose charts are the same files) reuse it.  A stale id (e.g. after a bot token
+change) is dropped and the chart is uploaded again.
+
+``send_charts`` delivers several charts as one media group – a single
+round trip instead of one per chart.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Dict, NamedTuple, Optional, Union
+
+from django.conf import settings
+from telegram import InputFile, InputMediaPhoto, Message, PhotoSize
+from telegram.error import BadRequest
+
+from . import metrics
+from .models import CHART_FIELDS, Prediction, TelegramFile
+
+logger = logging.getLogger(__name__)
+
+HITS = metrics.counter("tg_file_cache_hits_total", "Charts sent by cached file_id")
+MISSES = metrics.counter("tg_file_cache_misses_total", "Charts uploaded to Telegram")
+UPLOAD_BYTES = metrics.counter("tg_upload_bytes_total", "PNG bytes uploaded to Telegram")
+
+Media = Union[str, InputFile]
+
+
+class ChartMedia(NamedTuple):
+    media: Media
+    cached: bool          # a file_id Telegram already has
+    path: str             # the chart's path, its TelegramFile key
+    size: int = 0         # PNG bytes to upload (0 for a file_id)
+
+
+async def open_input_file(path: str) -> InputFile:
+    full_path = os.path.join(settings.BASE_DIR, path)
+    if not os.path.exists(full_path):
+        raise FileNotFoundError(f"Image not found: {full_path}")
+    if os.path.getsize(full_path) == 0:
+        raise ValueError(f"Empty image file: {full_path}")
+
+    loop = asyncio.get_running_loop()
+    with open(full_path, "rb") as f:
+        buf = await loop.run_in_executor(None, f.read)
+    return InputFile(buf, filename=os.path.basename(full_path))
+
+
+async def chart_media(pred: Prediction, kind: str) -> ChartMedia:
+    """The chart's cached ``file_id`` (``cached=True``), or its PNG to upload."""
+    field = CHART_FIELDS.get(kind)
+    path = getattr(pred, field) if field else ""
+    if path:
+        file_id = await TelegramFile.objects.filter(path=path).values_list("file_id", flat=True).afirst()
+        if file_id:
+            return ChartMedia(file_id, True, path)
+    from .charts import ensure_chart_async      # matplotlib only once something needs drawing
+
+    path = await ensure_chart_async(pred, kind)
+    media = await open_input_file(path)
+    return ChartMedia(media, False, path, len(media.input_file_content))
+
+
+def _count_sent(chart: ChartMedia) -> None:
+    """Cache metrics, once Telegram has accepted the chart."""
+    if chart.cached:
+        HITS.inc()
+    else:
+        MISSES.inc()
+        UPLOAD_BYTES.inc(chart.size)
+
+
+async def remember(path: str, photo: PhotoSize) -> None:
+    await TelegramFile.objects.aupdate_or_create(
+        path=path, defaults={"file_id": photo.file_id, "file_unique_id": photo.file_unique_id or ""},
+    )
+
+
+async def forget(*paths: str) -> None:
+    await TelegramFile.objects.filter(path__in=paths).adelete()
+
+
+async def send_chart(
+    message: Message, pred: Prediction, kind: str, caption: str = "", chart: Optional[ChartMedia] = None
+) -> Message:
+    """Reply with one chart, by ``file_id`` when Telegram already has it (``chart``: already looked up)."""
+    chart = chart or await chart_media(pred, kind)
+    try:
+        sent = await message.reply_photo(chart.media, caption=caption)
+    except BadRequest:
+        if not chart.cached:
+            raise
+        logger.info("Stale file_id for %s chart of prediction %s; uploading again", kind, pred.pk)
+        await forget(chart.path)
+        chart = await chart_media(pred, kind)
+        sent = await message.reply_photo(chart.media, caption=caption)
+    _count_sent(chart)
+    if not chart.cached:
+        await remember(chart.path, sent.photo[-1])
+    return sent
+
+
+async def send_charts(message: Message, pred: Prediction, captions: Dict[str, str]) -> int:
+    """
+    Reply with the given charts (``kind → caption``) as one media group;
+    returns how many were sent.  Unavailable charts are skipped.
+    """
+    from .charts import ChartUnavailable
+
+    kinds = list(captions)
+    found = await asyncio.gather(*(chart_media(pred, k) for k in kinds), return_exceptions=True)
+    media: Dict[str, ChartMedia] = {}
+    for kind, result in zip(kinds, found):
+        if isinstance(result, ChartUnavailable):
+            logger.info("No %s chart for prediction %s: %s", kind, pred.pk, result)
+        elif isinstance(result, BaseException):
+            logger.error("Failed to load %s chart of prediction %s: %s", kind, pred.pk, result)
+        else:
+            media[kind] = result
+
+    if len(media) == 1:                      # a media group needs at least two items
+        kind, chart = next(iter(media.items()))
+        await send_chart(message, pred, kind, captions[kind], chart)
+        return 1
+    if not media:
+        return 0
+
+    group = [InputMediaPhoto(c.media, caption=captions[k]) for k, c in media.items()]
+    try:
+        sent = await message.reply_media_group(group)
+    except BadRequest:
+        stale = [k for k, c in media.items() if c.cached]
+        if not stale:
+            raise
+        logger.info("Stale file_id in media group for prediction %s; uploading again", pred.pk)
+        await forget(*(media[k].path for k in stale))
+        return await send_charts(message, pred, {k: captions[k] for k in media})
+
+    for (kind, chart), msg in zip(media.items(), sent):
+        _count_sent(chart)
+        if not chart.cached and msg.photo:
+            await remember(chart.path, msg.photo[-1])
+    return len(sent)
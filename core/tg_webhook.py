@@ -0,0 +1,217 @@
+# core/tg_webhook.py
+"""
+Concurrent Telegram update handling and a minimal webhook listener.
+
+``ChatOrderedUpdateProcessor`` lets the bot work on updates from different
+chats at the same time (a slow ``/predict`` no longer holds up everyone's
+``/help``) while keeping each chat's updates strictly in arrival order.
+At most ``concurrency`` handlers run at once; an update waiting for its
+chat's previous one does not take a handler slot.
+
+``WebhookServer`` receives Telegram's webhook POSTs: a small ASGI app
+served by uvicorn inside the bot process (HTTP parsing, chunked bodies,
+header limits and keep‑alive are uvicorn's).  It checks the
+``X-Telegram-Bot-Api-Secret-Token`` header, answers 503 once
+``max_in_flight`` updates are pending (Telegram redelivers them later) and
+on ``stop()`` stops accepting, then waits for the accepted updates to
+finish.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import hmac
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+import uvicorn
+from django.conf import settings
+from telegram import Bot, Update
+from telegram.ext import BaseUpdateProcessor
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+ACCEPTED = metrics.counter("tg_webhook_updates_total", "Updates accepted by the webhook")
+REJECTED = metrics.counter("tg_webhook_rejected_total", "Webhook posts refused (busy, bad secret, bad body)")
+IN_FLIGHT = metrics.gauge("tg_updates_in_flight", "Telegram updates accepted but not finished")
+UPDATE_SECONDS = metrics.histogram(
+    "tg_update_seconds", "Time spent handling one Telegram update (excluding its wait for the chat)",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+def webhook_secret() -> str:
+    """``TELEGRAM_WEBHOOK_SECRET``, or one derived from the bot token."""
+    if settings.TELEGRAM_WEBHOOK_SECRET:
+        return settings.TELEGRAM_WEBHOOK_SECRET
+    return hashlib.sha256(f"webhook:{settings.BOT_TOKEN}".encode()).hexdigest()[:32]
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    def __init__(self, concurrency: int = 16, max_in_flight: int = 256):
+        # PTB's own semaphore bounds everything in flight, waiting or running
+        super().__init__(max_in_flight)
+        self.concurrency = concurrency
+        self._workers = asyncio.Semaphore(concurrency)
+        self._chats: Dict[Hashable, List] = {}          # chat id → [lock, users]
+
+    @staticmethod
+    def chat_key(update: object) -> Optional[Hashable]:
+        chat = getattr(update, "effective_chat", None)
+        return chat.id if chat is not None else None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self.chat_key(update)
+        if key is None:                                  # no chat, nothing to order
+            async with self._workers:
+                with UPDATE_SECONDS.time():
+                    await coroutine
+            return
+
+        entry = self._chats.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                async with self._workers:
+                    with UPDATE_SECONDS.time():
+                        await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chats[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+
+class _Listener(uvicorn.Server):
+    """uvicorn without its signal handlers: the bot command owns SIGINT / SIGTERM."""
+
+    @contextlib.contextmanager
+    def capture_signals(self):
+        yield
+
+
+class WebhookServer:
+    def __init__(
+        self,
+        bot: Bot,
+        processor: BaseUpdateProcessor,
+        handle: Callable[[Update], Awaitable[Any]],
+        path: str = "/telegram/webhook",
+        secret: Optional[str] = None,
+        max_in_flight: int = 256,
+        max_body: int = 1 << 20,
+        idle_timeout: float = 75.0,
+    ):
+        self.bot = bot
+        self.processor = processor
+        self.handle = handle
+        self.path = path
+        self.secret = secret
+        self.max_in_flight = max_in_flight
+        self.max_body = max_body
+        self.idle_timeout = idle_timeout
+        self._server: Optional[_Listener] = None
+        self._serving: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._closing = False
+
+    @property
+    def port(self) -> int:
+        return self._server.servers[0].sockets[0].getsockname()[1]
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def start(self, host: str = "0.0.0.0", port: int = 8443) -> None:
+        config = uvicorn.Config(
+            self, host=host, port=port, http="h11", ws="none", lifespan="off",
+            timeout_keep_alive=int(self.idle_timeout), log_config=None, access_log=False,
+        )
+        self._server = _Listener(config)
+        self._serving = asyncio.get_running_loop().create_task(self._server.serve())
+        while not self._server.started:
+            if self._serving.done():                     # could not bind: uvicorn exits
+                self._serving.result()
+                raise OSError(f"telegram webhook could not listen on {host}:{port}")
+            await asyncio.sleep(0.01)
+        logger.info("telegram webhook listening on %s:%s%s", host, self.port, self.path)
+
+    async def stop(self, drain_timeout: Optional[float] = 30.0) -> None:
+        """Stop accepting updates, close connections, then let pending updates finish."""
+        self._closing = True
+        if self._server is not None:
+            self._server.should_exit = True
+            await self._serving
+        if self._tasks:
+            logger.info("telegram webhook: draining %d update(s)", len(self._tasks))
+            _, pending = await asyncio.wait(self._tasks, timeout=drain_timeout)
+            for task in pending:
+                task.cancel()
+
+    # ── ASGI ────────────────────────────────────────────────────
+    async def __call__(self, scope, receive, send) -> None:
+        status = await self._receive(scope, receive)
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-length", b"0")]})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _receive(self, scope, receive) -> int:
+        if scope["path"] != self.path:
+            return 404
+        if scope["method"] != "POST":
+            return 405
+        headers = dict(scope["headers"])
+        token = headers.get(b"x-telegram-bot-api-secret-token", b"").decode("latin-1")
+        if self.secret and not hmac.compare_digest(token, self.secret):
+            REJECTED.inc()
+            return 403
+        if self._closing or len(self._tasks) >= self.max_in_flight:
+            REJECTED.inc()
+            return 503                                   # Telegram retries later
+
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return 400
+            body += message.get("body", b"")
+            if len(body) > self.max_body:
+                REJECTED.inc()
+                return 413
+            if not message.get("more_body"):
+                break
+        return self._accept(bytes(body))
+
+    def _accept(self, body: bytes) -> int:
+        try:
+            update = Update.de_json(json.loads(body), self.bot)
+        except Exception:
+            REJECTED.inc()
+            logger.warning("telegram webhook: unreadable update %r", body[:200])
+            return 400
+
+        task = asyncio.get_running_loop().create_task(self._process(update))
+        self._tasks.add(task)
+        IN_FLIGHT.inc()
+        task.add_done_callback(self._done)
+        ACCEPTED.inc()
+        return 200
+
+    async def _process(self, update: Update) -> None:
+        try:
+            await self.processor.process_update(update, self.handle(update))
+        except Exception:
+            logger.exception("telegram webhook: update %s failed", update.update_id)
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        IN_FLIGHT.dec()
@@ -0,0 +1,230 @@
+# core/throttle.py
+"""
+Shared budget for outbound calls to a rate‑limited upstream (Yahoo).
+
+Yahoo throttles by client IP, so the web, worker and bot processes draw
+from one budget kept in Django's cache (Redis in production): at most
+``rate`` calls per ``per`` seconds in total.  A call that finds the budget
+spent waits on its event loop – never in a thread – for the next window,
+with jitter so the queued calls don't all fire at the window boundary.
+Calls that would have to wait longer than ``max_wait`` are refused.
+
+Repeated failures (429, 5xx, connection errors) trip a circuit breaker
+that also lives in the cache.  While it is open every call fails fast
+with ``RateLimited`` and callers serve what they already have; after
+``cooldown`` seconds a single probe is let through, and its outcome closes
+or reopens the circuit.
+
+The budget is a fixed‑window counter (``cache.add`` + ``cache.incr``), a
+token bucket refilled once per window: both operations are atomic on
+Redis and on the local‑memory cache, so no lock is needed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import random
+import time
+from typing import Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+from . import metrics
+from .backpressure import Saturated
+
+logger = logging.getLogger(__name__)
+
+# cache aliases already found to be process‑local (warned about once per process)
+_local_aliases = set()
+
+
+class RateLimited(Saturated):
+    """The upstream budget is spent or its circuit is open; try again later."""
+
+    def __init__(self, detail: str, retry_after: float = 1):
+        super().__init__(503, detail, retry_after=max(1, math.ceil(retry_after)))
+
+
+def backoff_delay(attempt: int, base: float, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter for retry ``attempt`` (1, 2, …)."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class OutboundBudget:
+    def __init__(
+        self,
+        name: str,
+        rate: Optional[int] = None,
+        per: Optional[float] = None,
+        max_wait: Optional[float] = None,
+        failure_threshold: Optional[int] = None,
+        cooldown: Optional[float] = None,
+        alias: str = "default",
+    ):
+        self.name = name
+        self._rate = rate
+        self._per = per
+        self._max_wait = max_wait
+        self._failure_threshold = failure_threshold
+        self._cooldown = cooldown
+        self.alias = alias
+        self.prefix = f"budget:{name}"
+        self.throttled = metrics.counter(f"{name}_throttled_total", "Calls that had to wait for the budget")
+        self.refused = metrics.counter(f"{name}_refused_total", "Calls refused (budget or open circuit)")
+        self.trips = metrics.counter(f"{name}_circuit_trips_total", "Times the circuit breaker opened")
+        self.queued = metrics.gauge(f"{name}_queued", "Calls currently waiting for the budget")
+        self.wait_seconds = metrics.histogram(
+            f"{name}_throttle_wait_seconds", "Time throttled calls spent waiting",
+            buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+        )
+
+    # settings are read lazily so the module can be imported before Django is configured
+    @property
+    def rate(self) -> int:
+        return settings.YAHOO_RATE_LIMIT if self._rate is None else self._rate
+
+    @property
+    def per(self) -> float:
+        return settings.YAHOO_RATE_WINDOW if self._per is None else self._per
+
+    @property
+    def max_wait(self) -> float:
+        return settings.YAHOO_RATE_MAX_WAIT if self._max_wait is None else self._max_wait
+
+    @property
+    def failure_threshold(self) -> int:
+        return settings.YAHOO_BREAKER_THRESHOLD if self._failure_threshold is None else self._failure_threshold
+
+    @property
+    def cooldown(self) -> float:
+        return settings.YAHOO_BREAKER_COOLDOWN if self._cooldown is None else self._cooldown
+
+    @property
+    def cache(self):
+        cache = caches[self.alias]
+        if isinstance(cache, LocMemCache) and self.alias not in _local_aliases:
+            _local_aliases.add(self.alias)
+            logger.warning(
+                "Outbound budgets use the %r cache, which is local to this process: web, worker and "
+                "bot each get the full budget and their own circuit breaker. Set REDIS_URL to share them.",
+                self.alias,
+            )
+        return cache
+
+    def _key(self, part: str) -> str:
+        return f"{self.prefix}:{part}"
+
+    def _count(self, key: str, timeout: float) -> int:
+        """Increment a counter that expires ``timeout`` seconds after it was created."""
+        self.cache.add(key, 0, timeout=math.ceil(timeout))
+        try:
+            return self.cache.incr(key)
+        except ValueError:                  # expired between add and incr
+            self.cache.set(key, 1, timeout=math.ceil(timeout))
+            return 1
+
+    # ── sync core (cache round trips) ───────────────────────────
+    def state(self) -> str:
+        open_until, tripped = self._circuit()
+        if open_until:
+            return "open"
+        return "half-open" if tripped else "closed"
+
+    def _circuit(self) -> Tuple[Optional[float], bool]:
+        found = self.cache.get_many([self._key("open"), self._key("tripped")])
+        return found.get(self._key("open")), bool(found.get(self._key("tripped")))
+
+    def take(self) -> Tuple[bool, float]:
+        """
+        Try to take one call from the budget: ``(probe, 0)`` when granted
+        (``probe`` marks the half‑open trial call), ``(False, seconds)`` to
+        wait for the next window.  Raises ``RateLimited`` while the circuit
+        is open or another probe is in flight.
+        """
+        now = time.time()
+        open_until, tripped = self._circuit()
+        if open_until:
+            raise RateLimited(f"{self.name}: circuit open", retry_after=open_until - now)
+        probe = False
+        if tripped:
+            if not self.cache.add(self._key("probe"), 1, timeout=math.ceil(self.cooldown)):
+                raise RateLimited(f"{self.name}: circuit half-open, probe in flight")
+            probe = True
+
+        window = math.floor(now / self.per)
+        if self._count(self._key(f"w{window}"), self.per + 1) <= self.rate:
+            return probe, 0.0
+        if probe:
+            self.cache.delete(self._key("probe"))
+        return False, (window + 1) * self.per - now
+
+    def record_failure(self, probe: bool = False) -> None:
+        """Count a failed call; trips the circuit at the threshold (or when the probe fails)."""
+        failures = self._count(self._key("failures"), self.cooldown)
+        if probe or failures >= self.failure_threshold:
+            self.trip()
+
+    def record_success(self, probe: bool = False) -> None:
+        """A successful probe closes the circuit; ordinary successes cost nothing."""
+        if probe:
+            self.cache.delete_many([self._key(k) for k in ("tripped", "probe", "failures")])
+
+    def trip(self, cooldown: Optional[float] = None) -> None:
+        """Open the circuit for ``cooldown`` seconds (at least the configured one)."""
+        cooldown = max(cooldown or 0, self.cooldown)
+        self.trips.inc()
+        # "open" expires on its own after the cooldown; "tripped" stays until a probe succeeds
+        self.cache.set(self._key("tripped"), 1, timeout=None)
+        self.cache.set(self._key("open"), time.time() + cooldown, timeout=math.ceil(cooldown))
+        self.cache.delete_many([self._key("probe"), self._key("failures")])
+
+    def reset(self) -> None:
+        self.cache.delete_many([self._key(k) for k in ("open", "tripped", "probe", "failures")])
+
+    # ── async API ───────────────────────────────────────────────
+    async def acquire(self) -> bool:
+        """
+        Wait (asynchronously) for a call from the budget; returns whether
+        the call is the circuit's probe, to be passed to ``arecord``.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        queued = False
+        try:
+            while True:
+                try:
+                    probe, wait = await sync_to_async(self.take, thread_sensitive=False)()
+                except RateLimited:
+                    self.refused.inc()
+                    raise
+                if not wait:
+                    return probe
+                if not queued:
+                    queued = True
+                    self.throttled.inc()
+                    self.queued.inc()
+                if loop.time() - started + wait > self.max_wait:
+                    self.refused.inc()
+                    raise RateLimited(f"{self.name}: call budget spent", retry_after=wait)
+                await asyncio.sleep(wait + random.uniform(0, self.per))
+        finally:
+            if queued:
+                self.queued.dec()
+                self.wait_seconds.observe(loop.time() - started)
+
+    async def arecord(self, ok: bool, probe: bool = False) -> None:
+        if ok and not probe:
+            return
+        record = self.record_success if ok else self.record_failure
+        await sync_to_async(record, thread_sensitive=False)(probe)
+
+    async def atrip(self, cooldown: Optional[float] = None) -> None:
+        await sync_to_async(self.trip, thread_sensitive=False)(cooldown)
+
+
+yahoo_budget = OutboundBudget("yahoo")
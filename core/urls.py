@@ -12,7 +12,10 @@ from .views_frontend import (
 )
 
 # ---- API views ----
-from .views import RegisterView, PredictView, PredictionListView
+from .views import (
+    RegisterView, PredictView, PredictionListView, PredictionPlotView, PredictionJobView,
+    PredictionJobEventsView, BacktestView,
+)
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 
@@ -23,6 +26,10 @@ urlpatterns = [
     path("token/refresh/",     TokenRefreshView.as_view()),
     path("predict/",           PredictView.as_view()),
     path("predictions/",       PredictionListView.as_view()),
+    path("predictions/<int:pk>/plot/<str:kind>/", PredictionPlotView.as_view(), name="prediction-plot"),
+    path("jobs/<int:pk>/",     PredictionJobView.as_view(), name="prediction-job"),
+    path("jobs/<int:pk>/events/", PredictionJobEventsView.as_view(), name="prediction-job-events"),
+    path("backtest/<str:ticker>/", BacktestView.as_view(), name="backtest"),
 
     # ─── Front‑end pages ────────────────────────────────────────
     path("frontend/register/",  register,          name="register"),
@@ -1,134 +1,72 @@
 # core/utils.py
 """
-Async utilities for downloading data, running the LSTM model, generating
-plots, and persisting a Prediction row.
+Async utilities for downloading data, running the LSTM model and
+persisting a Prediction row.  Charts are rendered lazily (core.charts).
 """
 
 from __future__ import annotations
 
 import asyncio
-import os
-import threading
-import time
-import uuid
+import logging
+from dataclasses import asdict, dataclass, field, replace
 from decimal import Decimal
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 
-import matplotlib
-matplotlib.use("Agg")                     # headless backend for servers
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-import requests
-import yfinance as yf
 from asgiref.sync import async_to_sync, sync_to_async
-from django.conf import settings
-from keras.models import load_model
-from sklearn.preprocessing import MinMaxScaler
 
+from .batching import get_batcher
+from .charts import CHART_FIELDS, chart_paths
+from .market_data import yahoo
+from .model_registry import DEFAULT_MODEL, MODEL_PATH, registry  # noqa: F401 (MODEL_PATH re‑exported)
 from .models import Prediction
-
-# ─── Globals ─────────────────────────────────────────────────────
-MODEL_PATH = os.getenv("MODEL_PATH", "stock_prediction_model.keras")
-_THREAD_LOCAL = threading.local()
+from .prediction_cache import CacheKey, forecast_cache
+from .progress import Progress
+from .rollout import arollout
+from .scaling import MinMaxScale, fit_transform
+from .price_store import PriceStore
+from .singleflight import SingleFlight
+from .throttle import RateLimited
+from .validation import parse_horizon
+from .windows import WINDOW
+
+logger = logging.getLogger(__name__)
 
 # ─── Model cache helper ──────────────────────────────────────────
-@sync_to_async
-def get_model_async():
-    """Load & cache the Keras model once per thread."""
-    if not hasattr(_THREAD_LOCAL, "model"):
-        if not os.path.exists(MODEL_PATH):
-            raise FileNotFoundError(f"Model file not found: {MODEL_PATH}")
-        _THREAD_LOCAL.model = load_model(MODEL_PATH)
-    return _THREAD_LOCAL.model
-
-
-# ─── Robust Yahoo Finance downloader ─────────────────────────────
-def safe_yf_download(
-    ticker: str,
-    period: str = "10y",
-    interval: str = "1d",
-    max_retries: int = 5,
-    backoff: float = 3.0,
-) -> "pd.DataFrame":
-    """
-    Download data with retries and handle HTTP‑429 rate limits gracefully.
-    Falls back to a manual API call if yfinance keeps failing.
-    """
-    last_err: Exception | None = None
-    for attempt in range(1, max_retries + 1):
-        try:
-            df = yf.download(
-                ticker,
-                period=period,
-                interval=interval,
-                progress=False,
-                threads=False,   # avoid double‑calling Yahoo
-            )
-            if not df.empty:
-                return df
-            last_err = ValueError("No data returned from yfinance")
-        except Exception as exc:
-            last_err = exc
-
-        # Detect HTTP‑429 Too‑Many‑Requests
-        if isinstance(last_err, requests.HTTPError) and last_err.response.status_code == 429:
-            wait = backoff * attempt
-            print(f"[safe_yf_download] 429 rate‑limited; sleeping {wait}s (attempt {attempt}/{max_retries})")
-            time.sleep(wait)
-        else:
-            time.sleep(backoff)
-
-    # ── Fallback to raw Yahoo Finance API ────────────────────────
-    print("[safe_yf_download] Falling back to direct Yahoo API")
-    return fetch_yahoo_direct(ticker)
-
-
-def fetch_yahoo_direct(ticker: str) -> "pd.DataFrame":
-    """
-    Fetch 1‑day, 1‑minute price data using Yahoo's public chart API.
-    This approach works even when yfinance is rate‑limited.
-    """
-    url = f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}?range=1d&interval=1m"
-    headers = {
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "*/*",
-        "Connection": "keep-alive",
-    }
-
-    res = requests.get(url, headers=headers, timeout=10)
-    res.raise_for_status()
-    data = res.json()
+@sync_to_async(thread_sensitive=False)
+def get_model_async(name: str = DEFAULT_MODEL, version: str | None = None):
+    """Fetch the shared Keras model from the process‑wide registry."""
+    return registry.get(name, version)
 
-    try:
-        result = data["chart"]["result"][0]
-        timestamps = result["timestamp"]
-        closes = result["indicators"]["quote"][0]["close"]
-    except (KeyError, IndexError) as e:
-        raise ValueError(f"Unexpected response structure for {ticker}") from e
 
-    if not timestamps or not closes:
+# ─── Direct Yahoo fallback ──────────────────────────────────────
+async def fetch_yahoo_direct_async(ticker: str) -> "pd.DataFrame":
+    """
+    Fetch 1‑day, 1‑minute closes from Yahoo's chart API over the shared
+    pooled client (core.market_data), for when the price store cannot
+    serve a ticker.
+    """
+    df = await yahoo.chart(ticker, interval="1m", period="1d")
+    if df.empty:
         raise ValueError(f"No intraday data returned for {ticker}")
+    return df[["Close"]]
 
-    df = pd.DataFrame(
-        {
-            "Datetime": pd.to_datetime(timestamps, unit="s"),
-            "Close": closes,
-        }
-    ).set_index("Datetime")
-    df = df.dropna()
 
-    return df
+# ─── Local price store ──────────────────────────────────────────
+# Back‑fills and refreshes go straight to the chart API over the pooled client.
+price_store = PriceStore(downloader=yahoo.adownload)
 
 
-# ─── Async plot helpers ──────────────────────────────────────────
-async def save_plot_async(fig: "plt.Figure", path: str) -> None:
-    """Save a Matplotlib figure off the main loop, then close it."""
-    loop = asyncio.get_event_loop()
+async def load_history_async(ticker: str) -> "pd.DataFrame":
+    """Daily bars from the local store, or the direct API if Yahoo has nothing for us."""
     try:
-        await loop.run_in_executor(None, lambda: fig.savefig(path, dpi=100, bbox_inches="tight"))
-    finally:
-        plt.close(fig)
+        return await price_store.aget_history(ticker)
+    except RateLimited:
+        raise                   # the direct API shares the same budget
+    except Exception as exc:
+        logger.warning("Price store failed for %s, using the direct API: %s", ticker, exc)
+        return await fetch_yahoo_direct_async(ticker)
 
 
 async def create_prediction_async(user, prediction_data: Dict) -> Prediction:
@@ -137,125 +75,182 @@ async def create_prediction_async(user, prediction_data: Dict) -> Prediction:
     return await sync_to_async(Prediction.objects.create)(**prediction_data)
 
 
-# ─── Main async predictor ───────────────────────────────────────
-async def run_prediction_async(user, ticker: str) -> Prediction:
-    closing_path = cmp_path = None
-    plot_dir = os.path.join(settings.BASE_DIR, "static", "plots")
-    os.makedirs(plot_dir, exist_ok=True)
+# ─── Forecast (shared by coalesced requests) ────────────────────
+@dataclass(frozen=True)
+class Forecast:
+    """Everything about a prediction except who asked for it."""
+    ticker: str
+    next_price: float
+    mse: float
+    rmse: float
+    r2: float
+    plot_closing: str
+    plot_cmp: str
+    plot_horizon: str = ""
+    metrics: Dict = field(default_factory=dict)
+
+    @property
+    def path(self) -> List[float]:
+        """Forecast prices, one per trading day ahead (cached single‑step entries have none)."""
+        return self.metrics.get("path") or [round(self.next_price, 4)]
+
+    def for_horizon(self, horizon: int) -> "Forecast":
+        """This forecast cut to its first ``horizon`` days (paths are prefixes of longer ones)."""
+        path = self.path
+        if horizon > len(path):
+            raise ValueError(f"Forecast covers {len(path)} day(s), not {horizon}")
+        path = path[:horizon]
+        m = self.metrics
+        plot_horizon = chart_paths(self.ticker, m.get("last_bar"), self.next_price, m.get("window", WINDOW),
+                                   path)["plot_horizon"]
+        return replace(self, plot_horizon=plot_horizon, metrics={**m, "horizon": horizon, "path": path})
+
+    def as_prediction_data(self, charts: bool = True) -> Dict:
+        data = {
+            "ticker": self.ticker,
+            "next_price": Decimal(str(round(self.next_price, 4))),
+            "mse": self.mse,
+            "rmse": self.rmse,
+            "r2": self.r2,
+            "plot_closing": self.plot_closing,
+            "plot_cmp": self.plot_cmp,
+            "plot_horizon": self.plot_horizon,
+            "metrics": dict(self.metrics),
+        }
+        if not charts:
+            data.update({field_name: "" for field_name in CHART_FIELDS.values()})
+        return data
+
+
+# ─── Shared model maths ────────────────────────────────────────
 
-    uid = uuid.uuid4()
-    window = 60
+def prepare_data(df: "pd.DataFrame", window: int = WINDOW) -> Tuple[MinMaxScale, np.ndarray, np.ndarray]:
+    """Fit the scaler on the whole history and cut the last ``window`` closes."""
+    prices = df["Close"].to_numpy(dtype=np.float64).reshape(-1, 1)
+    scaler, scaled = fit_transform(prices)          # one output array, the frame is untouched
+    x_test = scaled[-window:].reshape(1, window, 1)
+    return scaler, scaled, x_test
+
+
+def score_prediction(scaled: np.ndarray, pred_scaled: float, window: int = WINDOW) -> Tuple[float, float, float]:
+    """(mse, rmse, r2) of the prediction against the last scaled close."""
+    mse = float(np.mean((scaled[-1] - pred_scaled) ** 2))
+    rmse = float(np.sqrt(mse))
+    r2 = float(1 - mse / np.var(scaled[-window:]))
+    return mse, rmse, r2
+
+
+# Identical concurrent requests share one history refresh and one forecast.
+_history_flights = SingleFlight("history")
+_forecast_flights = SingleFlight("forecast")
+
+
+async def compute_forecast_async(
+    ticker: str, df: "pd.DataFrame", model_version: str, progress: Optional[Progress] = None, horizon: int = 1
+) -> Forecast:
+    """
+    Scale and predict one price history ``horizon`` trading days ahead (a
+    recursive rollout whose every step shares the micro‑batcher with other
+    requests); chart paths are reserved, not rendered.
+    """
+    window = WINDOW
     loop = asyncio.get_event_loop()
+    progress = progress or Progress()
+
+    if len(df) < window:
+        raise ValueError(f"Need ≥{window} daily points for {ticker}")
+
+    # 2 · scale & window (CPU‑bound)
+    async with progress.stage("scale"):
+        scaler, scaled, x_test = await loop.run_in_executor(None, prepare_data, df, window)
+
+    # 3 · predict (every step batched with other in‑flight requests)
+    async with progress.stage("infer"):
+        path_scaled = (await arollout(x_test, horizon, get_batcher().predict_many))[0]
+    pred_scaled = float(path_scaled[0])
+    pred_price = scaler.inverse_one(pred_scaled)
+    path = [round(p, 4) for p in scaler.inverse(path_scaled).tolist()]
+
+    # 4 · metrics
+    mse, rmse, r2 = score_prediction(scaled, pred_scaled, window)
+
+    # 5 · chart locations (rendered on first request, see core.charts)
+    last_bar = df.index[-1].isoformat()
+    paths = chart_paths(ticker, last_bar, round(pred_price, 4), window, path)
+
+    return Forecast(
+        ticker=ticker,
+        next_price=pred_price,
+        mse=mse,
+        rmse=rmse,
+        r2=r2,
+        plot_closing=paths["plot_closing"],
+        plot_cmp=paths["plot_cmp"],
+        plot_horizon=paths["plot_horizon"],
+        metrics={
+            "window": window,
+            "data_points": len(df),
+            "last_bar": last_bar,
+            "model_version": model_version,
+            "horizon": horizon,
+            "path": path,
+        },
+    )
+
+
+async def cached_forecast_async(
+    key: CacheKey, df: "pd.DataFrame", progress: Optional[Progress] = None, horizon: int = 1
+) -> Forecast:
+    """
+    Serve a forecast from the cache, computing and storing it on a miss.
+    One entry per key serves every horizon up to its own; a longer request
+    replaces it.
+    """
+    data = await forecast_cache.aget(key, validate=lambda d: len(Forecast(**d).path) >= horizon)
+    if data is not None:
+        return Forecast(**data)
+    ticker, _, model_version = key
+    forecast = await compute_forecast_async(ticker, df, model_version, progress, horizon)
+    await forecast_cache.aset(key, asdict(forecast))
+    return forecast
 
-    try:
-        # 1 · download data
-        df = await loop.run_in_executor(None, lambda: safe_yf_download(ticker))
-        if len(df) < window:
-            raise ValueError(f"Need ≥{window} daily points for {ticker}")
-
-        # 2 · scale & window (CPU‑bound)
-        def prepare_data() -> Tuple[MinMaxScaler, np.ndarray, np.ndarray]:
-            prices = df["Close"].values.reshape(-1, 1)
-            scaler = MinMaxScaler()
-            scaled = scaler.fit_transform(prices)
-            x_test = scaled[-window:].reshape(1, window, 1)
-            return scaler, scaled, x_test
-
-        scaler, scaled, x_test = await loop.run_in_executor(None, prepare_data)
-
-        # 3 · predict
-        model = await get_model_async()
-        pred_scaled = await loop.run_in_executor(None, lambda: model.predict(x_test, verbose=0)[0][0])
-        pred_price = scaler.inverse_transform([[pred_scaled]])[0][0]
-
-        # 4 · metrics
-        mse = float(np.mean((scaled[-1] - pred_scaled) ** 2))
-        rmse = float(np.sqrt(mse))
-        r2 = float(1 - mse / np.var(scaled[-window:]))
-
-        # 5 · output paths
-        closing_path = os.path.join(plot_dir, f"{uid}_close.png")
-        cmp_path = os.path.join(plot_dir, f"{uid}_cmp.png")
-
-        # 6 · build figures
-        def create_figures():
-            # ── Figure 1 · Price history ───────────────────────
-            fig1 = plt.figure(figsize=(10, 6))
-            ax1 = fig1.add_subplot(111)
-            ax1.plot(
-                df.index,
-                df["Close"],
-                linewidth=2,
-                label="Close",
-            )
-            ax1.set_title(f"{ticker} Close Price History")
-            ax1.set_xlabel("Date")
-            ax1.set_ylabel("Price ($)")
-            ax1.grid(alpha=0.3)
-            fig1.autofmt_xdate()
-
-            # ── Figure 2 · Last 60 days vs prediction ─────────
-            fig2 = plt.figure(figsize=(10, 6))
-            ax2 = fig2.add_subplot(111)
-            last_actual = scaler.inverse_transform(scaled[-window:])
-            dates = pd.date_range(end=df.index[-1], periods=window)
-            ax2.plot(
-                dates,
-                last_actual.flatten(),
-                linewidth=2,
-                label="Actual",
-            )
-            ax2.scatter(
-                df.index[-1] + pd.Timedelta(days=1),
-                pred_price,
-                s=100,
-                label="Predicted",
-                zorder=5,
-            )
-            ax2.set_title(f"{ticker} – Last {window} Days vs Prediction")
-            ax2.legend()
-            ax2.grid(alpha=0.3)
-            fig2.autofmt_xdate()
-
-            return fig1, fig2
-
-        fig1, fig2 = await loop.run_in_executor(None, create_figures)
-        await asyncio.gather(
-            save_plot_async(fig1, closing_path),
-            save_plot_async(fig2, cmp_path),
-        )
-
-        # 7 · save Prediction row
-        prediction = await create_prediction_async(
-            user,
-            {
-                "ticker": ticker.upper(),
-                "next_price": Decimal(str(round(pred_price, 4))),
-                "mse": mse,
-                "rmse": rmse,
-                "r2": r2,
-                "plot_closing": os.path.relpath(closing_path, settings.BASE_DIR),
-                "plot_cmp": os.path.relpath(cmp_path, settings.BASE_DIR),
-                "metrics": {"window": window, "data_points": len(df)},
-            },
-        )
-        return prediction
-
-    except Exception:
-        # cleanup orphaned files if any step fails
-        def cleanup():
-            for p in (closing_path, cmp_path):
-                if p and os.path.exists(p):
-                    try:
-                        os.remove(p)
-                    except Exception:
-                        pass
-
-        await loop.run_in_executor(None, cleanup)
-        raise
+
+# ─── Main async predictor ───────────────────────────────────────
+async def run_prediction_async(
+    user, ticker: str, charts: bool = True, progress: Optional[Progress] = None, horizon: int = 1
+) -> Prediction:
+    """
+    Predict ``ticker`` for ``user``, ``horizon`` trading days ahead (the
+    prices are in ``metrics["path"]``, ``next_price`` is the first).
+    ``charts=False`` stores no chart paths at all, so nothing can ever be
+    rendered for the row.  Stage events go to ``progress`` (see
+    core.progress); their durations are stored in ``metrics["timings"]``.
+    """
+    ticker = ticker.upper()
+    horizon = parse_horizon(horizon)
+    progress = progress or Progress()
+
+    # 1 · load price history (local store, incremental refresh)
+    async with progress.stage("download"):
+        df = await _history_flights.do(ticker, lambda: load_history_async(ticker))
+
+    # 2‑5 · forecast: cached until the next close, shared with identical in‑flight requests
+    model_version = registry.entry().version
+    key = (ticker, df.index[-1].isoformat() if len(df) else None, model_version)
+    forecast = await _forecast_flights.do(
+        (*key, horizon), lambda: cached_forecast_async(key, df, progress, horizon)
+    )
+    forecast = forecast.for_horizon(horizon)
+    await progress.skipped("scale", "infer")
+
+    # 6 · save this user's Prediction row
+    data = forecast.as_prediction_data(charts)
+    data["metrics"]["timings"] = dict(progress.timings)
+    async with progress.stage("persist"):
+        return await create_prediction_async(user, data)
 
 
 # ─── Sync wrapper for legacy code ───────────────────────────────
-def run_prediction(user, ticker: str) -> Prediction:
+def run_prediction(user, ticker: str, charts: bool = True, horizon: int = 1) -> Prediction:
     """Call the async pipeline from synchronous code."""
-    return async_to_sync(run_prediction_async)(user, ticker)
+    return async_to_sync(run_prediction_async)(user, ticker, charts, horizon=horizon)
@@ -0,0 +1,43 @@
+# core/validation.py
+"""
+Parsing of user input shared by the API views, the Telegram bot and the
+management commands.  Everything here raises ``ValueError`` with a message
+fit to show the user.
+
+Ticker symbols end up in file names (core.charts) and in Yahoo URL paths
+(core.market_data), so they are checked against an allowlist once, where
+they enter, and everything downstream can trust them.
+"""
+
+import re
+
+from django.conf import settings
+
+# Letters, digits and the punctuation Yahoo symbols use: BRK.B, ^GSPC, EURUSD=X, BTC-USD.
+# At most 10 characters: the ticker columns are CharField(max_length=10).
+TICKER_MAX_LENGTH = 10
+TICKER_RE = re.compile(rf"^[A-Z0-9.^=\-]{{1,{TICKER_MAX_LENGTH}}}$")
+
+
+def parse_ticker(value) -> str:
+    """Upper‑cased ticker symbol, or ``ValueError``."""
+    ticker = str(value or "").strip().upper()
+    if not ticker:
+        raise ValueError("ticker is required")
+    if not TICKER_RE.match(ticker):
+        raise ValueError(f"invalid ticker {ticker[:20]!r}: "
+                         f"use up to {TICKER_MAX_LENGTH} letters, digits or . ^ = -")
+    return ticker
+
+
+def parse_horizon(value=None) -> int:
+    """Days ahead from user input (``None`` → 1); ``ValueError`` outside 1…PREDICT_MAX_HORIZON."""
+    if value is None or value == "":
+        return 1
+    try:
+        horizon = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"horizon must be a whole number of days, not {value!r}") from None
+    if not 1 <= horizon <= settings.PREDICT_MAX_HORIZON:
+        raise ValueError(f"horizon must be between 1 and {settings.PREDICT_MAX_HORIZON} days")
+    return horizon
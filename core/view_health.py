@@ -1,4 +1,49 @@
-from django.http import JsonResponse
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+
+from . import batching, metrics
+from .warmup import warmup, web_predicts
+from .model_registry import current_rss_bytes, registry
+from .prediction_cache import ForecastCache
 
 def healthz(request):
     return JsonResponse({"status": "ok"})
+
+
+def readyz(request):
+    """
+    503 until the model is loaded and traced (core.warmup).  A probe on a
+    process that never started its warm‑up starts it.  Behind the job queue
+    the web process never loads the model and is always ready.
+    """
+    if not web_predicts():
+        return JsonResponse({"status": "ready", "inference": settings.INFERENCE_BACKEND})
+    warmup.start()
+    status = warmup.status()
+    return JsonResponse(status, status=200 if warmup.ready else 503)
+
+
+def models_status(request):
+    """Load time, memory use and batching histograms (for worker sizing)."""
+    return JsonResponse({
+        "rss_bytes": current_rss_bytes(),
+        "models":    registry.stats(),
+        "batching":  batching.stats(),
+    })
+
+
+def cache_status(request):
+    """Forecast cache hit / miss / eviction counters."""
+    return JsonResponse(ForecastCache.stats())
+
+
+def metrics_view(request):
+    """Every metric of this process in the Prometheus text format."""
+    token = settings.METRICS_TOKEN
+    if token:
+        sent = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(sent, token):
+            return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+    return HttpResponse(metrics.exposition(), content_type=metrics.CONTENT_TYPE)
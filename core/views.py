@@ -1,19 +1,45 @@
-from django.shortcuts import render
-
-# Create your views here.
 # core/views.py
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework import status
-from .serializers import RegisterSerializer
+import asyncio
+import json
+import os
 
-# core/views.py  (add below RegisterView)
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import IsAuthenticated
-from rest_framework import generics, status
 from rest_framework.response import Response
-from .serializers import PredictionSerializer
-from .utils import run_prediction
-from .models import Prediction
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .backpressure import ConcurrencyLimiter, Saturated
+from .backtest import abacktest
+from .charts import CHART_FIELDS, ChartUnavailable, ensure_chart
+from .jobs import aenqueue
+from .models import Prediction, PredictionJob
+from .ratelimit import ratelimit
+from .serializers import PredictionJobSerializer, PredictionSerializer, RegisterSerializer
+from .utils import run_prediction_async
+from .validation import parse_horizon, parse_ticker
+from .warmup import web_predicts
+
+
+def _flag(value, default=True) -> bool:
+    """Parse a JSON / form boolean ("false", "0", "no", "none" → False)."""
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in {"false", "0", "no", "off", "none", ""}
 
 
 class RegisterView(APIView):
@@ -25,35 +51,239 @@ class RegisterView(APIView):
             serializer.save()
             return Response({"message": "User created successfully"}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
 
 
+# ─── Async API views ────────────────────────────────────────────
+# Plain Django async views rather than DRF APIViews: DRF dispatch is
+# synchronous, so under ASGI every request would pin a thread and nest an
+# event loop via async_to_sync.  These await the pipeline and the ORM
+# directly; auth is the same SimpleJWT bearer token the DRF views accept.
+_jwt = JWTAuthentication()
 
+predict_limiter = ConcurrencyLimiter(
+    "api_predict",
+    limit=settings.PREDICT_MAX_CONCURRENCY,
+    per_key=settings.PREDICT_MAX_PER_USER,
+    wait=settings.PREDICT_MAX_WAIT_SECONDS,
+)
+# a cold backtest keeps the model busy for seconds: only a few at a time
+backtest_limiter = ConcurrencyLimiter(
+    "api_backtest", limit=settings.BACKTEST_MAX_CONCURRENCY, per_key=1,
+)
 
-class PredictView(APIView):
-    permission_classes = [IsAuthenticated]
 
-    def post(self, request):
-        ticker = request.data.get("ticker")
-        if not ticker:
-            return Response({"detail": "ticker is required"}, status=400)
+def _error(detail: str, status: int, **headers) -> JsonResponse:
+    response = JsonResponse({"detail": detail}, status=status)
+    for name, value in headers.items():
+        response[name.replace("_", "-")] = value
+    return response
+
+
+async def _authenticate(request):
+    """The JWT's user, or ``None``; raises ``AuthenticationFailed`` for bad tokens."""
+    header = _jwt.get_header(request)
+    raw = _jwt.get_raw_token(header) if header else None
+    if raw is None:
+        return None
+    token = _jwt.get_validated_token(raw)               # signature/expiry: no I/O
+    return await sync_to_async(_jwt.get_user)(token)    # user lookup / revocation check
+
+
+class AsyncAPIView(View):
+    """Bearer‑token authenticated async view with DRF‑style JSON errors."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.user = await _authenticate(request)
+        except AuthenticationFailed as e:
+            detail = e.detail.get("detail", e.detail) if isinstance(e.detail, dict) else e.detail
+            return _error(str(detail), 401, WWW_Authenticate='Bearer realm="api"')
+        if request.user is None:
+            return _error("Authentication credentials were not provided.", 401,
+                          WWW_Authenticate='Bearer realm="api"')
+        return await super().dispatch(request, *args, **kwargs)
+
+    @staticmethod
+    def body(request) -> dict:
+        if request.content_type == "application/json":
+            try:
+                data = json.loads(request.body or b"{}")
+            except ValueError:
+                return {}
+            return data if isinstance(data, dict) else {}
+        return request.POST
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class PredictView(AsyncAPIView):
+    @ratelimit("predict")
+    async def post(self, request):
+        data = self.body(request)
+        try:
+            ticker = parse_ticker(data.get("ticker"))
+        except ValueError as e:
+            return _error(str(e), 400)
+        # "charts": false → API‑only prediction, charts are never rendered
+        charts = _flag(data.get("charts"))
+        # "horizon": N → N trading days ahead (metrics path + horizon chart)
+        try:
+            horizon = parse_horizon(data.get("horizon"))
+        except ValueError as e:
+            return _error(str(e), 400)
+
         try:
-            pred = run_prediction(request.user, ticker)
+            async with predict_limiter.slot(request.user.pk):
+                if settings.INFERENCE_BACKEND == "queue":
+                    # the inference worker runs it; poll the status URL for the result
+                    job = await aenqueue(request.user, ticker, charts=charts, horizon=horizon)
+                    body = PredictionJobSerializer(job).data
+                    response = JsonResponse(body, status=202)
+                    response["Location"] = body["status_url"]
+                    return response
+                try:
+                    pred = await run_prediction_async(request.user, ticker, charts=charts, horizon=horizon)
+                except Saturated:
+                    raise           # Yahoo budget spent / circuit open → 503
+                except Exception as e:
+                    return _error(str(e), 500)
+        except Saturated as e:
+            return _error(e.detail, e.status, Retry_After=str(e.retry_after))
+        return JsonResponse(PredictionSerializer(pred).data, status=201)
+
+
+class BacktestView(AsyncAPIView):
+    """
+    GET /backtest/<ticker>/?horizons=1,5,20&stride=5 → the model's
+    out‑of‑sample errors over the ticker's stored history (core.backtest),
+    cached until the next close.  Behind the job queue the web process never
+    loads the model: it serves cached reports only (``manage.py backtest``
+    on the inference worker computes them) and answers 503 otherwise.
+    """
+
+    @ratelimit("backtest")
+    async def get(self, request, ticker):
+        try:
+            ticker = parse_ticker(ticker)
+        except ValueError as e:
+            return _error(str(e), 400)
+        try:
+            stride = int(request.GET["stride"]) if request.GET.get("stride") else None
+        except ValueError:
+            return _error("stride must be a whole number of days", 400)
+        try:
+            async with backtest_limiter.slot(request.user.pk):
+                report = await abacktest(ticker, request.GET.get("horizons"), stride, compute=web_predicts())
+        except Saturated as e:
+            return _error(e.detail, e.status, Retry_After=str(e.retry_after))
+        except ValueError as e:
+            return _error(str(e), 400)
         except Exception as e:
-            return Response({"detail": str(e)}, status=500)
-        return Response(PredictionSerializer(pred).data, status=201)
+            return _error(str(e), 500)
+        if report is None:
+            return _error(f"No backtest of {ticker} for these horizons yet; run "
+                          f"`manage.py backtest {ticker}` on the inference worker", 503)
+        return JsonResponse(report.as_dict())
 
-class PredictionListView(generics.ListAPIView):
-    serializer_class = PredictionSerializer
-    permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
-        qs = Prediction.objects.filter(user=self.request.user)
-        ticker = self.request.query_params.get("ticker")
-        date   = self.request.query_params.get("date")
+class PredictionListView(AsyncAPIView):
+    async def get(self, request):
+        qs = Prediction.objects.filter(user=request.user)
+        ticker = request.GET.get("ticker")
+        date   = request.GET.get("date")
         if ticker:
             qs = qs.filter(ticker__iexact=ticker)
         if date:
             qs = qs.filter(created__date=date)
-        return qs
+        rows = [p async for p in qs]
+        return JsonResponse(PredictionSerializer(rows, many=True).data, safe=False)
+
+
+class PredictionPlotView(APIView):
+    """
+    GET /predictions/<id>/plot/<kind>/ → PNG, rendered on first request.
+    Session auth is accepted so the dashboard can use it as an <img> src.
+    """
+    authentication_classes = [SessionAuthentication, JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, kind):
+        if kind not in CHART_FIELDS:
+            raise Http404("Unknown chart kind")
+        pred = get_object_or_404(Prediction, pk=pk, user=request.user)
+        try:
+            rel_path = ensure_chart(pred, kind)
+        except ChartUnavailable as e:
+            raise Http404(str(e))
+        response = FileResponse(
+            open(os.path.join(settings.BASE_DIR, rel_path), "rb"),
+            content_type="image/png",
+        )
+        # content‑keyed: the bytes behind this URL never change
+        response["Cache-Control"] = "private, max-age=86400, immutable"
+        return response
+
+
+class PredictionJobView(APIView):
+    """GET /jobs/<id>/ → job status, plus the Prediction once it is done."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        job = get_object_or_404(
+            PredictionJob.objects.select_related("prediction"), pk=pk, user=request.user
+        )
+        return Response(PredictionJobSerializer(job).data)
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+class PredictionJobEventsView(AsyncAPIView):
+    """
+    GET /jobs/<id>/events/ → ``text/event-stream`` of the job's stage
+    events (``event: stage``) as the worker reports them, closed by one
+    ``done`` or ``failed`` event carrying the finished job.
+
+    Following a job needs the ASGI deploy (uvicorn): under WSGI (gunicorn,
+    runserver) Django would buffer the stream and hold a worker thread for
+    the whole job.  There the response is a snapshot – the events so far,
+    then ``event: poll`` with the status URL unless the job has finished –
+    and clients poll /jobs/<id>/ instead.
+    """
+    poll_interval = 0.25
+    heartbeat = 15.0
+
+    async def get(self, request, pk):
+        if not await PredictionJob.objects.filter(pk=pk, user=request.user).aexists():
+            return _error("Not found.", 404)
+        if isinstance(request, ASGIRequest):
+            response = StreamingHttpResponse(self.events(pk), content_type="text/event-stream")
+        else:
+            snapshot = [chunk async for chunk in self.events(pk, follow=False)]
+            response = HttpResponse("".join(snapshot), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"          # let nginx pass events straight through
+        return response
 
+    async def events(self, pk, follow: bool = True):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.INFERENCE_JOB_TIMEOUT * 3
+        sent, quiet = 0, 0.0
+        while loop.time() < deadline:
+            job = await PredictionJob.objects.select_related("prediction").aget(pk=pk)
+            for event in job.progress[sent:]:
+                yield _sse("stage", event)
+                quiet = 0.0
+            sent = len(job.progress)
+            if job.finished:
+                yield _sse(job.status, PredictionJobSerializer(job).data)
+                return
+            if not follow:
+                yield _sse("poll", {"status_url": reverse("prediction-job", args=[pk])})
+                return
+            await asyncio.sleep(self.poll_interval)
+            quiet += self.poll_interval
+            if quiet >= self.heartbeat:
+                yield ": keep-alive\n\n"
+                quiet = 0.0
+        yield _sse("timeout", {"status_url": reverse("prediction-job", args=[pk])})
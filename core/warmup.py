@@ -0,0 +1,126 @@
+# core/warmup.py
+"""
+Warm start for prediction processes.
+
+A cold worker's first prediction pays for importing TensorFlow, loading the
+model and tracing its predict graph – easily tens of seconds on a small
+container, inside someone's request.  ``start()`` does all three in a
+background thread as soon as the process boots (gunicorn's ``post_fork``
+hook, ``CoreConfig.ready`` with ``MODEL_WARMUP=1``, the inference worker),
+and ``/readyz`` answers 503 until it has finished.  Web processes only
+predict with ``INFERENCE_BACKEND=inline``; behind the job queue they never
+load the model and are ready at once.
+
+Requests that arrive while the warm‑up is still running are not refused
+here; they wait on the registry's per‑model lock instead of loading a
+second copy.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+from django.conf import settings
+
+from . import metrics
+from .model_registry import DEFAULT_MODEL, registry
+
+logger = logging.getLogger(__name__)
+
+COLD, WARMING, READY, FAILED = "cold", "warming", "ready", "failed"
+
+WARMUP_SECONDS = metrics.gauge("model_warmup_seconds", "Boot‑time model load + first predict")
+
+
+class Warmup:
+    def __init__(self, name: str = DEFAULT_MODEL, window: Optional[int] = None):
+        self.name = name
+        self.window = window
+        self.state = COLD
+        self.error: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def run(self) -> bool:
+        """Load the model and trace its predict on dummy ``(1, window, 1)`` input."""
+        started = time.perf_counter()
+        try:
+            if self.window is None:
+                from .utils import WINDOW        # also pays for the pipeline's own imports
+
+                self.window = WINDOW
+            imported = time.perf_counter()
+            model = registry.get(self.name)
+            loaded = time.perf_counter()
+            # float32 like the micro‑batcher's input; a second batch size makes
+            # TensorFlow trace the batch‑size‑agnostic graph every later call reuses
+            for batch in (1, 2):
+                model.predict_on_batch(np.zeros((batch, self.window, 1), dtype=np.float32))
+            traced = time.perf_counter()
+        except Exception as exc:
+            self.error = f"{type(exc).__name__}: {exc}"
+            self.state = FAILED
+            self._done.set()
+            logger.exception("Model warm‑up failed")
+            return False
+
+        self.timings = {
+            "import_seconds": round(imported - started, 3),
+            "load_seconds": round(loaded - imported, 3),
+            "first_predict_seconds": round(traced - loaded, 3),
+            "total_seconds": round(traced - started, 3),
+        }
+        WARMUP_SECONDS.set(traced - started)
+        self.state = READY
+        self._done.set()
+        logger.info("Model warm‑up done in %.2fs (imports %.2fs, load %.2fs, first predict %.2fs)",
+                    traced - started, imported - started, loaded - imported, traced - loaded)
+        return True
+
+    def start(self) -> None:
+        """Run the warm‑up in a daemon thread; no‑op once started (retried after a failure)."""
+        with self._lock:
+            if self.state in (WARMING, READY):
+                return
+            self.state, self.error = WARMING, None
+            self._done.clear()
+        threading.Thread(target=self.run, name="model-warmup", daemon=True).start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the warm‑up has finished; returns whether the model is ready."""
+        self._done.wait(timeout)
+        return self.ready
+
+    def status(self) -> Dict:
+        return {
+            "status": self.state,
+            "model": self.name,
+            "error": self.error,
+            **self.timings,
+        }
+
+
+warmup = Warmup()
+
+
+def start() -> None:
+    warmup.start()
+
+
+def web_predicts() -> bool:
+    """Whether web requests run the model in this process (not the inference worker)."""
+    return settings.INFERENCE_BACKEND == "inline"
+
+
+def web_warmup_enabled() -> bool:
+    """gunicorn's post_fork warm‑up: on unless GUNICORN_WARMUP=0, and only if the web predicts."""
+    return settings.GUNICORN_WARMUP and web_predicts()
@@ -0,0 +1,100 @@
+# core/windows.py
+"""
+Model input windows cut from a price series, without copying it.
+
+Backtests, batch inference and training all need many ``(WINDOW, 1)``
+windows of one series.  Stacking them costs ``WINDOW`` times the series in
+memory (10 years of daily closes: 2.5k values → 150k), so ``WindowBuilder``
+keeps them as a strided view (``sliding_window_view``) and only copies one
+chunk at a time into a reused, model‑ready buffer – scaled on the way if a
+``MinMaxScale`` is given.
+
+The series can be any 1‑D array, including a read‑only memory map
+(``WindowBuilder.load``): only the pages of the chunk being built are read.
+"""
+
+from __future__ import annotations
+
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .scaling import MinMaxScale
+
+WINDOW = 60   # closes per model input
+
+
+class WindowBuilder:
+    """
+    Every ``stride``‑th ``window``‑long run of ``series`` that still has
+    ``lookahead`` values after it.  Window ``i`` ends at ``ends[i]``.
+    """
+
+    def __init__(self, series: np.ndarray, window: int = WINDOW, stride: int = 1, lookahead: int = 0):
+        if window < 1 or stride < 1 or lookahead < 0:
+            raise ValueError("window and stride must be at least 1, lookahead at least 0")
+        self.series = np.asanyarray(series).reshape(-1)        # a view (memmaps stay memmaps)
+        self.window = window
+        self.stride = stride
+        self.lookahead = lookahead
+        count = max(0, len(self.series) - window - lookahead + 1)
+        self.ends = np.arange(window - 1, window - 1 + count, dtype=np.intp)[::stride]
+        if len(self.series) >= window:
+            self.windows = sliding_window_view(self.series, window)[::stride][:len(self.ends)]
+        else:
+            self.windows = np.empty((0, window), dtype=self.series.dtype)
+
+    @classmethod
+    def load(cls, path, window: int = WINDOW, stride: int = 1, lookahead: int = 0) -> "WindowBuilder":
+        """Windows over a ``.npy`` file, memory‑mapped read‑only."""
+        return cls(np.load(path, mmap_mode="r"), window, stride, lookahead)
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+    def targets(self, horizon: int = 1) -> np.ndarray:
+        """
+        ``(len, horizon)`` view of the values following each window
+        (needs ``lookahead >= horizon``).
+        """
+        if not 1 <= horizon <= self.lookahead:
+            raise ValueError(f"horizon must be between 1 and lookahead ({self.lookahead})")
+        following = sliding_window_view(self.series[self.window:], horizon)
+        return following[::self.stride][:len(self)]
+
+    def batches(
+        self,
+        batch_size: int,
+        scale: Optional[MinMaxScale] = None,
+        dtype=np.float32,
+    ) -> Iterator[Tuple[slice, np.ndarray]]:
+        """
+        Yield ``(rows, batch)``: ``batch`` is ``windows[rows]`` as a
+        ``(n, window, 1)`` array of ``dtype``, scaled by ``scale`` (one
+        entry, or one per window).  The same buffer is reused for every
+        chunk – copy a batch to keep it past the next iteration.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        buffer = np.empty((min(batch_size, len(self)), self.window, 1), dtype=dtype)
+        for lo in range(0, len(self), batch_size):
+            rows = slice(lo, min(lo + batch_size, len(self)))
+            out = buffer[:rows.stop - lo]
+            if scale is None:
+                np.copyto(out[..., 0], self.windows[rows], casting="unsafe")
+            else:
+                part = scale if len(scale) == 1 else scale[rows]
+                part.transform(self.windows[rows], out=out[..., 0])
+            yield rows, out
+
+
+def windows_with_targets(
+    series: np.ndarray, window: int = WINDOW, horizon: int = 1, stride: int = 1
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Training pairs as views of ``series``: inputs ``(n, window, 1)`` and the
+    ``(n, horizon)`` values that followed each of them.
+    """
+    builder = WindowBuilder(series, window, stride, lookahead=horizon)
+    return builder.windows[..., None], builder.targets(horizon)
@@ -7,6 +7,31 @@ python manage.py migrate --noinput
 echo "🎯 Collecting static files..."
 python manage.py collectstatic --noinput
 
+# Single‑container deploys: run the inference worker next to Gunicorn and
+# stop the container as soon as either exits, so the orchestrator restarts
+# it instead of leaving jobs queued behind a dead worker.
+# Set START_INFERENCE_WORKER=0 when it runs as its own service.
+if [ "${INFERENCE_BACKEND:-queue}" = "queue" ] && [ "${START_INFERENCE_WORKER:-1}" = "1" ]; then
+  echo "🧠 Starting inference worker..."
+  python manage.py inferenceworker &
+  worker=$!
+
+  echo "🚀 Starting Gunicorn..."
+  gunicorn stock_prediction_main.wsgi:application -c gunicorn.conf.py &
+  web=$!
+
+  stopping=0
+  trap 'stopping=1; kill -TERM "$worker" "$web" 2>/dev/null || true' TERM INT
+  while kill -0 "$worker" 2>/dev/null && kill -0 "$web" 2>/dev/null; do
+    sleep 5 &
+    wait $! || true                # returns early when a signal arrives
+  done
+  [ "$stopping" = 1 ] || echo "💥 Inference worker or Gunicorn exited; stopping the container"
+  kill -TERM "$worker" "$web" 2>/dev/null || true
+  wait "$worker" "$web" || true
+  [ "$stopping" = 1 ] && exit 0
+  exit 1
+fi
+
 echo "🚀 Starting Gunicorn..."
-exec gunicorn stock_prediction_main.wsgi:application \
-     --bind 0.0.0.0:$PORT --timeout 120
+exec gunicorn stock_prediction_main.wsgi:application -c gunicorn.conf.py
@@ -0,0 +1,29 @@
+# gunicorn.conf.py
+"""
+Gunicorn settings (read automatically from the working directory).
+
+With INFERENCE_BACKEND=inline each worker warms its model right after the
+fork (core.warmup): TensorFlow is imported, the model loaded and its
+predict graph traced before the first request needs them.  Warming in the
+master with ``preload_app`` would share the imports, but TensorFlow's
+threads do not survive fork.  With the job queue the web workers never
+predict and stay without TensorFlow.  GUNICORN_WARMUP=0 turns it off.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+
+def post_fork(server, worker):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "stock_prediction_main.settings")
+    import django
+
+    django.setup()
+    from core import warmup
+
+    if not warmup.web_warmup_enabled():
+        return
+    warmup.start()
+    server.log.info("worker %s: model warm‑up started", worker.pid)
@@ -194,3 +194,138 @@ MEDIA_ROOT = BASE_DIR / "media"
 # For plot storage
 PLOTS_DIR = BASE_DIR / "media" / "plots"
 os.makedirs(PLOTS_DIR, exist_ok=True)
+
+# ─── Inference ───────────────────────────────────────────────────
+# Concurrent predictions are grouped into one (N, 60, 1) model call.
+PREDICT_BATCH_MAX_SIZE    = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "32"))
+PREDICT_BATCH_MAX_WAIT_MS = float(os.getenv("PREDICT_BATCH_MAX_WAIT_MS", "5"))
+
+# Longest multi‑step forecast a request may ask for (trading days ahead,
+# one recursive model step each; see core.rollout).
+PREDICT_MAX_HORIZON = int(os.getenv("PREDICT_MAX_HORIZON", "20"))
+
+# Load the model and trace its predict graph at boot instead of in the first
+# request (core.warmup); /readyz answers 503 until that is done.  Web
+# processes only need the model with INFERENCE_BACKEND=inline – with the job
+# queue the inference worker warms up instead.
+#   GUNICORN_WARMUP  gunicorn workers, from post_fork (gunicorn.conf.py); on
+#   MODEL_WARMUP     any other process (uvicorn, runserver, the bot), from
+#                    CoreConfig.ready; off
+GUNICORN_WARMUP = os.getenv("GUNICORN_WARMUP", "1").lower() in ("1", "true", "yes")
+MODEL_WARMUP    = os.getenv("MODEL_WARMUP", "0").lower() in ("1", "true", "yes")
+
+# ─── Backtests ───────────────────────────────────────────────────
+# core.backtest replays the model over a ticker's whole history: every
+# BACKTEST_STRIDE‑th day is forecast BACKTEST_HORIZONS days ahead,
+# BACKTEST_BATCH_SIZE windows per model call.  At most
+# BACKTEST_MAX_CONCURRENCY run at once in a web process (cached results
+# don't count).
+BACKTEST_HORIZONS        = [int(h) for h in os.getenv("BACKTEST_HORIZONS", "1,5,20").split(",")]
+BACKTEST_STRIDE          = int(os.getenv("BACKTEST_STRIDE", "5"))
+BACKTEST_BATCH_SIZE      = int(os.getenv("BACKTEST_BATCH_SIZE", "512"))
+BACKTEST_MAX_CONCURRENCY = int(os.getenv("BACKTEST_MAX_CONCURRENCY", "2"))
+
+# ─── Local price store ───────────────────────────────────────────
+# First request back‑fills this much history; later ones fetch only new bars.
+PRICE_STORE_BACKFILL_PERIOD = os.getenv("PRICE_STORE_BACKFILL_PERIOD", "10y")
+PRICE_STORE_REFRESH_SECONDS = int(os.getenv("PRICE_STORE_REFRESH_SECONDS", "900"))
+
+# ─── Cache ───────────────────────────────────────────────────────
+# Redis in production (shared by web + bot), in‑process LocMem otherwise.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+# Forecasts live until the next market close (see core.prediction_cache).
+PREDICTION_CACHE_ALIAS = os.getenv("PREDICTION_CACHE_ALIAS", "default")
+
+# ─── Charts ──────────────────────────────────────────────────────
+# Long price histories are reduced to a per‑pixel min/max envelope before
+# plotting; 0 draws every point.
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "2000"))
+
+# ─── Inference worker ────────────────────────────────────────────
+# "queue": POST /predict/ returns a job id and `manage.py inferenceworker`
+# runs the prediction; "inline": the request thread runs it (no worker).
+INFERENCE_BACKEND      = os.getenv("INFERENCE_BACKEND", "queue")
+INFERENCE_WORKERS      = int(os.getenv("INFERENCE_WORKERS", "4"))      # job slots per worker process
+INFERENCE_POLL_SECONDS = float(os.getenv("INFERENCE_POLL_SECONDS", "0.5"))
+INFERENCE_JOB_TIMEOUT  = float(os.getenv("INFERENCE_JOB_TIMEOUT", "120"))
+# A job whose worker died this many times (e.g. OOM‑killed mid‑job) is failed, not retried.
+INFERENCE_MAX_ATTEMPTS = int(os.getenv("INFERENCE_MAX_ATTEMPTS", "3"))
+
+# ─── API backpressure ────────────────────────────────────────────
+# Async predict view: requests beyond the limit wait briefly, then get 503;
+# a user with too many requests already in flight gets 429.
+PREDICT_MAX_CONCURRENCY  = int(os.getenv("PREDICT_MAX_CONCURRENCY", "64"))
+PREDICT_MAX_PER_USER     = int(os.getenv("PREDICT_MAX_PER_USER", "4"))
+PREDICT_MAX_WAIT_SECONDS = float(os.getenv("PREDICT_MAX_WAIT_SECONDS", "0.5"))
+
+# ─── Market data (Yahoo) ─────────────────────────────────────────
+# One pooled keep‑alive client per process (see core.market_data);
+# HTTP/2 is used when the optional `h2` package is installed.
+YAHOO_BASE_URL    = os.getenv("YAHOO_BASE_URL", "https://query1.finance.yahoo.com")
+YAHOO_POOL_SIZE   = int(os.getenv("YAHOO_POOL_SIZE", "10"))
+YAHOO_HTTP2       = os.getenv("YAHOO_HTTP2", "1").lower() not in {"0", "false", "no", "off"}
+YAHOO_TIMEOUT     = float(os.getenv("YAHOO_TIMEOUT", "10"))
+YAHOO_MAX_RETRIES = int(os.getenv("YAHOO_MAX_RETRIES", "3"))
+
+# Outbound call budget shared by every process through the cache (see
+# core.throttle): at most YAHOO_RATE_LIMIT calls per YAHOO_RATE_WINDOW
+# seconds; YAHOO_BREAKER_THRESHOLD failures within the cooldown open the
+# circuit for YAHOO_BREAKER_COOLDOWN seconds.
+YAHOO_RATE_LIMIT        = int(os.getenv("YAHOO_RATE_LIMIT", "10"))
+YAHOO_RATE_WINDOW       = float(os.getenv("YAHOO_RATE_WINDOW", "1"))
+YAHOO_RATE_MAX_WAIT     = float(os.getenv("YAHOO_RATE_MAX_WAIT", "10"))
+YAHOO_BREAKER_THRESHOLD = int(os.getenv("YAHOO_BREAKER_THRESHOLD", "5"))
+YAHOO_BREAKER_COOLDOWN  = float(os.getenv("YAHOO_BREAKER_COOLDOWN", "30"))
+
+# ─── Per‑user rate limits ────────────────────────────────────────
+# Sliding‑window limits per scope and tier (core.ratelimit); a user's tier
+# is the auth group they belong to ("pro"), everyone else is "default".
+RATE_LIMITS = {
+    "predict": {
+        "default": os.getenv("RATE_LIMIT_PREDICT", "30/m"),
+        "pro":     os.getenv("RATE_LIMIT_PREDICT_PRO", "120/m"),
+    },
+    "backtest": {
+        "default": os.getenv("RATE_LIMIT_BACKTEST", "10/h"),
+        "pro":     os.getenv("RATE_LIMIT_BACKTEST_PRO", "60/h"),
+    },
+    "telegram": {
+        "default": os.getenv("RATE_LIMIT_TELEGRAM", "10/m"),
+        "pro":     os.getenv("RATE_LIMIT_TELEGRAM_PRO", "60/m"),
+    },
+}
+
+# ─── Telegram bot ────────────────────────────────────────────────
+# Updates from different chats are handled concurrently, each chat in
+# order.  Webhook mode (`telegrambot --webhook`) listens on
+# LISTEN:PORT+PATH and registers URL+PATH with Telegram when URL is set;
+# the secret defaults to one derived from BOT_TOKEN.
+# TELEGRAM_INFERENCE=queue makes the bot a thin client of the inference
+# worker: it never imports the model stack.
+TELEGRAM_INFERENCE      = os.getenv("TELEGRAM_INFERENCE", "inline")
+TELEGRAM_CONCURRENCY    = int(os.getenv("TELEGRAM_CONCURRENCY", "16"))
+TELEGRAM_MAX_IN_FLIGHT  = int(os.getenv("TELEGRAM_MAX_IN_FLIGHT", "256"))
+TELEGRAM_WEBHOOK_URL    = os.getenv("TELEGRAM_WEBHOOK_URL", "")
+TELEGRAM_WEBHOOK_LISTEN = os.getenv("TELEGRAM_WEBHOOK_LISTEN", "0.0.0.0")
+TELEGRAM_WEBHOOK_PORT   = int(os.getenv("TELEGRAM_WEBHOOK_PORT", "8443"))
+TELEGRAM_WEBHOOK_PATH   = os.getenv("TELEGRAM_WEBHOOK_PATH", "/telegram/webhook")
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")
+
+# ─── Metrics ─────────────────────────────────────────────────────
+# The web app serves Prometheus text on /metrics (Bearer METRICS_TOKEN
+# when set).  The bot and inference worker have no web server; with
+# METRICS_PORT (or --metrics-port) they serve /metrics on that port, behind
+# the same token.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_PORT  = int(os.getenv("METRICS_PORT", "0"))       # 0 = off
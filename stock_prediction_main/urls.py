@@ -25,7 +25,7 @@ from django.conf.urls.static import static
 
 # Front‑end & health views
 from core.views_frontend import root_redirect
-from core.view_health import healthz
+from core.view_health import cache_status, healthz, metrics_view, models_status, readyz
 
 # Stripe / billing views
 from core.views_billing import (
@@ -43,6 +43,10 @@ urlpatterns = [
     # —— Misc —— --------------------------------------------------------------
     path("",          root_redirect, name="root"),
     path("healthz/",  healthz,       name="healthz"),
+    path("readyz/",   readyz,        name="readyz"),
+    path("healthz/models/", models_status, name="healthz-models"),
+    path("healthz/cache/",  cache_status,  name="healthz-cache"),
+    path("metrics",   metrics_view,  name="metrics"),
 
     # —— Admin —— -------------------------------------------------------------
     path("admin/", admin.site.urls),